@@ -4,6 +4,7 @@ import logging
 from models.models import User, RequiredChannel
 from config.config import ADMIN_USER_IDS as ADMIN_IDS
 from services.admin_service import AdminService
+from utils.callback_router import router
 
 logger = logging.getLogger(__name__)
 
@@ -53,6 +54,8 @@ async def admin_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) -> N
         parse_mode='Markdown'
     )
 
+@router.exact("admin_forward", "admin_channels", "admin_add_channel", answer=False)
+@router.prefix("admin_remove_channel_", answer=False)
 async def handle_admin_callback(update: Update, context: ContextTypes.DEFAULT_TYPE, callback_data: str) -> None:
     """Handle admin-related callback queries."""
     query = update.callback_query
@@ -77,6 +80,7 @@ async def handle_admin_callback(update: Update, context: ContextTypes.DEFAULT_TY
             [InlineKeyboardButton("🔙 بازگشت به پنل مدیریت", callback_data="menu_admin")]
         ]
         
+        await query.answer()
         await query.message.edit_text(
             "📊 *آمار کاربران*\n\n"
             f"👥 تعداد کل کاربران: {user_stats['total_users']}\n"
@@ -98,6 +102,7 @@ async def handle_admin_callback(update: Update, context: ContextTypes.DEFAULT_TY
             [InlineKeyboardButton("🔙 بازگشت به پنل مدیریت", callback_data="menu_admin")]
         ]
         
+        await query.answer()
         await query.message.edit_text(
             "📢 *ارسال پیام همگانی*\n\n"
             "لطفاً متن پیام خود را ارسال کنید.\n"
@@ -115,6 +120,7 @@ async def handle_admin_callback(update: Update, context: ContextTypes.DEFAULT_TY
             [InlineKeyboardButton("🔙 بازگشت به پنل مدیریت", callback_data="menu_admin")]
         ]
         
+        await query.answer()
         await query.message.edit_text(
             "📤 *فوروارد پیام همگانی*\n\n"
             "لطفاً پیامی که می‌خواهید فوروارد شود را به ربات فوروارد کنید.\n"
@@ -126,39 +132,8 @@ async def handle_admin_callback(update: Update, context: ContextTypes.DEFAULT_TY
     
     elif callback_data == "admin_channels":
         # Show required channels management
-        required_channels = admin_service.get_required_channels()
-        
-        message = "📋 *مدیریت کانال‌های اجباری*\n\n"
-        
-        if required_channels:
-            message += "کانال‌های فعلی:\n"
-            for i, channel in enumerate(required_channels, 1):
-                message += f"{i}. {channel['channel_name']} - {channel['channel_url']}\n"
-        else:
-            message += "هیچ کانالی تنظیم نشده است.\n"
-        
-        message += "\nحداکثر 5 کانال می‌توانید تنظیم کنید."
-        
-        keyboard = [
-            [InlineKeyboardButton("➕ افزودن کانال", callback_data="admin_add_channel")]
-        ]
-        
-        # Add remove buttons for each channel
-        for channel in required_channels:
-            keyboard.append([
-                InlineKeyboardButton(
-                    f"❌ حذف {channel['channel_name']}", 
-                    callback_data=f"admin_remove_channel_{channel['channel_id']}"
-                )
-            ])
-        
-        keyboard.append([InlineKeyboardButton("🔙 بازگشت به پنل مدیریت", callback_data="menu_admin")])
-        
-        await query.message.edit_text(
-            message,
-            reply_markup=InlineKeyboardMarkup(keyboard),
-            parse_mode='Markdown'
-        )
+        await query.answer()
+        await show_required_channels(query, admin_service)
     
     elif callback_data == "admin_add_channel":
         # Show add channel form
@@ -172,6 +147,7 @@ async def handle_admin_callback(update: Update, context: ContextTypes.DEFAULT_TY
             [InlineKeyboardButton("🔙 بازگشت به مدیریت کانال‌ها", callback_data="admin_channels")]
         ]
         
+        await query.answer()
         await query.message.edit_text(
             "➕ *افزودن کانال اجباری*\n\n"
             "لطفاً اطلاعات کانال را در قالب زیر ارسال کنید:\n\n"
@@ -197,8 +173,44 @@ async def handle_admin_callback(update: Update, context: ContextTypes.DEFAULT_TY
         else:
             await query.answer("❌ خطا در حذف کانال.")
         
-        # Refresh channels list
-        await handle_admin_callback(update, context, "admin_channels")
+        # Refresh channels list; the query is already answered
+        await show_required_channels(query, admin_service)
+
+async def show_required_channels(query, admin_service) -> None:
+    """Show the required channels management list without answering the query."""
+    required_channels = admin_service.get_required_channels()
+    
+    message = "📋 *مدیریت کانال‌های اجباری*\n\n"
+    
+    if required_channels:
+        message += "کانال‌های فعلی:\n"
+        for i, channel in enumerate(required_channels, 1):
+            message += f"{i}. {channel['channel_name']} - {channel['channel_url']}\n"
+    else:
+        message += "هیچ کانالی تنظیم نشده است.\n"
+    
+    message += "\nحداکثر 5 کانال می‌توانید تنظیم کنید."
+    
+    keyboard = [
+        [InlineKeyboardButton("➕ افزودن کانال", callback_data="admin_add_channel")]
+    ]
+    
+    # Add remove buttons for each channel
+    for channel in required_channels:
+        keyboard.append([
+            InlineKeyboardButton(
+                f"❌ حذف {channel['channel_name']}", 
+                callback_data=f"admin_remove_channel_{channel['channel_id']}"
+            )
+        ])
+    
+    keyboard.append([InlineKeyboardButton("🔙 بازگشت به پنل مدیریت", callback_data="menu_admin")])
+    
+    await query.message.edit_text(
+        message,
+        reply_markup=InlineKeyboardMarkup(keyboard),
+        parse_mode='Markdown'
+    )
 
 async def process_admin_message(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Process admin message based on current action."""
@@ -312,6 +324,7 @@ async def process_admin_message(update: Update, context: ContextTypes.DEFAULT_TY
                 "❌ فرمت وارد شده نامعتبر است. لطفاً از فرمت `@username | نام کانال` استفاده کنید."
             )
 
+@router.exact("admin_confirm_broadcast", "admin_confirm_forward", answer=False)
 async def handle_admin_confirm_callback(update: Update, context: ContextTypes.DEFAULT_TYPE, callback_data: str) -> None:
     """Handle admin confirmation callback queries."""
     query = update.callback_query
@@ -335,6 +348,7 @@ async def handle_admin_confirm_callback(update: Update, context: ContextTypes.DE
         message_text = context.user_data['broadcast_message']
         
         # Send processing message
+        await query.answer()
         await query.message.edit_text(
             "📢 در حال ارسال پیام همگانی...\n"
             "این عملیات ممکن است چند دقیقه طول بکشد."
@@ -375,6 +389,7 @@ async def handle_admin_confirm_callback(update: Update, context: ContextTypes.DE
         message_id = context.user_data['forward_message_id']
         
         # Send processing message
+        await query.answer()
         await query.message.edit_text(
             "📤 در حال فوروارد پیام همگانی...\n"
             "این عملیات ممکن است چند دقیقه طول بکشد."
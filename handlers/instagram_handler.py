@@ -1,10 +1,20 @@
-from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
+from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup, InputMediaPhoto, InputMediaVideo
+from telegram.error import TelegramError
 from telegram.ext import ContextTypes
 import os
+import asyncio
+from contextlib import ExitStack
 from models.models import User, VIPSubscription, DownloadHistory
 from utils.helpers import create_download_dir, format_size, get_file_size
 from config.config import DOWNLOAD_DIR, DAILY_DOWNLOAD_LIMIT_MB
 from services.instagram_service import InstagramDownloadService
+from handlers.menu_handler import INSTAGRAM_MENU, STORAGE_FULL_TEXT, platform_unavailable_text, notify_interrupted_downloads
+from utils.circuit_breaker import circuit_breakers, CircuitOpenError
+from utils.disk_janitor import disk_janitor
+from utils.payload_store import callback_payloads
+from utils.callback_router import router
+from utils.job_journal import job_journal
+from utils.bot_runner import on_startup
 import logging
 
 logger = logging.getLogger(__name__)
@@ -12,21 +22,77 @@ logger = logging.getLogger(__name__)
 # Initialize Instagram download service
 instagram_service = InstagramDownloadService()
 
+# Telegram's limit on items per media group
+MEDIA_GROUP_SIZE = 10
+
+# Labels used in audio captions
+AUDIO_SOURCE_NAMES = {
+    'reel': ('Reel', 'ریلز'),
+    'video': ('Video', 'ویدیو'),
+    'story': ('Story', 'استوری')
+}
+
+async def send_media_groups(message, items, caption):
+    """Send photos/videos as Telegram albums of up to 10 items; the caption goes on the first"""
+    for start in range(0, len(items), MEDIA_GROUP_SIZE):
+        group = items[start:start + MEDIA_GROUP_SIZE]
+        group_caption = caption if start == 0 else None
+        
+        disk_janitor.mark_served(*(item['file_path'] for item in group))
+        with ExitStack() as stack:
+            files = [stack.enter_context(open(item['file_path'], 'rb')) for item in group]
+            
+            # Albums need at least two items
+            if len(group) == 1:
+                if group[0]['type'] == 'video':
+                    await message.reply_video(video=files[0], caption=group_caption, supports_streaming=True)
+                else:
+                    await message.reply_photo(photo=files[0], caption=group_caption)
+                continue
+            
+            media = []
+            for index, (item, media_file) in enumerate(zip(group, files)):
+                item_caption = group_caption if index == 0 else None
+                if item['type'] == 'video':
+                    media.append(InputMediaVideo(media_file, caption=item_caption, supports_streaming=True))
+                else:
+                    media.append(InputMediaPhoto(media_file, caption=item_caption))
+            await message.reply_media_group(media=media)
+
+async def send_photo(message, result, caption):
+    """Send a photo result and return its size in bytes.
+
+    Results with a ``url`` are sent by URL so Telegram fetches the image from the CDN
+    itself; if Telegram can't, the image is downloaded to ``fallback_path`` and uploaded.
+    """
+    if not result.get('file_path'):
+        try:
+            sent = await message.reply_photo(photo=result['url'], caption=caption)
+            return (sent.photo[-1].file_size or 0) if sent.photo else 0
+        except TelegramError as e:
+            logger.warning(f"Telegram couldn't fetch Instagram photo by URL, uploading it instead: {e}")
+        
+        result['file_path'] = await asyncio.to_thread(
+            instagram_service.fetch_media, result['url'], result['fallback_path']
+        )
+        if not result['file_path']:
+            raise RuntimeError(f"Could not download Instagram photo {result['url']}")
+    
+    disk_janitor.mark_served(result['file_path'])
+    with open(result['file_path'], 'rb') as photo_file:
+        await message.reply_photo(photo=photo_file, caption=caption)
+    return get_file_size(result['file_path'])
+
+def audio_keyboard(video_path, owner, kind):
+    """Inline button that extracts and sends a video's audio on demand"""
+    callback_data = callback_payloads.callback_data(
+        "instagram_audio_", {'path': video_path, 'owner': owner, 'kind': kind}
+    )
+    return InlineKeyboardMarkup([[InlineKeyboardButton("🎵 دریافت فایل صوتی", callback_data=callback_data)]])
+
 async def instagram_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Handle the /instagram command."""
-    keyboard = [
-        [
-            InlineKeyboardButton("📷 دانلود پست", callback_data="instagram_type_post"),
-            InlineKeyboardButton("📱 دانلود ریلز", callback_data="instagram_type_reel")
-        ],
-        [
-            InlineKeyboardButton("🔄 دانلود استوری", callback_data="instagram_type_story"),
-            InlineKeyboardButton("👤 دانلود پروفایل", callback_data="instagram_type_profile")
-        ],
-        [InlineKeyboardButton("🔙 بازگشت به منوی اصلی", callback_data="menu_main")]
-    ]
-    
-    reply_markup = InlineKeyboardMarkup(keyboard)
+    reply_markup = INSTAGRAM_MENU
     
     await update.message.reply_text(
         "لطفاً لینک پست، ریلز، استوری یا پروفایل اینستاگرام را ارسال کنید یا نوع دانلود را انتخاب کنید:",
@@ -77,6 +143,15 @@ async def process_instagram_url(update: Update, context: ContextTypes.DEFAULT_TY
         )
         return
     
+    # Fail fast while Instagram is failing for everyone
+    if circuit_breakers.first_open('instagram'):
+        await update.message.reply_text(platform_unavailable_text('instagram'))
+        return
+    
+    if disk_janitor.admission_paused():
+        await update.message.reply_text(STORAGE_FULL_TEXT)
+        return
+    
     # Clean URL (remove tracking parameters)
     url = url.split("?")[0] if "?" in url else url
     
@@ -99,7 +174,17 @@ async def process_instagram_url(update: Update, context: ContextTypes.DEFAULT_TY
     
     try:
         # Download content
-        result = instagram_service.download_from_url(url, user_id, DOWNLOAD_DIR)
+        # The blocking work runs in worker threads so other users' updates keep flowing
+        # Journaled so a restart mid-download tells the user to send the link again
+        job_id = job_journal.start('instagram', {'url': url}, user_id=user_id, chat_id=update.effective_chat.id)
+        try:
+            result = await instagram_service.download_from_url(url, user_id, DOWNLOAD_DIR)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            job_journal.finish(job_id)
+            raise
+        job_journal.finish(job_id)
         
         if not result:
             await processing_message.edit_text(
@@ -109,8 +194,20 @@ async def process_instagram_url(update: Update, context: ContextTypes.DEFAULT_TY
         
         # Process result based on type
         if result['type'] == 'photo':
-            # Get file size
-            file_size = get_file_size(result['file_path'])
+            await processing_message.edit_text(
+                f"✅ عکس با موفقیت دریافت شد!\n\n"
+                f"👤 کاربر: {result['owner']}\n\n"
+                "در حال ارسال فایل..."
+            )
+            
+            # Send photo (by URL when possible); its size is known once sent
+            file_size = await send_photo(
+                update.message,
+                result,
+                caption=f"📷 پست اینستاگرام از {result['owner']}\n\n"
+                        f"{result['caption'][:200] + '...' if len(result['caption']) > 200 else result['caption']}\n\n"
+                        f"دانلود شده توسط ربات Snexus"
+            )
             
             # Update user's download usage
             if file_size > 0:
@@ -124,22 +221,48 @@ async def process_instagram_url(update: Update, context: ContextTypes.DEFAULT_TY
                 file_size=file_size
             )
             
-            # Send the file
+            # Final message
+            keyboard = [
+                [InlineKeyboardButton("🔙 بازگشت به منوی اینستاگرام", callback_data="menu_instagram")]
+            ]
+            
             await processing_message.edit_text(
                 f"✅ عکس با موفقیت دانلود شد!\n\n"
                 f"👤 کاربر: {result['owner']}\n"
+                f"💾 حجم: {format_size(file_size)}",
+                reply_markup=InlineKeyboardMarkup(keyboard)
+            )
+            
+        elif result['type'] == 'album':
+            # Get total size of all items
+            file_size = sum(get_file_size(item['file_path']) for item in result['items'])
+            
+            # Update user's download usage
+            if file_size > 0:
+                user_model.update_download_usage(user_id, file_size)
+            
+            # Add to download history
+            download_model.add_download(
+                user_id=user_id,
+                content_type='instagram_album',
+                content_url=url,
+                file_size=file_size
+            )
+            
+            await processing_message.edit_text(
+                f"✅ پست چندتایی با موفقیت دانلود شد!\n\n"
+                f"👤 کاربر: {result['owner']}\n"
+                f"🖼 تعداد: {len(result['items'])}\n"
                 f"💾 حجم: {format_size(file_size)}\n\n"
-                "در حال ارسال فایل..."
+                "در حال ارسال فایل‌ها..."
             )
             
-            # Send photo
-            with open(result['file_path'], 'rb') as photo_file:
-                await update.message.reply_photo(
-                    photo=photo_file,
-                    caption=f"📷 پست اینستاگرام از {result['owner']}\n\n"
-                            f"{result['caption'][:200] + '...' if len(result['caption']) > 200 else result['caption']}\n\n"
-                            f"دانلود شده توسط ربات Snexus"
-                )
+            caption = (
+                f"🖼 پست اینستاگرام از {result['owner']}\n\n"
+                f"{result['caption'][:200] + '...' if len(result['caption']) > 200 else result['caption']}\n\n"
+                f"دانلود شده توسط ربات Snexus"
+            )
+            await send_media_groups(update.message, result['items'], caption)
             
             # Final message
             keyboard = [
@@ -147,8 +270,9 @@ async def process_instagram_url(update: Update, context: ContextTypes.DEFAULT_TY
             ]
             
             await processing_message.edit_text(
-                f"✅ عکس با موفقیت دانلود شد!\n\n"
+                f"✅ پست چندتایی با موفقیت دانلود شد!\n\n"
                 f"👤 کاربر: {result['owner']}\n"
+                f"🖼 تعداد: {len(result['items'])}\n"
                 f"💾 حجم: {format_size(file_size)}",
                 reply_markup=InlineKeyboardMarkup(keyboard)
             )
@@ -177,26 +301,17 @@ async def process_instagram_url(update: Update, context: ContextTypes.DEFAULT_TY
                 "در حال ارسال فایل..."
             )
             
-            # Send video
+            # Send video; its audio is only extracted if the button is pressed
+            disk_janitor.mark_served(result['file_path'])
             with open(result['file_path'], 'rb') as video_file:
                 await update.message.reply_video(
                     video=video_file,
                     caption=f"🎬 {'ریلز' if result['type'] == 'reel' else 'ویدیو'} اینستاگرام از {result['owner']}\n\n"
                             f"{result['caption'][:200] + '...' if len(result['caption']) > 200 else result['caption']}\n\n"
-                            f"دانلود شده توسط ربات Snexus"
+                            f"دانلود شده توسط ربات Snexus",
+                    reply_markup=audio_keyboard(result['file_path'], result['owner'], result['type'])
                 )
             
-            # Send audio if available
-            if 'audio_path' in result and result['audio_path'] and os.path.exists(result['audio_path']):
-                with open(result['audio_path'], 'rb') as audio_file:
-                    await update.message.reply_audio(
-                        audio=audio_file,
-                        title=f"Audio - {result['owner']} {'Reel' if result['type'] == 'reel' else 'Video'}",
-                        performer=result['owner'],
-                        caption=f"🎵 فایل صوتی {'ریلز' if result['type'] == 'reel' else 'ویدیو'} اینستاگرام از {result['owner']}\n\n"
-                                f"دانلود شده توسط ربات Snexus"
-                    )
-            
             # Final message
             keyboard = [
                 [InlineKeyboardButton("🔙 بازگشت به منوی اینستاگرام", callback_data="menu_instagram")]
@@ -235,24 +350,16 @@ async def process_instagram_url(update: Update, context: ContextTypes.DEFAULT_TY
             
             # Send story (photo or video)
             if result['is_video']:
+                disk_janitor.mark_served(result['file_path'])
                 with open(result['file_path'], 'rb') as video_file:
                     await update.message.reply_video(
                         video=video_file,
                         caption=f"🎬 استوری اینستاگرام از {result['owner']}\n\n"
-                                f"دانلود شده توسط ربات Snexus"
+                                f"دانلود شده توسط ربات Snexus",
+                        reply_markup=audio_keyboard(result['file_path'], result['owner'], 'story')
                     )
-                
-                # Send audio if available
-                if result['audio_path'] and os.path.exists(result['audio_path']):
-                    with open(result['audio_path'], 'rb') as audio_file:
-                        await update.message.reply_audio(
-                            audio=audio_file,
-                            title=f"Audio - {result['owner']} Story",
-                            performer=result['owner'],
-                            caption=f"🎵 فایل صوتی استوری اینستاگرام از {result['owner']}\n\n"
-                                    f"دانلود شده توسط ربات Snexus"
-                        )
             else:
+                disk_janitor.mark_served(result['file_path'])
                 with open(result['file_path'], 'rb') as photo_file:
                     await update.message.reply_photo(
                         photo=photo_file,
@@ -273,8 +380,24 @@ async def process_instagram_url(update: Update, context: ContextTypes.DEFAULT_TY
             )
             
         elif result['type'] == 'profile':
-            # Get file size
-            file_size = get_file_size(result['file_path'])
+            await processing_message.edit_text(
+                f"✅ عکس پروفایل با موفقیت دریافت شد!\n\n"
+                f"👤 کاربر: {result['username']}\n"
+                f"📝 نام: {result['full_name']}\n"
+                f"👥 دنبال‌کنندگان: {result['followers']}\n\n"
+                "در حال ارسال فایل..."
+            )
+            
+            # Send profile picture (by URL when possible)
+            file_size = await send_photo(
+                update.message,
+                result,
+                caption=f"👤 عکس پروفایل {result['username']} ({result['full_name']})\n\n"
+                        f"👥 دنبال‌کنندگان: {result['followers']}\n"
+                        f"👣 دنبال‌شوندگان: {result['followees']}\n\n"
+                        f"📝 بیوگرافی: {result['biography'][:200] + '...' if len(result['biography']) > 200 else result['biography']}\n\n"
+                        f"دانلود شده توسط ربات Snexus"
+            )
             
             # Update user's download usage
             if file_size > 0:
@@ -288,27 +411,6 @@ async def process_instagram_url(update: Update, context: ContextTypes.DEFAULT_TY
                 file_size=file_size
             )
             
-            # Send the file
-            await processing_message.edit_text(
-                f"✅ عکس پروفایل با موفقیت دانلود شد!\n\n"
-                f"👤 کاربر: {result['username']}\n"
-                f"📝 نام: {result['full_name']}\n"
-                f"👥 دنبال‌کنندگان: {result['followers']}\n"
-                f"💾 حجم: {format_size(file_size)}\n\n"
-                "در حال ارسال فایل..."
-            )
-            
-            # Send profile picture
-            with open(result['file_path'], 'rb') as photo_file:
-                await update.message.reply_photo(
-                    photo=photo_file,
-                    caption=f"👤 عکس پروفایل {result['username']} ({result['full_name']})\n\n"
-                            f"👥 دنبال‌کنندگان: {result['followers']}\n"
-                            f"👣 دنبال‌شوندگان: {result['followees']}\n\n"
-                            f"📝 بیوگرافی: {result['biography'][:200] + '...' if len(result['biography']) > 200 else result['biography']}\n\n"
-                            f"دانلود شده توسط ربات Snexus"
-                )
-            
             # Final message
             keyboard = [
                 [InlineKeyboardButton("🔙 بازگشت به منوی اینستاگرام", callback_data="menu_instagram")]
@@ -323,8 +425,55 @@ async def process_instagram_url(update: Update, context: ContextTypes.DEFAULT_TY
                 reply_markup=InlineKeyboardMarkup(keyboard)
             )
     
+    except CircuitOpenError as e:
+        logger.warning(f"Instagram download rejected: {e}")
+        await processing_message.edit_text(platform_unavailable_text('instagram'))
     except Exception as e:
         logger.error(f"Error processing Instagram URL: {e}")
         await processing_message.edit_text(
             "❌ خطا در دانلود محتوا از اینستاگرام. لطفاً مجدداً تلاش کنید یا با پشتیبانی تماس بگیرید."
         )
+
+@router.prefix("instagram_audio_")
+async def handle_instagram_audio_callback(update: Update, context: ContextTypes.DEFAULT_TYPE, callback_data: str) -> None:
+    """Extract and send the audio of a previously sent Instagram video."""
+    query = update.callback_query
+    
+    payload = callback_payloads.resolve(callback_data, "instagram_audio_")
+    if not payload or not os.path.exists(payload['path']):
+        await query.message.reply_text(
+            "⌛ این فایل دیگر در دسترس نیست. لطفاً لینک را دوباره ارسال کنید."
+        )
+        return
+    
+    english_name, persian_name = AUDIO_SOURCE_NAMES.get(payload['kind'], AUDIO_SOURCE_NAMES['video'])
+    
+    try:
+        # Stream copy into M4A; falls back to MP3 only for non-AAC audio
+        audio_path = await asyncio.to_thread(instagram_service.extract_audio, payload['path'])
+        
+        if not audio_path:
+            await query.message.reply_text(
+                "❌ خطا در استخراج فایل صوتی. ممکن است این ویدیو صدا نداشته باشد."
+            )
+            return
+        
+        disk_janitor.mark_served(audio_path)
+        with open(audio_path, 'rb') as audio_file:
+            await query.message.reply_audio(
+                audio=audio_file,
+                title=f"Audio - {payload['owner']} {english_name}",
+                performer=payload['owner'],
+                caption=f"🎵 فایل صوتی {persian_name} اینستاگرام از {payload['owner']}\n\n"
+                        f"دانلود شده توسط ربات Snexus"
+            )
+    except Exception as e:
+        logger.error(f"Error sending Instagram audio: {e}")
+        await query.message.reply_text(
+            "❌ خطا در استخراج فایل صوتی. لطفاً مجدداً تلاش کنید."
+        )
+
+@on_startup
+async def notify_interrupted_instagram_downloads(application):
+    """Instaloader can't continue a cut-off download, so its requesters are asked to resend the link"""
+    await notify_interrupted_downloads(application, 'instagram')
@@ -0,0 +1,460 @@
+from functools import lru_cache
+from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
+from telegram.error import TelegramError
+from telegram.ext import ContextTypes
+from config.config import ADMIN_USER_IDS, ONE_MONTH_PRICE, THREE_MONTH_PRICE
+from utils.callback_router import router
+from utils.keyboards import build_static_markup
+from utils.metadata_cache import metadata_cache
+from utils.circuit_breaker import circuit_breakers
+from utils.disk_janitor import disk_janitor
+from utils.job_journal import job_journal
+from utils.helpers import format_size
+import logging
+
+logger = logging.getLogger(__name__)
+
+HELP_TEXT = (
+    "🔹 *راهنمای استفاده از ربات Snexus* 🔹\n\n"
+    "*دانلود موزیک:*\n"
+    "• لینک آهنگ یا پلی‌لیست از Spotify، Apple Music یا SoundCloud را ارسال کنید\n"
+    "• یا از دکمه «دانلود موزیک» استفاده کنید\n\n"
+
+    "*دانلود از یوتیوب:*\n"
+    "• لینک ویدیو یا پلی‌لیست یوتیوب را ارسال کنید\n"
+    "• کیفیت مورد نظر را انتخاب کنید\n\n"
+
+    "*دانلود از اینستاگرام:*\n"
+    "• لینک پست، ریلز، استوری یا پروفایل را ارسال کنید\n\n"
+
+    "*مدیریت پلی‌لیست:*\n"
+    "• با دستور /create_playlist پلی‌لیست جدید بسازید\n"
+    "• با دستور /my_playlists پلی‌لیست‌های خود را مشاهده کنید\n"
+    "• آهنگ‌ها را به پلی‌لیست اضافه کنید\n\n"
+
+    "*اشتراک VIP:*\n"
+    "• کاربران عادی: محدودیت دانلود روزانه 2 گیگابایت\n"
+    "• کاربران VIP: دانلود نامحدود و دسترسی به تمام قابلیت‌ها\n"
+    "• برای خرید اشتراک از دکمه «اشتراک VIP» استفاده کنید\n\n"
+
+    "*دستورات مفید:*\n"
+    "/start - شروع مجدد ربات\n"
+    "/help - نمایش این راهنما\n"
+    "/music - منوی دانلود موزیک\n"
+    "/youtube - منوی دانلود از یوتیوب\n"
+    "/instagram - منوی دانلود از اینستاگرام\n"
+    "/playlist - منوی مدیریت پلی‌لیست\n"
+    "/vip - اطلاعات و خرید اشتراک VIP"
+)
+
+# Platform names used in "temporarily unavailable" replies
+PLATFORM_NAMES = {
+    'instagram': 'اینستاگرام',
+    'youtube': 'یوتیوب',
+    'spotify': 'اسپاتیفای',
+    'soundcloud': 'ساندکلود'
+}
+
+def platform_unavailable_text(platform):
+    """Reply sent instead of starting a job while a platform's circuit breaker is open"""
+    return (
+        f"⚠️ {PLATFORM_NAMES.get(platform, platform)} در حال حاضر موقتاً در دسترس نیست.\n"
+        "لطفاً چند دقیقه دیگر دوباره تلاش کنید."
+    )
+
+def interrupted_download_text(url):
+    """Message sent at startup for a download the last shutdown cut off and that isn't resumed"""
+    return (
+        "⚠️ دانلود شما با راه‌اندازی مجدد ربات متوقف شد.\n\n"
+        f"🔗 {url}\n\n"
+        "لطفاً لینک را دوباره ارسال کنید."
+    )
+
+async def notify_interrupted_downloads(application, kind):
+    """Tell the requesters of a kind's downloads cut off by the last shutdown to send their links again.
+
+    Only YouTube downloads continue from their partial files; other kinds are
+    journaled just so their requesters hear about it instead of waiting forever.
+    """
+    for job in job_journal.interrupted(kind):
+        job_journal.finish(job['job_id'])
+        if not job['chat_id']:
+            continue
+        logger.info(f"Notifying chat {job['chat_id']} of an interrupted {kind} download")
+        try:
+            await application.bot.send_message(
+                chat_id=job['chat_id'], text=interrupted_download_text(job['payload']['url'])
+            )
+        except TelegramError as e:
+            logger.error(f"Error notifying chat {job['chat_id']} of an interrupted download: {e}")
+
+# Reply sent instead of starting a job while the disk is nearly full
+STORAGE_FULL_TEXT = (
+    "⚠️ فضای ذخیره‌سازی ربات در حال حاضر پر است.\n"
+    "لطفاً چند دقیقه دیگر دوباره تلاش کنید."
+)
+
+def is_admin_user(user_id, context: ContextTypes.DEFAULT_TYPE):
+    """Check if user is admin by config or database flag"""
+    if user_id in ADMIN_USER_IDS:
+        return True
+    user_model = context.bot_data.get('user_model')
+    return bool(user_model and user_model.is_admin(user_id))
+
+# Static menus are built once at import time and reused for every callback
+MAIN_MENU_ROWS = [
+    [("🎵 دانلود موزیک", "menu_music"), ("🎬 دانلود از یوتیوب", "menu_youtube")],
+    [("📱 دانلود از اینستاگرام", "menu_instagram"), ("📋 پلی‌لیست‌های من", "menu_playlists")],
+    [("⭐️ اشتراک VIP", "menu_vip"), ("❓ راهنما", "menu_help")]
+]
+MAIN_MENU = build_static_markup(MAIN_MENU_ROWS)
+MAIN_MENU_ADMIN = build_static_markup(MAIN_MENU_ROWS + [[("🔐 پنل مدیریت", "menu_admin")]])
+
+MUSIC_MENU = build_static_markup([
+    [("Spotify", "music_spotify"), ("Apple Music", "music_apple")],
+    [("SoundCloud", "music_soundcloud")],
+    [("🔙 بازگشت به منوی اصلی", "menu_main")]
+])
+
+YOUTUBE_MENU = build_static_markup([
+    [("🎬 دانلود ویدیو", "youtube_video"), ("🎵 دانلود صدا", "youtube_audio")],
+    [("📋 دانلود پلی‌لیست", "youtube_playlist")],
+    [("🔙 بازگشت به منوی اصلی", "menu_main")]
+])
+
+INSTAGRAM_MENU = build_static_markup([
+    [("📷 دانلود پست", "instagram_type_post"), ("📱 دانلود ریلز", "instagram_type_reel")],
+    [("🔄 دانلود استوری", "instagram_type_story"), ("👤 دانلود پروفایل", "instagram_type_profile")],
+    [("🔙 بازگشت به منوی اصلی", "menu_main")]
+])
+
+ADMIN_MENU = build_static_markup([
+    [("📊 آمار ربات", "admin_stats"), ("📣 ارسال پیام همگانی", "admin_broadcast")],
+    [("📱 مدیریت کانال‌های اجباری", "admin_channels")],
+    [("🔙 بازگشت به منوی اصلی", "menu_main")]
+])
+
+VIP_PLANS_MENU = build_static_markup([
+    [(f"یک ماهه - {ONE_MONTH_PRICE:,} تومان", "vip_1month")],
+    [(f"سه ماهه - {THREE_MONTH_PRICE:,} تومان", "vip_3month")],
+    [("🔙 بازگشت به منوی اصلی", "menu_main")]
+])
+
+def main_menu_keyboard(is_admin=False):
+    """Return the prebuilt main menu for admins or regular users"""
+    return MAIN_MENU_ADMIN if is_admin else MAIN_MENU
+
+@lru_cache(maxsize=64)
+def back_keyboard(callback_data, text="🔙 بازگشت"):
+    """Single back button keyboard (cached per target and label)"""
+    return build_static_markup([[(text, callback_data)]])
+
+@router.exact("menu_main")
+async def main_menu(update: Update, context: ContextTypes.DEFAULT_TYPE, callback_data: str = "menu_main") -> None:
+    """Show main menu."""
+    reply_markup = main_menu_keyboard(is_admin_user(update.effective_user.id, context))
+
+    await update.callback_query.message.edit_text(
+        f"سلام {update.effective_user.first_name}! به ربات Snexus خوش آمدید.\n\n"
+        "با این ربات می‌توانید:\n"
+        "• موزیک از پلتفرم‌های مختلف دانلود کنید\n"
+        "• ویدیو از یوتیوب دانلود کنید\n"
+        "• محتوا از اینستاگرام دانلود کنید\n"
+        "• پلی‌لیست‌های شخصی بسازید\n\n"
+        "لطفاً یکی از گزینه‌های زیر را انتخاب کنید:",
+        reply_markup=reply_markup
+    )
+
+@router.exact("menu_music")
+async def music_menu(update: Update, context: ContextTypes.DEFAULT_TYPE, callback_data: str) -> None:
+    """Show music download menu."""
+    await update.callback_query.message.edit_text(
+        "لطفاً پلتفرم موسیقی مورد نظر را انتخاب کنید یا مستقیماً لینک آهنگ را ارسال کنید:",
+        reply_markup=MUSIC_MENU
+    )
+
+@router.exact("menu_youtube")
+async def youtube_menu(update: Update, context: ContextTypes.DEFAULT_TYPE, callback_data: str) -> None:
+    """Show YouTube download menu."""
+    await update.callback_query.message.edit_text(
+        "لطفاً نوع دانلود از یوتیوب را انتخاب کنید یا مستقیماً لینک ویدیو را ارسال کنید:",
+        reply_markup=YOUTUBE_MENU
+    )
+
+@router.exact("menu_instagram")
+async def instagram_menu(update: Update, context: ContextTypes.DEFAULT_TYPE, callback_data: str) -> None:
+    """Show Instagram download menu."""
+    await update.callback_query.message.edit_text(
+        "لطفاً نوع دانلود از اینستاگرام را انتخاب کنید یا مستقیماً لینک محتوا را ارسال کنید:",
+        reply_markup=INSTAGRAM_MENU
+    )
+
+# Prompts shown after choosing a platform or download type: callback -> (text, back target)
+LINK_PROMPTS = {
+    'music_spotify': ("لطفاً لینک آهنگ یا پلی‌لیست Spotify را ارسال کنید.", "menu_music"),
+    'music_apple': ("لطفاً لینک آهنگ یا پلی‌لیست Apple Music را ارسال کنید.", "menu_music"),
+    'music_soundcloud': ("لطفاً لینک آهنگ یا پلی‌لیست SoundCloud را ارسال کنید.", "menu_music"),
+    'youtube_video': ("لطفاً لینک ویدیوی یوتیوب را ارسال کنید.", "menu_youtube"),
+    'youtube_playlist': ("لطفاً لینک پلی‌لیست یوتیوب را ارسال کنید.", "menu_youtube"),
+    'youtube_audio': ("لطفاً لینک ویدیوی یوتیوب را برای استخراج صدا ارسال کنید.", "menu_youtube"),
+    'playlist_create': ("برای ساخت پلی‌لیست جدید، لطفاً از دستور /create_playlist استفاده کنید و نام پلی‌لیست را وارد کنید.", "menu_playlists"),
+    'admin_broadcast': ("برای ارسال پیام به همه کاربران، لطفاً از دستور /broadcast استفاده کنید و متن پیام را وارد کنید.", "menu_admin"),
+}
+
+@router.exact(*LINK_PROMPTS)
+async def link_prompt(update: Update, context: ContextTypes.DEFAULT_TYPE, callback_data: str) -> None:
+    """Ask the user to send a link (or use a command) for the chosen option."""
+    text, back_to = LINK_PROMPTS[callback_data]
+    await update.callback_query.message.edit_text(text, reply_markup=back_keyboard(back_to))
+
+@router.prefix("instagram_type_")
+async def instagram_type_selected(update: Update, context: ContextTypes.DEFAULT_TYPE, callback_data: str) -> None:
+    """Handle Instagram content type selection."""
+    type_names = {
+        'post': 'پست',
+        'reel': 'ریلز',
+        'story': 'استوری',
+        'profile': 'پروفایل'
+    }
+
+    content_type = callback_data[len('instagram_type_'):]
+    type_name = type_names.get(content_type, content_type)
+
+    await update.callback_query.message.edit_text(
+        f"لطفاً لینک {type_name} اینستاگرام را ارسال کنید:",
+        reply_markup=back_keyboard("menu_instagram")
+    )
+
+@router.exact("menu_playlists")
+async def playlists_menu(update: Update, context: ContextTypes.DEFAULT_TYPE, callback_data: str) -> None:
+    """Show playlists menu."""
+    user_id = update.effective_user.id
+    playlist_model = context.bot_data.get('playlist_model')
+
+    # Get user's playlists
+    playlists = playlist_model.get_user_playlists(user_id) if playlist_model else []
+
+    keyboard = []
+
+    # Add playlist buttons
+    for playlist in playlists:
+        keyboard.append([InlineKeyboardButton(
+            f"🎵 {playlist['name']} ({playlist.get('song_count', 0)} آهنگ)",
+            callback_data=f"playlist_view_{playlist['id']}"
+        )])
+
+    # Add create playlist button
+    keyboard.append([InlineKeyboardButton("➕ ساخت پلی‌لیست جدید", callback_data="playlist_create")])
+
+    # Add back button
+    keyboard.append([InlineKeyboardButton("🔙 بازگشت به منوی اصلی", callback_data="menu_main")])
+
+    await update.callback_query.message.edit_text(
+        "پلی‌لیست‌های شما:\n\n"
+        "برای ساخت پلی‌لیست جدید، از دکمه زیر یا دستور /create_playlist استفاده کنید.\n"
+        "برای مشاهده پلی‌لیست، روی آن کلیک کنید.",
+        reply_markup=InlineKeyboardMarkup(keyboard)
+    )
+
+@router.prefix("playlist_view_")
+async def view_playlist(update: Update, context: ContextTypes.DEFAULT_TYPE, callback_data: str) -> None:
+    """Show playlist contents."""
+    playlist_id = callback_data[len('playlist_view_'):]
+    user_id = update.effective_user.id
+    playlist_model = context.bot_data.get('playlist_model')
+    song_model = context.bot_data.get('song_model')
+
+    # Get playlist info
+    playlist = playlist_model.get_playlist(playlist_id) if playlist_model else None
+
+    if not playlist or playlist['user_id'] != user_id:
+        await update.callback_query.message.edit_text(
+            "پلی‌لیست مورد نظر یافت نشد یا شما دسترسی به آن ندارید.",
+            reply_markup=back_keyboard("menu_playlists")
+        )
+        return
+
+    # Get songs in playlist
+    songs = song_model.get_playlist_songs(playlist_id) if song_model else []
+
+    # Create message text
+    message_text = f"🎵 پلی‌لیست: {playlist['name']}\n\n"
+
+    if songs:
+        for i, song in enumerate(songs, 1):
+            message_text += f"{i}. {song['title']} - {song['artist']}\n"
+    else:
+        message_text += "این پلی‌لیست خالی است. برای افزودن آهنگ، هنگام دانلود موزیک، گزینه «افزودن به پلی‌لیست» را انتخاب کنید."
+
+    await update.callback_query.message.edit_text(
+        message_text,
+        reply_markup=back_keyboard("menu_playlists", "🔙 بازگشت به پلی‌لیست‌ها")
+    )
+
+@router.exact("menu_vip")
+async def vip_menu(update: Update, context: ContextTypes.DEFAULT_TYPE, callback_data: str) -> None:
+    """Show VIP subscription menu."""
+    user_id = update.effective_user.id
+    vip_model = context.bot_data.get('vip_model')
+
+    # Check if user is already VIP
+    is_vip = vip_model.is_vip(user_id) if vip_model else False
+    vip_info = vip_model.get_vip_info(user_id) if is_vip else None
+
+    if not vip_info:
+        # Show VIP plans (also the fallback if VIP info is not found)
+        await show_vip_plans(update, context)
+        return
+
+    message_text = (
+        "⭐️ شما کاربر VIP هستید! ⭐️\n\n"
+        f"تاریخ شروع: {vip_info['start_date']}\n"
+        f"تاریخ پایان: {vip_info['end_date']}\n\n"
+        "مزایای اشتراک VIP:\n"
+        "• دانلود نامحدود (بدون محدودیت حجم روزانه)\n"
+        "• دسترسی به تمام قابلیت‌های ربات\n"
+        "• اولویت در پشتیبانی\n\n"
+        "از حمایت شما متشکریم! 🙏"
+    )
+
+    await update.callback_query.message.edit_text(
+        message_text,
+        reply_markup=back_keyboard("menu_main", "🔙 بازگشت به منوی اصلی")
+    )
+
+async def show_vip_plans(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Show VIP subscription plans."""
+    message_text = (
+        "⭐️ اشتراک VIP ⭐️\n\n"
+        "با خرید اشتراک VIP از مزایای زیر بهره‌مند شوید:\n"
+        "• دانلود نامحدود (بدون محدودیت حجم روزانه)\n"
+        "• دسترسی به تمام قابلیت‌های ربات\n"
+        "• اولویت در پشتیبانی\n\n"
+        "📋 پلن‌های اشتراک:"
+    )
+
+    await update.callback_query.message.edit_text(
+        message_text,
+        reply_markup=VIP_PLANS_MENU
+    )
+
+@router.exact("menu_help")
+async def help_menu(update: Update, context: ContextTypes.DEFAULT_TYPE, callback_data: str) -> None:
+    """Show help menu."""
+    await update.callback_query.message.edit_text(
+        HELP_TEXT,
+        reply_markup=back_keyboard("menu_main", "🔙 بازگشت به منوی اصلی"),
+        parse_mode='Markdown'
+    )
+
+@router.exact("menu_admin")
+async def admin_menu(update: Update, context: ContextTypes.DEFAULT_TYPE, callback_data: str) -> None:
+    """Show admin menu."""
+    if not is_admin_user(update.effective_user.id, context):
+        await update.callback_query.message.edit_text(
+            "شما دسترسی به پنل مدیریت ندارید.",
+            reply_markup=back_keyboard("menu_main")
+        )
+        return
+
+    await update.callback_query.message.edit_text(
+        "🔐 پنل مدیریت\n\n"
+        "لطفاً یکی از گزینه‌های زیر را انتخاب کنید:",
+        reply_markup=ADMIN_MENU
+    )
+
+@router.exact("admin_stats")
+async def show_stats(update: Update, context: ContextTypes.DEFAULT_TYPE, callback_data: str) -> None:
+    """Show bot statistics."""
+    if not is_admin_user(update.effective_user.id, context):
+        return
+
+    user_model = context.bot_data.get('user_model')
+    download_model = context.bot_data.get('download_model')
+    vip_model = context.bot_data.get('vip_model')
+
+    # Get statistics
+    total_users = user_model.get_total_users() if user_model else 0
+    active_users = user_model.get_active_users_count() if user_model else 0
+    total_downloads = download_model.get_total_downloads() if download_model else 0
+    total_vip_users = vip_model.get_total_vip_users() if vip_model else 0
+
+    message_text = (
+        "📊 آمار ربات\n\n"
+        f"👥 کاربران: {total_users}\n"
+        f"👤 کاربران فعال: {active_users}\n"
+        f"⭐️ کاربران VIP: {total_vip_users}\n"
+        f"📥 تعداد دانلودها: {total_downloads}\n"
+    )
+
+    # Add update queue metrics when the per-user processor is in use
+    update_processor = context.application.update_processor
+    if hasattr(update_processor, 'get_stats'):
+        queue_stats = update_processor.get_stats()
+        message_text += (
+            f"\n⚙️ در حال پردازش: {queue_stats['running']}/{queue_stats['concurrency_limit']}\n"
+            f"⏳ در صف: {queue_stats['queued']} (بیشینه: {queue_stats['max_pending']})\n"
+        )
+
+    # Extraction cache effectiveness
+    cache_stats = metadata_cache.get_stats()
+    message_text += (
+        f"\n🗂 کش متادیتا: {cache_stats['memory_entries']} در حافظه، {cache_stats['disk_entries']} روی دیسک\n"
+        f"🎯 نرخ برخورد کش: {cache_stats['hit_rate']:.0%}\n"
+    )
+
+    # Platforms currently skipped by their circuit breakers
+    open_circuits = [name for name, stats in circuit_breakers.get_stats().items() if stats['state'] != 'closed']
+    if open_circuits:
+        message_text += f"\n🚧 پلتفرم‌های از دسترس خارج: {', '.join(PLATFORM_NAMES.get(name, name) for name in open_circuits)}\n"
+
+    # Downloads directory housekeeping
+    disk_stats = disk_janitor.get_stats()
+    if disk_stats['used_ratio'] is not None:
+        message_text += (
+            f"\n💽 فضای اشغال‌شده دیسک: {disk_stats['used_ratio']:.0%} (آزاد: {format_size(disk_stats['free_bytes'])})\n"
+            f"🧹 فضای آزادشده: {format_size(disk_stats['bytes_reclaimed'])} "
+            f"({disk_stats['files_evicted']} فایل، {disk_stats['stale_removed']} فایل ناقص)\n"
+        )
+
+    await update.callback_query.message.edit_text(
+        message_text,
+        reply_markup=back_keyboard("menu_admin", "🔙 بازگشت به پنل مدیریت")
+    )
+
+@router.exact("check_membership")
+async def check_user_membership(update: Update, context: ContextTypes.DEFAULT_TYPE, callback_data: str) -> None:
+    """Check if user has joined required channels."""
+    user = update.effective_user
+    channel_model = context.bot_data.get('channel_model')
+
+    # Get required channels
+    required_channels = channel_model.get_all_channels() if channel_model else []
+
+    # Check if user is member of all required channels
+    all_joined = True
+    channels_keyboard = []
+
+    for channel in required_channels:
+        try:
+            member = await context.bot.get_chat_member(chat_id=channel['channel_id'], user_id=user.id)
+            if member.status in ['left', 'kicked', 'restricted']:
+                all_joined = False
+                channels_keyboard.append([
+                    InlineKeyboardButton(text=f"عضویت در {channel['channel_name']}", url=channel['channel_url'])
+                ])
+        except Exception as e:
+            # Bot might not be admin in the channel or channel might not exist
+            logger.error(f"Error checking membership: {e}")
+            continue
+
+    if not all_joined:
+        channels_keyboard.append([InlineKeyboardButton(text="بررسی مجدد عضویت", callback_data="check_membership")])
+
+        await update.callback_query.message.edit_text(
+            "برای استفاده از ربات، لطفا در کانال‌های زیر عضو شوید:",
+            reply_markup=InlineKeyboardMarkup(channels_keyboard)
+        )
+    else:
+        # No required channels or all joined, show main menu
+        await main_menu(update, context)
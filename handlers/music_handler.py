@@ -1,36 +1,37 @@
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import ContextTypes
 import os
+import asyncio
 from models.models import User, VIPSubscription, Song, DownloadHistory
 from utils.helpers import extract_platform_from_url, is_playlist_url, create_download_dir, format_size, get_file_size
 from config.config import DOWNLOAD_DIR, DAILY_DOWNLOAD_LIMIT_MB
 from services.music_service import MusicDownloadService
+from services.playlist_service import PlaylistService
+from handlers.menu_handler import MUSIC_MENU, STORAGE_FULL_TEXT, platform_unavailable_text, notify_interrupted_downloads
+from utils.circuit_breaker import circuit_breakers
+from utils.rate_governor import rate_governor
+from utils.disk_janitor import disk_janitor
+from utils.payload_store import callback_payloads
+from utils.callback_router import router
+from utils.job_journal import job_journal
+from utils.bot_runner import on_startup
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Upstreams each music platform's downloads depend on (Spotify and Apple Music tracks come from YouTube)
+PLATFORM_UPSTREAMS = {
+    'spotify': ('spotify', 'youtube'),
+    'apple_music': ('youtube',),
+    'soundcloud': ('soundcloud',)
+}
+
 # Initialize music download service
 music_service = MusicDownloadService()
 
 async def music_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Handle the /music command."""
-    keyboard = [
-        [
-            InlineKeyboardButton("Spotify", callback_data="music_platform_spotify"),
-            InlineKeyboardButton("Apple Music", callback_data="music_platform_apple")
-        ],
-        [
-            InlineKeyboardButton("SoundCloud", callback_data="music_platform_soundcloud"),
-            InlineKeyboardButton("YouTube Music", callback_data="music_platform_youtube_music")
-        ],
-        [
-            InlineKeyboardButton("🔥 آهنگ‌های محبوب", callback_data="music_popular"),
-            InlineKeyboardButton("🆕 آهنگ‌های جدید", callback_data="music_new")
-        ],
-        [InlineKeyboardButton("🔙 بازگشت به منوی اصلی", callback_data="menu_main")]
-    ]
-    
-    reply_markup = InlineKeyboardMarkup(keyboard)
+    reply_markup = MUSIC_MENU
     
     await update.message.reply_text(
         "لطفاً پلتفرم موسیقی مورد نظر خود را انتخاب کنید یا لینک آهنگ/پلی‌لیست را مستقیماً ارسال کنید:",
@@ -85,6 +86,16 @@ async def process_music_url(update: Update, context: ContextTypes.DEFAULT_TYPE)
         )
         return
     
+    # Fail fast while a platform the download needs is failing for everyone
+    unavailable = circuit_breakers.first_open(*PLATFORM_UPSTREAMS.get(platform, ()))
+    if unavailable:
+        await update.message.reply_text(platform_unavailable_text(unavailable))
+        return
+    
+    if disk_janitor.admission_paused():
+        await update.message.reply_text(STORAGE_FULL_TEXT)
+        return
+    
     # Check if it's a playlist
     is_playlist = is_playlist_url(url, platform)
     
@@ -96,7 +107,18 @@ async def process_music_url(update: Update, context: ContextTypes.DEFAULT_TYPE)
     
     try:
         # Download music
-        result = music_service.download_from_url(url, user_id, DOWNLOAD_DIR)
+        # Download in a worker thread so other users' updates keep flowing; the rate limit tokens are waited for here, not in the thread
+        # Journaled so a restart mid-download tells the user to send the link again
+        job_id = job_journal.start('music', {'url': url}, user_id=user_id, chat_id=update.effective_chat.id)
+        try:
+            await rate_governor.wait_ready(*PLATFORM_UPSTREAMS.get(platform, ()))
+            result = await asyncio.to_thread(music_service.download_from_url, url, user_id, DOWNLOAD_DIR)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            job_journal.finish(job_id)
+            raise
+        job_journal.finish(job_id)
         
         if not result:
             await processing_message.edit_text(
@@ -148,6 +170,7 @@ async def process_music_url(update: Update, context: ContextTypes.DEFAULT_TYPE)
             )
             
             # Send audio file
+            disk_janitor.mark_served(result['file_path'])
             with open(result['file_path'], 'rb') as audio_file:
                 await update.message.reply_audio(
                     audio=audio_file,
@@ -173,14 +196,17 @@ async def process_music_url(update: Update, context: ContextTypes.DEFAULT_TYPE)
         elif result['type'] == 'playlist':
             # Process playlist
             total_size = 0
+            song_ids = []
             for track in result['tracks']:
                 file_size = get_file_size(track['file_path'])
                 total_size += file_size
                 
                 # Add song to database
                 existing_song = song_model.get_song_by_url(url + f"/{track['name']}")  # Approximate URL
-                if not existing_song:
-                    song_model.create_song(
+                if existing_song:
+                    song_ids.append(existing_song['id'])
+                else:
+                    song_id = song_model.create_song(
                         title=track['name'],
                         artist=track['artist'],
                         platform=platform,
@@ -188,6 +214,8 @@ async def process_music_url(update: Update, context: ContextTypes.DEFAULT_TYPE)
                         file_path=track['file_path'],
                         language='other'  # Default language
                     )
+                    if song_id:
+                        song_ids.append(song_id)
             
             # Update user's download usage
             if total_size > 0:
@@ -212,6 +240,7 @@ async def process_music_url(update: Update, context: ContextTypes.DEFAULT_TYPE)
             
             # Send audio files
             for track in result['tracks']:
+                disk_janitor.mark_served(track['file_path'])
                 with open(track['file_path'], 'rb') as audio_file:
                     await update.message.reply_audio(
                         audio=audio_file,
@@ -222,7 +251,7 @@ async def process_music_url(update: Update, context: ContextTypes.DEFAULT_TYPE)
             
             # Create playlist button
             keyboard = [
-                [InlineKeyboardButton("➕ ایجاد پلی‌لیست از این آهنگ‌ها", callback_data=f"create_playlist_from_{url}")],
+                [InlineKeyboardButton("➕ ایجاد پلی‌لیست از این آهنگ‌ها", callback_data=callback_payloads.callback_data("create_playlist_from_", {'name': result['name'], 'song_ids': song_ids}))],
                 [InlineKeyboardButton("🔙 بازگشت به منوی موسیقی", callback_data="menu_music")]
             ]
             
@@ -239,3 +268,42 @@ async def process_music_url(update: Update, context: ContextTypes.DEFAULT_TYPE)
         await processing_message.edit_text(
             "❌ خطا در دانلود موسیقی. لطفاً مجدداً تلاش کنید یا با پشتیبانی تماس بگیرید."
         )
+
+@router.prefix("create_playlist_from_")
+async def handle_create_playlist_from_callback(update: Update, context: ContextTypes.DEFAULT_TYPE, callback_data: str) -> None:
+    """Save the tracks of a downloaded music playlist as one of the user's playlists."""
+    query = update.callback_query
+    user_id = update.effective_user.id
+    
+    payload = callback_payloads.resolve(callback_data, "create_playlist_from_")
+    if not payload:
+        await query.edit_message_text(
+            "⌛ این دکمه منقضی شده است. لطفاً لینک پلی‌لیست را دوباره ارسال کنید.",
+            reply_markup=MUSIC_MENU
+        )
+        return
+    
+    db = context.bot_data.get('db')
+    playlist = PlaylistService(db).create_playlist_from_songs(user_id, payload['name'], payload['song_ids'])
+    
+    if not playlist:
+        await query.edit_message_text(
+            "❌ خطا در ایجاد پلی‌لیست. لطفاً مجدداً تلاش کنید.",
+            reply_markup=MUSIC_MENU
+        )
+        return
+    
+    keyboard = [
+        [InlineKeyboardButton("مشاهده پلی‌لیست", callback_data=f"playlist_view_{playlist['id']}")],
+        [InlineKeyboardButton("🔙 بازگشت به منوی موسیقی", callback_data="menu_music")]
+    ]
+    
+    await query.edit_message_text(
+        f"✅ پلی‌لیست «{playlist['name']}» با {playlist['songs_count']} آهنگ ایجاد شد.",
+        reply_markup=InlineKeyboardMarkup(keyboard)
+    )
+
+@on_startup
+async def notify_interrupted_music_downloads(application):
+    """Music and playlist downloads restart from scratch, so their requesters are asked to resend the link"""
+    await notify_interrupted_downloads(application, 'music')
@@ -5,6 +5,8 @@ from models.models import User, VIPSubscription, Song, Playlist
 from utils.helpers import create_download_dir, format_size
 from config.config import DOWNLOAD_DIR
 from services.playlist_service import PlaylistService
+from utils.callback_router import router
+from utils.disk_janitor import disk_janitor
 import logging
 
 logger = logging.getLogger(__name__)
@@ -146,6 +148,7 @@ async def view_playlists_handler(update: Update, context: ContextTypes.DEFAULT_T
         parse_mode='Markdown'
     )
 
+@router.prefix("playlist_download_", "playlist_share_", "playlist_delete_", "add_to_playlist_", "add_song_", answer=False)
 async def handle_playlist_callback(update: Update, context: ContextTypes.DEFAULT_TYPE, callback_data: str) -> None:
     """Handle playlist-related callback queries."""
     query = update.callback_query
@@ -157,6 +160,7 @@ async def handle_playlist_callback(update: Update, context: ContextTypes.DEFAULT
     
     if callback_data == "playlist_create":
         # Show playlist creation form
+        await query.answer()
         await query.message.edit_text(
             "🎵 *ایجاد پلی‌لیست جدید*\n\n"
             "برای ایجاد پلی‌لیست جدید، از دستور زیر استفاده کنید:\n"
@@ -207,6 +211,7 @@ async def handle_playlist_callback(update: Update, context: ContextTypes.DEFAULT
         keyboard.append([InlineKeyboardButton("❌ حذف پلی‌لیست", callback_data=f"playlist_delete_{playlist_id}")])
         keyboard.append([InlineKeyboardButton("🔙 بازگشت به لیست پلی‌لیست‌ها", callback_data="menu_playlists")])
         
+        await query.answer()
         await query.message.edit_text(
             message,
             reply_markup=InlineKeyboardMarkup(keyboard),
@@ -228,6 +233,7 @@ async def handle_playlist_callback(update: Update, context: ContextTypes.DEFAULT
             return
         
         # Send message
+        await query.answer()
         await query.message.edit_text(
             f"🎵 در حال ارسال آهنگ‌های پلی‌لیست «{playlist['name']}»...\n"
             f"تعداد آهنگ‌ها: {playlist['songs_count']}"
@@ -236,6 +242,7 @@ async def handle_playlist_callback(update: Update, context: ContextTypes.DEFAULT
         # Send each song
         for song in playlist['songs']:
             if os.path.exists(song['file_path']):
+                disk_janitor.mark_served(song['file_path'])
                 with open(song['file_path'], 'rb') as audio_file:
                     await context.bot.send_audio(
                         chat_id=user_id,
@@ -297,24 +304,6 @@ async def handle_playlist_callback(update: Update, context: ContextTypes.DEFAULT
         # Answer query
         await query.answer("✅ پلی‌لیست با موفقیت اشتراک‌گذاری شد.")
     
-    elif callback_data.startswith("playlist_delete_"):
-        # Delete playlist
-        playlist_id = int(callback_data.split("_")[-1])
-        
-        # Confirm deletion
-        keyboard = [
-            [
-                InlineKeyboardButton("✅ بله، حذف شود", callback_data=f"playlist_delete_confirm_{playlist_id}"),
-                InlineKeyboardButton("❌ خیر", callback_data=f"playlist_view_{playlist_id}")
-            ]
-        ]
-        
-        await query.message.edit_text(
-            "⚠️ آیا از حذف این پلی‌لیست اطمینان دارید؟\n"
-            "این عملیات غیرقابل بازگشت است.",
-            reply_markup=InlineKeyboardMarkup(keyboard)
-        )
-    
     elif callback_data.startswith("playlist_delete_confirm_"):
         # Confirm playlist deletion
         playlist_id = int(callback_data.split("_")[-1])
@@ -327,6 +316,7 @@ async def handle_playlist_callback(update: Update, context: ContextTypes.DEFAULT
                 [InlineKeyboardButton("🔙 بازگشت به لیست پلی‌لیست‌ها", callback_data="menu_playlists")]
             ]
             
+            await query.answer()
             await query.message.edit_text(
                 "✅ پلی‌لیست با موفقیت حذف شد.",
                 reply_markup=InlineKeyboardMarkup(keyboard)
@@ -334,6 +324,25 @@ async def handle_playlist_callback(update: Update, context: ContextTypes.DEFAULT
         else:
             await query.answer("❌ خطا در حذف پلی‌لیست.")
     
+    elif callback_data.startswith("playlist_delete_"):
+        # Delete playlist
+        playlist_id = int(callback_data.split("_")[-1])
+        
+        # Confirm deletion
+        keyboard = [
+            [
+                InlineKeyboardButton("✅ بله، حذف شود", callback_data=f"playlist_delete_confirm_{playlist_id}"),
+                InlineKeyboardButton("❌ خیر", callback_data=f"playlist_view_{playlist_id}")
+            ]
+        ]
+        
+        await query.answer()
+        await query.message.edit_text(
+            "⚠️ آیا از حذف این پلی‌لیست اطمینان دارید؟\n"
+            "این عملیات غیرقابل بازگشت است.",
+            reply_markup=InlineKeyboardMarkup(keyboard)
+        )
+    
     elif callback_data.startswith("add_to_playlist_"):
         # Add song to playlist
         song_id = int(callback_data.split("_")[-1])
@@ -348,6 +357,7 @@ async def handle_playlist_callback(update: Update, context: ContextTypes.DEFAULT
                 [InlineKeyboardButton("🔙 بازگشت", callback_data="menu_main")]
             ]
             
+            await query.answer()
             await query.message.edit_text(
                 "❌ شما هنوز هیچ پلی‌لیستی ندارید.\n"
                 "برای افزودن آهنگ به پلی‌لیست، ابتدا یک پلی‌لیست ایجاد کنید:",
@@ -367,6 +377,7 @@ async def handle_playlist_callback(update: Update, context: ContextTypes.DEFAULT
         
         keyboard.append([InlineKeyboardButton("🔙 بازگشت", callback_data="menu_main")])
         
+        await query.answer()
         await query.message.edit_text(
             "🎵 *افزودن به پلی‌لیست*\n\n"
             "لطفاً پلی‌لیست مورد نظر خود را انتخاب کنید:",
@@ -393,6 +404,7 @@ async def handle_playlist_callback(update: Update, context: ContextTypes.DEFAULT
                 [InlineKeyboardButton("🔙 بازگشت به منوی اصلی", callback_data="menu_main")]
             ]
             
+            await query.answer()
             await query.message.edit_text(
                 f"✅ آهنگ با موفقیت به پلی‌لیست «{playlist_name}» اضافه شد.",
                 reply_markup=InlineKeyboardMarkup(keyboard)
@@ -2,6 +2,7 @@ from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import ContextTypes
 from models.models import User, RequiredChannel
 from config.config import ADMIN_USER_IDS
+from handlers.menu_handler import HELP_TEXT, main_menu_keyboard, back_keyboard, is_admin_user
 
 async def start_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Handle the /start command."""
@@ -51,26 +52,7 @@ async def start_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) -> N
             return
     
     # Main menu keyboard
-    keyboard = [
-        [
-            InlineKeyboardButton("🎵 دانلود موزیک", callback_data="menu_music"),
-            InlineKeyboardButton("🎬 دانلود از یوتیوب", callback_data="menu_youtube")
-        ],
-        [
-            InlineKeyboardButton("📱 دانلود از اینستاگرام", callback_data="menu_instagram"),
-            InlineKeyboardButton("📋 پلی‌لیست‌های من", callback_data="menu_playlists")
-        ],
-        [
-            InlineKeyboardButton("⭐️ اشتراک VIP", callback_data="menu_vip"),
-            InlineKeyboardButton("❓ راهنما", callback_data="menu_help")
-        ]
-    ]
-    
-    # Add admin button if user is admin
-    if user_model.is_admin(user.id):
-        keyboard.append([InlineKeyboardButton("🔐 پنل مدیریت", callback_data="menu_admin")])
-    
-    reply_markup = InlineKeyboardMarkup(keyboard)
+    reply_markup = main_menu_keyboard(is_admin_user(user.id, context))
     
     await update.message.reply_text(
         f"سلام {user.first_name}! به ربات Snexus خوش آمدید.\n\n"
@@ -85,44 +67,10 @@ async def start_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) -> N
 
 async def help_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Handle the /help command."""
-    help_text = (
-        "🔹 *راهنمای استفاده از ربات Snexus* 🔹\n\n"
-        "*دانلود موزیک:*\n"
-        "• لینک آهنگ یا پلی‌لیست از Spotify، Apple Music یا SoundCloud را ارسال کنید\n"
-        "• یا از دکمه «دانلود موزیک» استفاده کنید\n\n"
-        
-        "*دانلود از یوتیوب:*\n"
-        "• لینک ویدیو یا پلی‌لیست یوتیوب را ارسال کنید\n"
-        "• کیفیت مورد نظر را انتخاب کنید\n\n"
-        
-        "*دانلود از اینستاگرام:*\n"
-        "• لینک پست، ریلز، استوری یا پروفایل را ارسال کنید\n\n"
-        
-        "*مدیریت پلی‌لیست:*\n"
-        "• با دستور /create_playlist پلی‌لیست جدید بسازید\n"
-        "• با دستور /my_playlists پلی‌لیست‌های خود را مشاهده کنید\n"
-        "• آهنگ‌ها را به پلی‌لیست اضافه کنید\n\n"
-        
-        "*اشتراک VIP:*\n"
-        "• کاربران عادی: محدودیت دانلود روزانه 2 گیگابایت\n"
-        "• کاربران VIP: دانلود نامحدود و دسترسی به تمام قابلیت‌ها\n"
-        "• برای خرید اشتراک از دکمه «اشتراک VIP» استفاده کنید\n\n"
-        
-        "*دستورات مفید:*\n"
-        "/start - شروع مجدد ربات\n"
-        "/help - نمایش این راهنما\n"
-        "/music - منوی دانلود موزیک\n"
-        "/youtube - منوی دانلود از یوتیوب\n"
-        "/instagram - منوی دانلود از اینستاگرام\n"
-        "/playlist - منوی مدیریت پلی‌لیست\n"
-        "/vip - اطلاعات و خرید اشتراک VIP"
-    )
-    
-    keyboard = [[InlineKeyboardButton("🔙 بازگشت به منوی اصلی", callback_data="menu_main")]]
-    reply_markup = InlineKeyboardMarkup(keyboard)
+    reply_markup = back_keyboard("menu_main", "🔙 بازگشت به منوی اصلی")
     
     await update.message.reply_text(
-        help_text,
+        HELP_TEXT,
         reply_markup=reply_markup,
         parse_mode='Markdown'
     )
@@ -4,6 +4,7 @@ import datetime
 from models.models import User, VIPSubscription
 from config.config import ONE_MONTH_PRICE, THREE_MONTH_PRICE, PAYMENT_CARD_NUMBER, PAYMENT_CARD_OWNER
 from services.vip_service import VIPService
+from utils.callback_router import router
 import logging
 
 logger = logging.getLogger(__name__)
@@ -175,6 +176,8 @@ async def handle_payment_confirmation(update: Update, context: ContextTypes.DEFA
             "❌ خطا در فعال‌سازی اشتراک VIP. لطفاً مجدداً تلاش کنید یا با پشتیبانی تماس بگیرید."
         )
 
+@router.exact("menu_vip_extend")
+@router.prefix("vip_extend_", "payment_done_")
 async def handle_vip_callback(update: Update, context: ContextTypes.DEFAULT_TYPE, callback_data: str) -> None:
     """Handle VIP-related callback queries."""
     query = update.callback_query
@@ -207,3 +210,14 @@ async def handle_vip_callback(update: Update, context: ContextTypes.DEFAULT_TYPE
     elif callback_data.startswith("payment_done_"):
         # Handle payment confirmation
         await handle_payment_confirmation(update, context, callback_data)
+
+# Plan buttons shown in the VIP menu: callback -> subscription type
+VIP_PLAN_CALLBACKS = {
+    'vip_1month': 'one_month',
+    'vip_3month': 'three_month'
+}
+
+@router.exact(*VIP_PLAN_CALLBACKS)
+async def handle_vip_plan_callback(update: Update, context: ContextTypes.DEFAULT_TYPE, callback_data: str) -> None:
+    """Handle VIP plan selection."""
+    await process_vip_payment(update, context, VIP_PLAN_CALLBACKS[callback_data])
@@ -1,14 +1,33 @@
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import ContextTypes
+from telegram.error import TelegramError
 import os
-import yt_dlp
+import asyncio
 from models.models import User, VIPSubscription, Song, DownloadHistory
 from utils.helpers import create_download_dir, sanitize_filename, format_size, get_file_size
-from config.config import DOWNLOAD_DIR, DAILY_DOWNLOAD_LIMIT_MB
+from config.config import (
+    DOWNLOAD_DIR, DAILY_DOWNLOAD_LIMIT_MB, RESUME_INTERRUPTED_DOWNLOADS, RESUME_MAX_ATTEMPTS, RESUME_CONCURRENCY,
+    YOUTUBE_PLAYLIST_MAX_VIDEOS
+)
+from handlers.menu_handler import YOUTUBE_MENU, STORAGE_FULL_TEXT, platform_unavailable_text
+from utils.circuit_breaker import circuit_breakers, CircuitOpenError
+from utils.rate_governor import rate_governor
+from utils.payload_store import callback_payloads
+from utils.callback_router import router
+from utils.job_journal import job_journal
+from utils.disk_janitor import disk_janitor
+from utils.bot_runner import on_startup, start_background_task
+from services.youtube_service import YouTubeDownloader
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Initialize YouTube service
+youtube_service = YouTubeDownloader()
+
+# Format used for playlist video downloads: the best stream up to 720p, with audio merged in
+PLAYLIST_VIDEO_FORMAT = "video_bv*[height<=720]"
+
 async def youtube_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Handle the /youtube command."""
     # Check if URL is already in context (redirected from another handler)
@@ -18,18 +37,7 @@ async def youtube_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
         await process_youtube_url(update, context, youtube_url)
         return
     
-    keyboard = [
-        [
-            InlineKeyboardButton("🎵 دانلود موزیک", callback_data="youtube_type_audio"),
-            InlineKeyboardButton("🎬 دانلود ویدیو", callback_data="youtube_type_video")
-        ],
-        [
-            InlineKeyboardButton("📋 دانلود پلی‌لیست", callback_data="youtube_type_playlist"),
-        ],
-        [InlineKeyboardButton("🔙 بازگشت به منوی اصلی", callback_data="menu_main")]
-    ]
-    
-    reply_markup = InlineKeyboardMarkup(keyboard)
+    reply_markup = YOUTUBE_MENU
     
     await update.message.reply_text(
         "لطفاً لینک ویدیو یا پلی‌لیست یوتیوب را ارسال کنید یا نوع دانلود را انتخاب کنید:",
@@ -83,6 +91,15 @@ async def process_youtube_url(update: Update, context: ContextTypes.DEFAULT_TYPE
         )
         return
     
+    # Fail fast while YouTube is failing for everyone
+    if circuit_breakers.first_open('youtube'):
+        await update.message.reply_text(platform_unavailable_text('youtube'))
+        return
+    
+    if disk_janitor.admission_paused():
+        await update.message.reply_text(STORAGE_FULL_TEXT)
+        return
+    
     # Send initial message
     processing_message = await update.message.reply_text(
         "در حال دریافت اطلاعات ویدیو از یوتیوب...\n"
@@ -94,87 +111,346 @@ async def process_youtube_url(update: Update, context: ContextTypes.DEFAULT_TYPE
         user_download_dir = create_download_dir(DOWNLOAD_DIR, user_id)
         
         # Get video info
-        ydl_opts = {
-            'quiet': True,
-            'no_warnings': True,
-            'skip_download': True,
-            'format': 'best',
-        }
+        # Extract in a worker thread so other users' updates keep flowing; the rate limit token is waited for here, not in the thread
+        await rate_governor.wait_ready('youtube')
+        info = await asyncio.to_thread(youtube_service.get_video_info, url)
         
-        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-            info = ydl.extract_info(url, download=False)
+        # Check if it's a playlist
+        if 'entries' in info:
+            # It's a playlist
+            await processing_message.edit_text(
+                f"پلی‌لیست یافت شد: {info.get('title', 'بدون عنوان')}\n"
+                f"تعداد ویدیوها: {len(info['entries'])}\n\n"
+                "لطفاً نوع دانلود را انتخاب کنید:"
+            )
             
-            # Check if it's a playlist
-            if 'entries' in info:
-                # It's a playlist
-                await processing_message.edit_text(
-                    f"پلی‌لیست یافت شد: {info.get('title', 'بدون عنوان')}\n"
-                    f"تعداد ویدیوها: {len(info['entries'])}\n\n"
-                    "لطفاً نوع دانلود را انتخاب کنید:"
-                )
-                
-                keyboard = [
-                    [
-                        InlineKeyboardButton("🎵 دانلود صوتی", callback_data=f"youtube_playlist_audio_{url}"),
-                        InlineKeyboardButton("🎬 دانلود ویدیویی", callback_data=f"youtube_playlist_video_{url}")
-                    ],
-                    [InlineKeyboardButton("🔙 بازگشت", callback_data="menu_youtube")]
-                ]
+            keyboard = [
+                [
+                    InlineKeyboardButton("🎵 دانلود صوتی", callback_data=callback_payloads.callback_data("youtube_playlist_audio_", {'url': url})),
+                    InlineKeyboardButton("🎬 دانلود ویدیویی", callback_data=callback_payloads.callback_data("youtube_playlist_video_", {'url': url}))
+                ],
+                [InlineKeyboardButton("🔙 بازگشت", callback_data="menu_youtube")]
+            ]
+            
+            await processing_message.edit_reply_markup(InlineKeyboardMarkup(keyboard))
+        else:
+            # It's a single video
+            title = info.get('title', 'بدون عنوان')
+            duration = info.get('duration', 0)
+            duration_str = f"{duration // 60}:{duration % 60:02d}" if duration else "نامشخص"
+            
+            formats = []
+            if info.get('formats'):
+                # Audio formats
+                audio_formats = [f for f in info['formats'] if f.get('acodec') != 'none' and f.get('vcodec') == 'none']
+                if audio_formats:
+                    formats.append({
+                        'id': 'audio',
+                        'ext': 'mp3',
+                        'quality': 'بهترین کیفیت صوتی',
+                        'size_approx': next((f.get('filesize', 0) for f in audio_formats if f.get('filesize')), 0)
+                    })
                 
-                await processing_message.edit_reply_markup(InlineKeyboardMarkup(keyboard))
-            else:
-                # It's a single video
-                title = info.get('title', 'بدون عنوان')
-                duration = info.get('duration', 0)
-                duration_str = f"{duration // 60}:{duration % 60:02d}" if duration else "نامشخص"
+                # Video formats
+                video_formats = [f for f in info['formats'] if f.get('vcodec') != 'none' and f.get('height')]
+                video_formats.sort(key=lambda x: (x.get('height', 0), x.get('filesize', 0)), reverse=True)
                 
-                formats = []
-                if info.get('formats'):
-                    # Audio formats
-                    audio_formats = [f for f in info['formats'] if f.get('acodec') != 'none' and f.get('vcodec') == 'none']
-                    if audio_formats:
+                # Add top 3 video qualities
+                for i, fmt in enumerate(video_formats[:3]):
+                    height = fmt.get('height', 0)
+                    if height:
                         formats.append({
-                            'id': 'audio',
-                            'ext': 'mp3',
-                            'quality': 'بهترین کیفیت صوتی',
-                            'size_approx': next((f.get('filesize', 0) for f in audio_formats if f.get('filesize')), 0)
+                            'id': f"video_{fmt['format_id']}",
+                            'ext': fmt.get('ext', 'mp4'),
+                            'quality': f"{height}p",
+                            'size_approx': fmt.get('filesize', 0)
                         })
-                    
-                    # Video formats
-                    video_formats = [f for f in info['formats'] if f.get('vcodec') != 'none' and f.get('height')]
-                    video_formats.sort(key=lambda x: (x.get('height', 0), x.get('filesize', 0)), reverse=True)
-                    
-                    # Add top 3 video qualities
-                    for i, fmt in enumerate(video_formats[:3]):
-                        height = fmt.get('height', 0)
-                        if height:
-                            formats.append({
-                                'id': f"video_{fmt['format_id']}",
-                                'ext': fmt.get('ext', 'mp4'),
-                                'quality': f"{height}p",
-                                'size_approx': fmt.get('filesize', 0)
-                            })
-                
-                # Create keyboard with format options
-                keyboard = []
-                for fmt in formats:
-                    size_str = format_size(fmt['size_approx']) if fmt['size_approx'] else "نامشخص"
-                    label = f"{fmt['quality']} ({size_str})"
-                    callback_data = f"youtube_download_{fmt['id']}_{url}"
-                    keyboard.append([InlineKeyboardButton(label, callback_data=callback_data)])
-                
-                keyboard.append([InlineKeyboardButton("🔙 بازگشت", callback_data="menu_youtube")])
-                
-                await processing_message.edit_text(
-                    f"🎬 *{title}*\n"
-                    f"⏱ مدت زمان: {duration_str}\n\n"
-                    "لطفاً کیفیت مورد نظر را انتخاب کنید:",
-                    reply_markup=InlineKeyboardMarkup(keyboard),
-                    parse_mode='Markdown'
-                )
+            
+            # Create keyboard with format options
+            keyboard = []
+            for fmt in formats:
+                size_str = format_size(fmt['size_approx']) if fmt['size_approx'] else "نامشخص"
+                label = f"{fmt['quality']} ({size_str})"
+                callback_data = callback_payloads.callback_data("youtube_download_", {'url': url, 'format': fmt['id']})
+                keyboard.append([InlineKeyboardButton(label, callback_data=callback_data)])
+            
+            keyboard.append([InlineKeyboardButton("🔙 بازگشت", callback_data="menu_youtube")])
+            
+            await processing_message.edit_text(
+                f"🎬 *{title}*\n"
+                f"⏱ مدت زمان: {duration_str}\n\n"
+                "لطفاً کیفیت مورد نظر را انتخاب کنید:",
+                reply_markup=InlineKeyboardMarkup(keyboard),
+                parse_mode='Markdown'
+            )
     
+    except CircuitOpenError as e:
+        logger.warning(f"YouTube lookup rejected: {e}")
+        await processing_message.edit_text(platform_unavailable_text('youtube'))
     except Exception as e:
         logger.error(f"Error processing YouTube URL: {e}")
         await processing_message.edit_text(
             "❌ خطا در پردازش ویدیوی یوتیوب. لطفاً مجدداً تلاش کنید یا با پشتیبانی تماس بگیرید."
         )
+
+@router.prefix("youtube_download_")
+async def handle_youtube_download_callback(update: Update, context: ContextTypes.DEFAULT_TYPE, callback_data: str) -> None:
+    """Download the quality picked from the YouTube format menu."""
+    query = update.callback_query
+    user_id = update.effective_user.id
+    
+    payload = callback_payloads.resolve(callback_data, "youtube_download_")
+    if not payload:
+        await query.edit_message_text(
+            "⌛ این دکمه منقضی شده است. لطفاً لینک ویدیو را دوباره ارسال کنید.",
+            reply_markup=YOUTUBE_MENU
+        )
+        return
+    
+    # Initialize database models
+    db = context.bot_data.get('db')
+    user_model = User(db)
+    download_model = DownloadHistory(db)
+    
+    if disk_janitor.admission_paused():
+        await query.edit_message_text(STORAGE_FULL_TEXT, reply_markup=YOUTUBE_MENU)
+        return
+    
+    await query.edit_message_text(
+        "در حال دانلود از یوتیوب...\n"
+        "این عملیات ممکن است چند لحظه طول بکشد."
+    )
+    
+    try:
+        user_download_dir = create_download_dir(DOWNLOAD_DIR, user_id)
+        
+        # Journaled so a restart mid-download resumes it from the partial file
+        job_id = job_journal.start(
+            'youtube',
+            {'url': payload['url'], 'format': payload['format'], 'output_dir': user_download_dir},
+            user_id=user_id, chat_id=update.effective_chat.id
+        )
+        
+        # Starts straight from the info extracted for the format menu when it is still cached
+        try:
+            await rate_governor.wait_ready('youtube')
+            result = await asyncio.to_thread(
+                youtube_service.download_video,
+                payload['url'], payload['format'], user_download_dir
+            )
+        except asyncio.CancelledError:
+            # Cut off by shutdown: the journal entry lets the next start resume it
+            raise
+        except Exception:
+            job_journal.finish(job_id)
+            raise
+        job_journal.finish(job_id)
+        
+        if not result:
+            await query.edit_message_text(
+                "❌ خطا در دانلود ویدیوی یوتیوب. لطفاً مجدداً تلاش کنید یا با پشتیبانی تماس بگیرید."
+            )
+            return
+        
+        # Get file size
+        file_size = get_file_size(result['file_path'])
+        
+        # Update user's download usage
+        if file_size > 0:
+            user_model.update_download_usage(user_id, file_size)
+        
+        # Add to download history
+        download_model.add_download(
+            user_id=user_id,
+            content_type='youtube',
+            content_url=payload['url'],
+            file_size=file_size
+        )
+        
+        await query.edit_message_text(
+            f"✅ دانلود با موفقیت انجام شد!\n\n"
+            f"🎬 عنوان: {result['title']}\n"
+            f"💾 حجم: {format_size(file_size)}\n\n"
+            "در حال ارسال فایل..."
+        )
+        
+        # Send the file
+        await send_youtube_file(query.message, result, payload['format'])
+        
+        await query.edit_message_text(
+            f"✅ دانلود با موفقیت انجام شد!\n\n"
+            f"🎬 عنوان: {result['title']}\n"
+            f"💾 حجم: {format_size(file_size)}",
+            reply_markup=YOUTUBE_MENU
+        )
+    
+    except CircuitOpenError as e:
+        logger.warning(f"YouTube download rejected: {e}")
+        await query.edit_message_text(platform_unavailable_text('youtube'), reply_markup=YOUTUBE_MENU)
+    except Exception as e:
+        logger.error(f"Error downloading YouTube video: {e}")
+        await query.edit_message_text(
+            "❌ خطا در دانلود ویدیوی یوتیوب. لطفاً مجدداً تلاش کنید یا با پشتیبانی تماس بگیرید."
+        )
+
+async def send_youtube_file(message, result, format_choice):
+    """Reply with a downloaded file, as audio for audio downloads and as a streamable video otherwise"""
+    disk_janitor.mark_served(result['file_path'])
+    with open(result['file_path'], 'rb') as media_file:
+        if format_choice == 'audio':
+            await message.reply_audio(
+                audio=media_file,
+                title=result['title'],
+                performer=result['uploader'],
+                caption=f"🎵 {result['title']}\n\nدانلود شده توسط ربات Snexus"
+            )
+        else:
+            await message.reply_video(
+                video=media_file,
+                caption=f"🎬 {result['title']}\n\nدانلود شده توسط ربات Snexus",
+                supports_streaming=True
+            )
+
+@router.prefix("youtube_playlist_audio_", "youtube_playlist_video_")
+async def handle_youtube_playlist_callback(update: Update, context: ContextTypes.DEFAULT_TYPE, callback_data: str) -> None:
+    """Download the videos of a YouTube playlist one by one, as audio or video."""
+    query = update.callback_query
+    user_id = update.effective_user.id
+    
+    if callback_data.startswith("youtube_playlist_audio_"):
+        prefix, format_choice = "youtube_playlist_audio_", 'audio'
+    else:
+        prefix, format_choice = "youtube_playlist_video_", PLAYLIST_VIDEO_FORMAT
+    
+    payload = callback_payloads.resolve(callback_data, prefix)
+    if not payload:
+        await query.edit_message_text(
+            "⌛ این دکمه منقضی شده است. لطفاً لینک پلی‌لیست را دوباره ارسال کنید.",
+            reply_markup=YOUTUBE_MENU
+        )
+        return
+    
+    # Initialize database models
+    db = context.bot_data.get('db')
+    user_model = User(db)
+    download_model = DownloadHistory(db)
+    
+    if disk_janitor.admission_paused():
+        await query.edit_message_text(STORAGE_FULL_TEXT, reply_markup=YOUTUBE_MENU)
+        return
+    
+    await query.edit_message_text(
+        "در حال دریافت پلی‌لیست از یوتیوب...\n"
+        "این عملیات ممکن است چند لحظه طول بکشد."
+    )
+    
+    try:
+        user_download_dir = create_download_dir(DOWNLOAD_DIR, user_id)
+        
+        # Usually still cached from the lookup that showed these buttons
+        await rate_governor.wait_ready('youtube')
+        info = await asyncio.to_thread(youtube_service.get_video_info, payload['url'])
+        video_urls = youtube_service.playlist_video_urls(info)[:YOUTUBE_PLAYLIST_MAX_VIDEOS]
+        
+        sent = 0
+        for index, video_url in enumerate(video_urls, 1):
+            await query.edit_message_text(f"در حال دانلود ویدیوی {index} از {len(video_urls)}...")
+            
+            # Each video is journaled on its own, so a restart resumes the one in progress
+            job_id = job_journal.start(
+                'youtube',
+                {'url': video_url, 'format': format_choice, 'output_dir': user_download_dir},
+                user_id=user_id, chat_id=update.effective_chat.id
+            )
+            try:
+                await rate_governor.wait_ready('youtube')
+                result = await asyncio.to_thread(youtube_service.download_video, video_url, format_choice, user_download_dir)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                job_journal.finish(job_id)
+                raise
+            job_journal.finish(job_id)
+            
+            if not result:
+                continue
+            
+            file_size = get_file_size(result['file_path'])
+            if file_size > 0:
+                user_model.update_download_usage(user_id, file_size)
+            download_model.add_download(
+                user_id=user_id,
+                content_type='youtube',
+                content_url=video_url,
+                file_size=file_size
+            )
+            
+            await send_youtube_file(query.message, result, format_choice)
+            sent += 1
+        
+        await query.edit_message_text(
+            f"✅ {sent} از {len(video_urls)} ویدیوی پلی‌لیست «{info.get('title', 'بدون عنوان')}» ارسال شد.",
+            reply_markup=YOUTUBE_MENU
+        )
+    
+    except CircuitOpenError as e:
+        logger.warning(f"YouTube playlist download rejected: {e}")
+        await query.edit_message_text(platform_unavailable_text('youtube'), reply_markup=YOUTUBE_MENU)
+    except Exception as e:
+        logger.error(f"Error downloading YouTube playlist: {e}")
+        await query.edit_message_text(
+            "❌ خطا در دانلود پلی‌لیست یوتیوب. لطفاً مجدداً تلاش کنید یا با پشتیبانی تماس بگیرید."
+        )
+
+async def resume_youtube_download(application, job, slots):
+    """Finish an interrupted download and offer the file to the user who requested it"""
+    payload = job['payload']
+    async with slots:
+        job_journal.start('youtube', payload, user_id=job['user_id'], chat_id=job['chat_id'])
+        try:
+            await rate_governor.wait_ready('youtube')
+            result = await asyncio.to_thread(
+                youtube_service.download_video,
+                payload['url'], payload['format'], payload['output_dir']
+            )
+        except CircuitOpenError as e:
+            logger.warning(f"Resumed YouTube download rejected: {e}")
+            result = None
+        # Cancelled at shutdown, the job stays journaled for the next start
+        job_journal.finish(job['job_id'])
+
+    if not result or not job['chat_id']:
+        logger.warning(f"Could not resume YouTube download of {payload['url']}")
+        return
+
+    # The file is on disk now, so the button sends it without downloading again
+    callback_data = callback_payloads.callback_data(
+        "youtube_download_", {'url': payload['url'], 'format': payload['format']}
+    )
+    try:
+        await application.bot.send_message(
+            chat_id=job['chat_id'],
+            text=(
+                "✅ دانلودی که با راه‌اندازی مجدد ربات متوقف شده بود تکمیل شد.\n\n"
+                f"🎬 عنوان: {result['title']}"
+            ),
+            reply_markup=InlineKeyboardMarkup([[InlineKeyboardButton("📥 دریافت فایل", callback_data=callback_data)]])
+        )
+    except TelegramError as e:
+        logger.error(f"Error notifying chat {job['chat_id']} of a resumed download: {e}")
+
+@on_startup
+async def resume_youtube_downloads(application):
+    """Restart YouTube downloads cut off by the last shutdown; yt-dlp continues their .part files"""
+    if not RESUME_INTERRUPTED_DOWNLOADS:
+        return
+
+    # Resumed jobs don't pass through the update processor, so they get their own concurrency bound
+    slots = asyncio.Semaphore(RESUME_CONCURRENCY)
+    for job in job_journal.interrupted('youtube'):
+        if job['attempts'] >= RESUME_MAX_ATTEMPTS:
+            logger.warning(f"Dropping YouTube download of {job['payload']['url']} after {job['attempts']} attempts")
+            job_journal.finish(job['job_id'])
+            continue
+        logger.info(f"Resuming interrupted YouTube download of {job['payload']['url']}")
+        start_background_task(resume_youtube_download(application, job, slots), name=f"resume-{job['job_id']}")
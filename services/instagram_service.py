@@ -1,15 +1,25 @@
+import asyncio
 import os
 import logging
 import instaloader
-import requests
+from instaloader import instaloadercontext
 import tempfile
 import subprocess
-import time
-import random
 import socket
+import httpx
+from concurrent.futures import ThreadPoolExecutor
 from urllib3.exceptions import ReadTimeoutError, ProtocolError
-from requests.exceptions import RequestException, Timeout, ConnectionError
-from utils.helpers import sanitize_filename, create_download_dir
+from requests.exceptions import RequestException
+from utils.helpers import sanitize_filename, create_download_dir, move_file
+from utils.session_pool import SessionPool, PooledSession, SessionPoolExhausted
+from utils.rate_governor import rate_governor, is_retryable
+from utils.circuit_breaker import CircuitOpenError
+from utils.egress_pool import egress_pool
+from utils.http_client import http_client
+from config.config import (
+    INSTAGRAM_SEND_PHOTOS_BY_URL, INSTAGRAM_SESSION_FILES, INSTAGRAM_SESSION_BUDGET,
+    INSTAGRAM_SESSION_BUDGET_WINDOW, INSTAGRAM_SESSION_COOLDOWN, INSTAGRAM_SESSION_WAIT_TIMEOUT
+)
 from dotenv import load_dotenv
 
 # Load environment variables
@@ -20,10 +30,71 @@ logger = logging.getLogger(__name__)
 # Default timeout for requests (in seconds)
 DEFAULT_TIMEOUT = 30
 
+# Prefix of the per-download scratch directories created inside the output directory
+TEMP_DIR_PREFIX = ".instaloader-"
+
+# Failures the downloader methods re-raise so the rate governor can retry them
+RETRYABLE_ERRORS = (
+    instaloader.exceptions.ConnectionException, RequestException, httpx.TransportError, ReadTimeoutError, ProtocolError
+)
+
+# Carousel items fetched in parallel
+SIDECAR_FETCH_WORKERS = 4
+
+def is_retryable_error(exc):
+    """Whether an Instagram failure is throttling or network trouble rather than missing content"""
+    if isinstance(exc, (SessionPoolExhausted, instaloader.exceptions.QueryReturnedNotFoundException)):
+        return False
+    return isinstance(exc, instaloader.exceptions.ConnectionException) or is_retryable(exc)
+
+def route_session(session, egress):
+    """Send a requests session's traffic through an egress and remember it on the session"""
+    if getattr(session, 'egress', None) is not egress:
+        egress.apply_to_session(session)
+        session.egress = egress
+    return session
+
+class EgressContext(instaloadercontext.InstaloaderContext):
+    """InstaloaderContext whose requests all leave through one egress.
+
+    instaloader runs GraphQL and iPhone API queries on fresh copies of its session,
+    which keep neither proxies nor mounted adapters; every such query goes through
+    ``get_json``, so the session is routed there. Media and other anonymous requests
+    use ``get_anonymous_session``.
+    """
+
+    egress = None
+
+    def get_anonymous_session(self):
+        session = super().get_anonymous_session()
+        return route_session(session, self.egress) if self.egress else session
+
+    def get_json(self, path, params, host='www.instagram.com', session=None, *args, **kwargs):
+        if self.egress:
+            route_session(session if session is not None else self._session, self.egress)
+        return super().get_json(path, params, host, session, *args, **kwargs)
+
+def route_context(loader, egress):
+    """Give an Instaloader a context routing all of its sessions through an egress"""
+    context = loader.context
+    loader.context = EgressContext(
+        sleep=context.sleep,
+        quiet=context.quiet,
+        user_agent=context.user_agent,
+        max_connection_attempts=context.max_connection_attempts,
+        request_timeout=context.request_timeout,
+        fatal_status_codes=context.fatal_status_codes,
+        iphone_support=context.iphone_support
+    )
+    loader.context.egress = egress
+    route_session(loader.context._session, egress)
+    return loader.context
+
 class InstagramDownloader:
     """Service for downloading content from Instagram"""
     
-    def __init__(self):
+    def __init__(self, username=None, password=None, session_file=None, egress=None):
+        self.egress = egress
         self.loader = instaloader.Instaloader(
             download_videos=True,
             download_video_thumbnails=False,
@@ -32,6 +103,9 @@ class InstagramDownloader:
             save_metadata=False,
             compress_json=False
         )
+        # Route this account's requests through its own egress; sessions replaced by login are routed on first use
+        if egress:
+            route_context(self.loader, egress)
         # Set a user agent to avoid rate limiting
         self.loader.context.user_agent = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
         # Add a small delay between requests to avoid rate limiting
@@ -42,20 +116,15 @@ class InstagramDownloader:
         self.loader.context.max_connection_attempts = 3
         
         # Try to authenticate with Instagram if credentials are available
-        self._authenticate()
-        
-        # Track failed attempts to implement exponential backoff
-        self.failed_attempts = 0
-        self.max_retries = 3
+        self._authenticate(username, password, session_file)
         
         # Configure socket timeout globally
         socket.setdefaulttimeout(DEFAULT_TIMEOUT)
     
-    def _authenticate(self):
-        """Authenticate with Instagram using credentials from environment variables"""
+    def _authenticate(self, username, password, session_file):
+        """Authenticate with Instagram using a password or a saved session file"""
         try:
-            username = os.getenv('INSTAGRAM_USERNAME')
-            password = os.getenv('INSTAGRAM_PASSWORD')
+            session_file = session_file or 'instagram_session'
             
             if username and password:
                 logger.info(f"Attempting to login to Instagram as {username}")
@@ -63,11 +132,9 @@ class InstagramDownloader:
                 logger.info("Instagram login successful")
                 
                 # Save session for future use
-                session_file = os.getenv('INSTAGRAM_SESSION_FILE', 'instagram_session')
                 self.loader.save_session_to_file(session_file)
             else:
                 # Try to load session if available
-                session_file = os.getenv('INSTAGRAM_SESSION_FILE', 'instagram_session')
                 if os.path.exists(session_file):
                     logger.info(f"Loading Instagram session from {session_file}")
                     try:
@@ -81,23 +148,50 @@ class InstagramDownloader:
             logger.error(f"Instagram authentication error: {e}")
             logger.warning("Continuing without authentication. Some downloads may fail.")
     
-    def _handle_rate_limiting(self, operation_name):
-        """Handle rate limiting with exponential backoff"""
-        if self.failed_attempts > 0:
-            # Calculate backoff time with jitter
-            backoff_time = min(30, 2 ** self.failed_attempts) + random.uniform(0, 1)
-            logger.warning(f"Rate limiting detected for {operation_name}. Backing off for {backoff_time:.2f} seconds (attempt {self.failed_attempts}/{self.max_retries})")
-            time.sleep(backoff_time)
+    @staticmethod
+    def fetch_media(url, output_path):
+        """Stream a media URL into a file over the shared connection pool, returning the path or None.
         
-        self.failed_attempts += 1
-        return self.failed_attempts <= self.max_retries
+        Network errors propagate so the rate governor retries the job, continuing the partial file.
+        """
+        return http_client.download(url, output_path)
     
-    def _reset_rate_limiting(self):
-        """Reset rate limiting counter after successful operation"""
-        self.failed_attempts = 0
+    def _download_sidecar(self, post, shortcode, output_dir):
+        """Download every item of a carousel post, fetching the items concurrently"""
+        owner = sanitize_filename(post.owner_username)
+        
+        jobs = []
+        for index, node in enumerate(post.get_sidecar_nodes(), start=1):
+            media_type = 'video' if node.is_video else 'photo'
+            url = node.video_url if node.is_video else node.display_url
+            output_path = os.path.join(output_dir, f"{owner}_{shortcode}_{index}.{'mp4' if node.is_video else 'jpg'}")
+            jobs.append((media_type, url, output_path))
+        
+        if not jobs:
+            logger.error(f"No items found in carousel post {shortcode}")
+            return None
+        
+        with ThreadPoolExecutor(max_workers=min(SIDECAR_FETCH_WORKERS, len(jobs))) as executor:
+            paths = list(executor.map(lambda job: self.fetch_media(job[1], job[2]), jobs))
+        
+        items = [
+            {'type': media_type, 'file_path': path}
+            for (media_type, _, _), path in zip(jobs, paths) if path
+        ]
+        if not items:
+            return None
+        
+        return {
+            'type': 'album',
+            'items': items,
+            'caption': post.caption if post.caption else '',
+            'owner': post.owner_username,
+            'likes': post.likes,
+            'date': post.date_local.strftime('%Y-%m-%d %H:%M:%S')
+        }
     
     def download_post(self, post_url, output_dir):
-        """Download Instagram post (photo or video)"""
+        """Download Instagram post (photo, video or carousel)"""
         try:
             # Extract shortcode from URL
             shortcode = post_url.split("/p/")[1].split("/")[0]
@@ -107,8 +201,25 @@ class InstagramDownloader:
             # Get post by shortcode
             post = instaloader.Post.from_shortcode(self.loader.context, shortcode)
             
-            # Create temporary directory for download
-            with tempfile.TemporaryDirectory() as temp_dir:
+            # Carousel posts have several items
+            if post.typename == 'GraphSidecar':
+                return self._download_sidecar(post, shortcode, output_dir)
+            
+            # Single photos can be sent by CDN URL; Telegram fetches them itself
+            if INSTAGRAM_SEND_PHOTOS_BY_URL and not post.is_video:
+                return {
+                    'type': 'photo',
+                    'url': post.url,
+                    'file_path': None,
+                    'fallback_path': os.path.join(output_dir, f"{sanitize_filename(post.owner_username)}_{shortcode}.jpg"),
+                    'caption': post.caption if post.caption else '',
+                    'owner': post.owner_username,
+                    'likes': post.likes,
+                    'date': post.date_local.strftime('%Y-%m-%d %H:%M:%S')
+                }
+            
+            # Create temporary directory next to the output so files can be renamed into place
+            with tempfile.TemporaryDirectory(dir=output_dir, prefix=TEMP_DIR_PREFIX) as temp_dir:
                 # Download post
                 self.loader.download_post(post, target=temp_dir)
                 
@@ -121,12 +232,8 @@ class InstagramDownloader:
                     video_path = os.path.join(temp_dir, video_files[0])
                     output_video_path = os.path.join(output_dir, f"{sanitize_filename(post.owner_username)}_{shortcode}.mp4")
                     
-                    # Copy file to output directory
-                    with open(video_path, 'rb') as src, open(output_video_path, 'wb') as dst:
-                        dst.write(src.read())
-                    
-                    # Reset rate limiting counter after success
-                    self._reset_rate_limiting()
+                    # Move file to output directory
+                    move_file(video_path, output_video_path)
                     
                     return {
                         'type': 'video',
@@ -143,12 +250,8 @@ class InstagramDownloader:
                     image_path = os.path.join(temp_dir, image_files[0])
                     output_image_path = os.path.join(output_dir, f"{sanitize_filename(post.owner_username)}_{shortcode}.jpg")
                     
-                    # Copy file to output directory
-                    with open(image_path, 'rb') as src, open(output_image_path, 'wb') as dst:
-                        dst.write(src.read())
-                    
-                    # Reset rate limiting counter after success
-                    self._reset_rate_limiting()
+                    # Move file to output directory
+                    move_file(image_path, output_image_path)
                     
                     return {
                         'type': 'photo',
@@ -160,18 +263,10 @@ class InstagramDownloader:
                     }
             
             return None
-        except instaloader.exceptions.ConnectionException as e:
-            logger.error(f"Connection error downloading Instagram post: {e}")
-            if self._handle_rate_limiting("post download"):
-                logger.info(f"Retrying post download for {post_url}")
-                return self.download_post(post_url, output_dir)
-            return None
-        except (RequestException, Timeout, ConnectionError, ReadTimeoutError, ProtocolError) as e:
-            logger.error(f"Network error downloading Instagram post: {e}")
-            if self._handle_rate_limiting("post download"):
-                logger.info(f"Retrying post download after network error for {post_url}")
-                return self.download_post(post_url, output_dir)
-            return None
+        except RETRYABLE_ERRORS as e:
+            # Retried with backoff by the rate governor
+            logger.warning(f"Connection error downloading Instagram post: {e}")
+            raise
         except Exception as e:
             logger.error(f"Error downloading Instagram post: {e}")
             return None
@@ -195,8 +290,12 @@ class InstagramDownloader:
             # Get post by shortcode
             post = instaloader.Post.from_shortcode(self.loader.context, shortcode)
             
-            # Create temporary directory for download
-            with tempfile.TemporaryDirectory() as temp_dir:
+            # Carousel posts have several items
+            if post.typename == 'GraphSidecar':
+                return self._download_sidecar(post, shortcode, output_dir)
+            
+            # Create temporary directory next to the output so files can be renamed into place
+            with tempfile.TemporaryDirectory(dir=output_dir, prefix=TEMP_DIR_PREFIX) as temp_dir:
                 # Download post
                 self.loader.download_post(post, target=temp_dir)
                 
@@ -210,29 +309,13 @@ class InstagramDownloader:
                     video_path = os.path.join(temp_dir, video_files[0])
                     output_video_path = os.path.join(output_dir, f"{sanitize_filename(post.owner_username)}_reel_{shortcode}.mp4")
                     
-                    # Copy file to output directory
-                    with open(video_path, 'rb') as src, open(output_video_path, 'wb') as dst:
-                        dst.write(src.read())
-                    
-                    # Create audio version
-                    output_audio_path = os.path.join(output_dir, f"{sanitize_filename(post.owner_username)}_reel_{shortcode}.mp3")
-                    
-                    # Use ffmpeg to extract audio
-                    try:
-                        subprocess.run([
-                            'ffmpeg', '-i', output_video_path, '-q:a', '0', '-map', 'a', output_audio_path, '-y'
-                        ], check=True, capture_output=True, timeout=DEFAULT_TIMEOUT)
-                    except Exception as e:
-                        logger.error(f"Error extracting audio from reel: {e}")
-                        output_audio_path = None
-                    
-                    # Reset rate limiting counter after success
-                    self._reset_rate_limiting()
+                    # Move file to output directory
+                    move_file(video_path, output_video_path)
                     
+                    # Audio is extracted later, only if the user asks for it
                     return {
                         'type': 'reel',
                         'file_path': output_video_path,
-                        'audio_path': output_audio_path,
                         'caption': post.caption if post.caption else '',
                         'owner': post.owner_username,
                         'likes': post.likes,
@@ -240,111 +323,90 @@ class InstagramDownloader:
                     }
             
             return None
-        except instaloader.exceptions.ConnectionException as e:
-            logger.error(f"Connection error downloading Instagram reel: {e}")
-            if self._handle_rate_limiting("reel download"):
-                logger.info(f"Retrying reel download for {reel_url}")
-                return self.download_reel(reel_url, output_dir)
-            return None
-        except (RequestException, Timeout, ConnectionError, ReadTimeoutError, ProtocolError) as e:
-            logger.error(f"Network error downloading Instagram reel: {e}")
-            if self._handle_rate_limiting("reel download"):
-                logger.info(f"Retrying reel download after network error for {reel_url}")
-                return self.download_reel(reel_url, output_dir)
-            return None
+        except RETRYABLE_ERRORS as e:
+            # Retried with backoff by the rate governor
+            logger.warning(f"Connection error downloading Instagram reel: {e}")
+            raise
         except Exception as e:
             logger.error(f"Error downloading Instagram reel: {e}")
             return None
     
+    def _find_story_item(self, username, story_id):
+        """Fetch a single story item by media ID, falling back to the user's current stories"""
+        if story_id.isdigit():
+            try:
+                # One metadata query for the item itself
+                return instaloader.StoryItem.from_mediaid(self.loader.context, int(story_id))
+            except (instaloader.exceptions.BadResponseException, instaloader.exceptions.QueryReturnedNotFoundException) as e:
+                logger.warning(f"Direct lookup of story {story_id} failed, searching {username}'s stories: {e}")
+        
+        # Walk the user's current stories and stop at the requested item
+        profile = instaloader.Profile.from_username(self.loader.context, username)
+        most_recent = None
+        for story in self.loader.get_stories(userids=[profile.userid]):
+            for item in story.get_items():
+                if str(item.mediaid) == story_id:
+                    return item
+                if most_recent is None:
+                    most_recent = item
+        
+        if most_recent is not None:
+            logger.info(f"Story {story_id} not found, using most recent story {most_recent.mediaid} instead")
+        else:
+            logger.error(f"No stories found for {username}")
+        return most_recent
+    
     def download_story(self, story_url, output_dir):
         """Download Instagram story"""
         try:
             # Extract username and story ID from URL
             # Format: https://www.instagram.com/stories/username/12345678901234567/
-            parts = story_url.strip('/').split('/')
-            username = parts[-3]
-            story_id = parts[-2]
+            parts = story_url.split('?')[0].strip('/').split('/')
+            stories_index = parts.index('stories')
+            username = parts[stories_index + 1]
+            story_id = parts[stories_index + 2]
             
-            # Get profile
-            profile = instaloader.Profile.from_username(self.loader.context, username)
+            # Locate just the requested item instead of downloading the whole story reel
+            story_item = self._find_story_item(username, story_id)
+            if not story_item:
+                return None
             
-            # Create temporary directory for download
-            with tempfile.TemporaryDirectory() as temp_dir:
-                # Download stories
-                self.loader.download_stories(userids=[profile.userid], filename_target=temp_dir)
-                
-                # Find downloaded files
-                story_dir = os.path.join(temp_dir, username)
-                if not os.path.exists(story_dir):
-                    logger.error(f"Story directory not found: {story_dir}")
-                    return None
-                
-                files = os.listdir(story_dir)
+            # Create temporary directory next to the output so files can be renamed into place
+            with tempfile.TemporaryDirectory(dir=output_dir, prefix=TEMP_DIR_PREFIX) as temp_dir:
+                # Download the single story item
+                self.loader.download_storyitem(story_item, target=temp_dir)
                 
-                # Find the specific story by ID
-                story_files = [f for f in files if story_id in f]
+                # Find downloaded file
+                is_video = story_item.is_video
+                extension = '.mp4' if is_video else '.jpg'
+                story_files = [f for f in os.listdir(temp_dir) if f.endswith(extension)]
                 if not story_files:
                     logger.error(f"Story file not found for ID: {story_id}")
-                    # Try to get the most recent story instead
-                    if files:
-                        story_files = [files[0]]
-                        logger.info(f"Using most recent story instead: {story_files[0]}")
-                    else:
-                        return None
-                
-                story_file = story_files[0]
-                story_path = os.path.join(story_dir, story_file)
+                    return None
                 
-                # Determine file type
-                is_video = story_file.endswith('.mp4')
+                story_path = os.path.join(temp_dir, story_files[0])
                 output_file_path = os.path.join(
                     output_dir, 
                     f"{sanitize_filename(username)}_story_{story_id}.{'mp4' if is_video else 'jpg'}"
                 )
                 
-                # Copy file to output directory
-                with open(story_path, 'rb') as src, open(output_file_path, 'wb') as dst:
-                    dst.write(src.read())
-                
-                # Create audio version if it's a video
-                output_audio_path = None
-                if is_video:
-                    output_audio_path = os.path.join(output_dir, f"{sanitize_filename(username)}_story_{story_id}.mp3")
-                    
-                    # Use ffmpeg to extract audio
-                    try:
-                        subprocess.run([
-                            'ffmpeg', '-i', output_file_path, '-q:a', '0', '-map', 'a', output_audio_path, '-y'
-                        ], check=True, capture_output=True, timeout=DEFAULT_TIMEOUT)
-                    except Exception as e:
-                        logger.error(f"Error extracting audio from story: {e}")
-                        output_audio_path = None
-                
-                # Reset rate limiting counter after success
-                self._reset_rate_limiting()
+                # Move file to output directory
+                move_file(story_path, output_file_path)
                 
+                # Audio is extracted later, only if the user asks for it
                 return {
                     'type': 'story',
                     'file_path': output_file_path,
-                    'audio_path': output_audio_path if is_video else None,
                     'is_video': is_video,
                     'owner': username,
                     'date': ''  # Stories don't have accessible date info
                 }
             
             return None
-        except instaloader.exceptions.ConnectionException as e:
-            logger.error(f"Connection error downloading Instagram story: {e}")
-            if self._handle_rate_limiting("story download"):
-                logger.info(f"Retrying story download for {story_url}")
-                return self.download_story(story_url, output_dir)
-            return None
-        except (RequestException, Timeout, ConnectionError, ReadTimeoutError, ProtocolError) as e:
-            logger.error(f"Network error downloading Instagram story: {e}")
-            if self._handle_rate_limiting("story download"):
-                logger.info(f"Retrying story download after network error for {story_url}")
-                return self.download_story(story_url, output_dir)
-            return None
+        except RETRYABLE_ERRORS as e:
+            # Retried with backoff by the rate governor
+            logger.warning(f"Connection error downloading Instagram story: {e}")
+            raise
         except Exception as e:
             logger.error(f"Error downloading Instagram story: {e}")
             return None
@@ -362,49 +424,126 @@ class InstagramDownloader:
             
             # Get profile pic URL
             profile_pic_url = profile.profile_pic_url
-            
-            # Download profile pic with timeout
-            response = requests.get(profile_pic_url, timeout=DEFAULT_TIMEOUT)
-            if response.status_code != 200:
-                logger.error(f"Failed to download profile pic: {response.status_code}")
-                return None
-            
-            # Save to file
             output_file_path = os.path.join(output_dir, f"{sanitize_filename(username)}_profile.jpg")
-            with open(output_file_path, 'wb') as f:
-                f.write(response.content)
             
-            # Reset rate limiting counter after success
-            self._reset_rate_limiting()
+            # Unless sending by URL, download the picture now
+            file_path = None
+            if not INSTAGRAM_SEND_PHOTOS_BY_URL:
+                file_path = self.fetch_media(profile_pic_url, output_file_path)
+                if not file_path:
+                    return None
             
             return {
                 'type': 'profile',
-                'file_path': output_file_path,
-                'owner': username
+                'url': profile_pic_url,
+                'file_path': file_path,
+                'fallback_path': output_file_path,
+                'owner': username,
+                'username': profile.username,
+                'full_name': profile.full_name,
+                'followers': profile.followers,
+                'followees': profile.followees,
+                'biography': profile.biography or ''
             }
-        except instaloader.exceptions.ConnectionException as e:
-            logger.error(f"Connection error downloading Instagram profile picture: {e}")
-            if self._handle_rate_limiting("profile download"):
-                logger.info(f"Retrying profile download for {profile_url}")
-                return self.download_profile_pic(profile_url, output_dir)
-            return None
-        except (RequestException, Timeout, ConnectionError, ReadTimeoutError, ProtocolError) as e:
-            logger.error(f"Network error downloading Instagram profile picture: {e}")
-            if self._handle_rate_limiting("profile download"):
-                logger.info(f"Retrying profile download after network error for {profile_url}")
-                return self.download_profile_pic(profile_url, output_dir)
-            return None
+        except RETRYABLE_ERRORS as e:
+            # Retried with backoff by the rate governor
+            logger.warning(f"Connection error downloading Instagram profile picture: {e}")
+            raise
         except Exception as e:
             logger.error(f"Error downloading Instagram profile picture: {e}")
             return None
 
+def parse_session_entry(entry):
+    """Split a session file entry ("username=path" or an instaloader "session-<username>" file) into (username, path)"""
+    if '=' in entry:
+        username, path = entry.split('=', 1)
+        return username.strip(), path.strip()
+    
+    name = os.path.basename(entry)
+    return (name[len('session-'):] if name.startswith('session-') else None), entry
+
 class InstagramDownloadService:
     """Service for downloading content from Instagram"""
     
     def __init__(self):
-        self.downloader = InstagramDownloader()
+        sessions = []
+        for entry in INSTAGRAM_SESSION_FILES:
+            username, path = parse_session_entry(entry)
+            egress = egress_pool.pin()
+            sessions.append(PooledSession(username or path, InstagramDownloader(
+                username=username, session_file=path, egress=egress
+            )))
+        
+        pool_limits = {
+            'budget': INSTAGRAM_SESSION_BUDGET,
+            'cooldown': INSTAGRAM_SESSION_COOLDOWN,
+            'max_in_flight': 1
+        }
+        
+        # Without a session list, fall back to the single account from the environment.
+        # With nothing to spread jobs over, budgets and cooldowns would only queue every
+        # user behind one account, so jobs run concurrently as they did before the pool.
+        if not sessions:
+            pool_limits = {'budget': None, 'cooldown': 0, 'max_in_flight': None}
+            username = os.getenv('INSTAGRAM_USERNAME')
+            sessions.append(PooledSession(username or 'default', InstagramDownloader(
+                username=username,
+                password=os.getenv('INSTAGRAM_PASSWORD'),
+                session_file=os.getenv('INSTAGRAM_SESSION_FILE', 'instagram_session'),
+                egress=egress_pool.pin()
+            )))
+        
+        self.pool = SessionPool(
+            sessions,
+            window=INSTAGRAM_SESSION_BUDGET_WINDOW,
+            wait_timeout=INSTAGRAM_SESSION_WAIT_TIMEOUT,
+            **pool_limits
+        )
+        logger.info(f"Instagram session pool ready with {len(sessions)} session(s)")
+    
+    def _download(self, downloader, url, output_dir):
+        """Dispatch a URL to the matching downloader method"""
+        # Determine content type from URL
+        if '/p/' in url:
+            return downloader.download_post(url, output_dir)
+        elif '/reel/' in url:
+            return downloader.download_reel(url, output_dir)
+        elif '/stories/' in url:
+            return downloader.download_story(url, output_dir)
+        else:
+            # Assume it's a profile URL
+            return downloader.download_profile_pic(url, output_dir)
+    
+    @staticmethod
+    def _report_egress(downloader, ok):
+        """Score the egress a session is pinned to with a job's outcome"""
+        if downloader.egress:
+            egress_pool.report(downloader.egress, ok)
     
-    def download_from_url(self, url, user_id, download_dir):
+    async def _download_once(self, url, output_dir):
+        """Run one attempt on the healthiest session that still has budget.
+
+        The session is waited for on the event loop; only the download itself
+        takes a worker thread.
+        """
+        async with self.pool.acquire_async() as lease:
+            downloader = lease.client
+            try:
+                result = await asyncio.to_thread(self._download, downloader, url, output_dir)
+            except instaloader.exceptions.TooManyRequestsException:
+                # Rest this account; the retry goes to another session
+                lease.rate_limited = True
+                self._report_egress(downloader, False)
+                raise
+            except Exception as e:
+                # Only throttling and network trouble count against the account's address
+                self._report_egress(downloader, not is_retryable_error(e))
+                raise
+            self._report_egress(downloader, True)
+            lease.ok = result is not None
+            return result
+    
+    async def download_from_url(self, url, user_id, download_dir):
         """Download content from Instagram URL"""
         try:
             # Create user download directory
@@ -415,20 +554,49 @@ class InstagramDownloadService:
             
             logger.info(f"Processing Instagram URL: {url}")
             
-            # Determine content type from URL
-            if '/p/' in url:
-                return self.downloader.download_post(url, user_download_dir)
-            elif '/reel/' in url:
-                return self.downloader.download_reel(url, user_download_dir)
-            elif '/stories/' in url:
-                return self.downloader.download_story(url, user_download_dir)
-            else:
-                # Assume it's a profile URL
-                return self.downloader.download_profile_pic(url, user_download_dir)
+            # Paced per upstream; backoff and waiting for a free session happen on the event loop, not in a thread
+            return await rate_governor.run_async(
+                'instagram', self._download_once, url, user_download_dir, retry_if=is_retryable_error, timed=False
+            )
+        except SessionPoolExhausted as e:
+            logger.error(f"No Instagram session available for {url}: {e}")
+            return None
+        except CircuitOpenError:
+            # Let the handler tell the user Instagram is unavailable
+            raise
         except Exception as e:
             logger.error(f"Error in download_from_url: {e}")
             return None
     
+    def fetch_media(self, url, output_path):
+        """Download a media URL to a file, e.g. when Telegram can't fetch it by URL"""
+        return InstagramDownloader.fetch_media(url, output_path)
+    
+    def extract_audio(self, video_path, output_dir=None):
+        """Extract a video's audio track, copying the AAC stream into M4A when possible"""
+        if not output_dir:
+            output_dir = os.path.dirname(video_path)
+        
+        base_name = os.path.splitext(os.path.basename(video_path))[0]
+        output_path = os.path.join(output_dir, f"{base_name}.m4a")
+        
+        # Reuse an earlier extraction
+        if os.path.exists(output_path):
+            return output_path
+        
+        try:
+            # Instagram videos carry AAC audio, so this is a remux without re-encoding
+            subprocess.run([
+                'ffmpeg', '-i', video_path, '-vn', '-map', '0:a:0', '-c:a', 'copy', '-movflags', '+faststart', output_path, '-y'
+            ], check=True, capture_output=True, timeout=DEFAULT_TIMEOUT)
+            
+            return output_path
+        except Exception as e:
+            logger.warning(f"Audio stream copy failed for {video_path}, converting to MP3: {e}")
+            if os.path.exists(output_path):
+                os.remove(output_path)
+            return self.convert_to_mp3(video_path, output_dir)
+    
     def convert_to_mp3(self, video_path, output_dir=None):
         """Convert video to MP3 audio"""
         if not output_dir:
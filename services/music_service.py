@@ -1,14 +1,99 @@
 import os
+import copy
 import logging
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
 import spotipy
 from spotipy.oauth2 import SpotifyClientCredentials
+from spotipy.cache_handler import CacheFileHandler
 import yt_dlp
+from yt_dlp.utils import DownloadError
 import requests
-from config.config import SPOTIFY_CLIENT_ID, SPOTIFY_CLIENT_SECRET
+from config.config import (
+    SPOTIFY_CLIENT_ID, SPOTIFY_CLIENT_SECRET, SPOTIFY_PAGE_CONCURRENCY, SPOTIFY_BATCH_WINDOW_MS, SPOTIFY_TOKEN_CACHE,
+    MUSIC_PLAYLIST_MAX_TRACKS
+)
 from utils.helpers import sanitize_filename, create_download_dir
+from utils.metadata_cache import metadata_cache, slim_info
+from utils.resolution_index import resolution_index
+from utils.batcher import MicroBatcher
+from utils.audio import get_audio_options
+from utils.rate_governor import rate_governor, is_retryable
+from utils.egress_pool import egress_pool, INFO_EGRESS_KEY
 
 logger = logging.getLogger(__name__)
 
+YOUTUBE_WATCH_URL = "https://www.youtube.com/watch?v="
+
+# Multi-track endpoint limit and how long a single lookup may wait for its batch (seconds)
+SPOTIFY_TRACKS_PER_REQUEST = 50
+SPOTIFY_LOOKUP_TIMEOUT = 30
+
+# Spotify page sizes (API maximums) and the fields needed from playlist responses
+PLAYLIST_PAGE_SIZE = 100
+ALBUM_PAGE_SIZE = 50
+PLAYLIST_TRACK_FIELDS = "items(track(id,name,duration_ms,preview_url,artists(name)))"
+PLAYLIST_FIELDS = f"id,name,description,owner(display_name),images,tracks(total,limit,offset,{PLAYLIST_TRACK_FIELDS})"
+PLAYLIST_PAGE_FIELDS = f"total,limit,offset,{PLAYLIST_TRACK_FIELDS}"
+
+class TokenCacheHandler(CacheFileHandler):
+    """Spotify token cache that creates its directory when the first token is saved"""
+
+    def save_token_to_cache(self, token_info):
+        os.makedirs(os.path.dirname(os.path.abspath(self.cache_path)), exist_ok=True)
+        super().save_token_to_cache(token_info)
+
+def get_downloaded_path(info):
+    """Return the final file path yt-dlp wrote for an info dict, after post-processing"""
+    downloads = (info or {}).get('requested_downloads') or []
+    if not downloads or not downloads[0].get('filepath'):
+        logger.error(f"No file produced for {(info or {}).get('webpage_url')}")
+        return None
+    return downloads[0]['filepath']
+
+def download_via_youtube(track_info, output_dir, source=None):
+    """Download a track's audio from YouTube, skipping the search when the video is already known"""
+    search_query = f"{track_info['name']} {track_info['artist']}"
+    
+    # Use yt-dlp to search and download
+    ydl_opts = {
+        **get_audio_options(),
+        'outtmpl': os.path.join(output_dir, sanitize_filename(f"{track_info['artist']} - {track_info['name']}")),
+        'quiet': True,
+        'noplaylist': True,
+        'default_search': 'ytsearch',
+        # Retries continue the partial file instead of starting over
+        'continuedl': True,
+        'nopart': False,
+        # Stamp files with the download time, not the upload date, for the disk janitor's eviction order
+        'updatetime': False,
+    }
+    
+    with egress_pool.acquire() as egress, yt_dlp.YoutubeDL({**ydl_opts, **egress.ytdlp_options()}) as ydl:
+        video_id = resolution_index.lookup(track_info, source)
+        if video_id:
+            try:
+                info = rate_governor.run('youtube', ydl.extract_info, f"{YOUTUBE_WATCH_URL}{video_id}", download=True, timed=False)
+                return get_downloaded_path(info)
+            except DownloadError as e:
+                # The video may have been removed; search again
+                logger.warning(f"Known video {video_id} for {search_query} failed, searching again: {e}")
+                resolution_index.forget(track_info, source)
+        
+        # Search and download the first result in one pass; the entry is not fetched again
+        info = rate_governor.run('youtube', ydl.extract_info, f"ytsearch1:{search_query}", download=True, timed=False)
+        
+        if not info or not info.get('entries'):
+            logger.error(f"No YouTube results found for {search_query}")
+            return None
+        
+        video = info['entries'][0]
+        resolution_index.record(track_info, video['id'], source)
+        
+        return get_downloaded_path(video)
+
+
 class SpotifyDownloader:
     """Service for downloading music from Spotify"""
     
@@ -16,85 +101,169 @@ class SpotifyDownloader:
         self.client_id = SPOTIFY_CLIENT_ID
         self.client_secret = SPOTIFY_CLIENT_SECRET
         self.sp = None
+        # Track lookups from concurrent requests share multi-track API calls
+        self.track_batcher = MicroBatcher(
+            self._fetch_tracks,
+            max_batch_size=SPOTIFY_TRACKS_PER_REQUEST,
+            max_wait=SPOTIFY_BATCH_WINDOW_MS / 1000,
+            name="spotify-tracks",
+            # A rejected request (e.g. one unknown ID) is retried per track so it can't fail other users' lookups
+            split_on_error=lambda e: not is_retryable(e)
+        )
         self.initialize()
     
     def initialize(self):
         """Initialize Spotify client"""
         if self.client_id and self.client_secret:
             try:
+                # The access token is cached on disk and reused until it expires
                 auth_manager = SpotifyClientCredentials(
                     client_id=self.client_id,
-                    client_secret=self.client_secret
+                    client_secret=self.client_secret,
+                    cache_handler=TokenCacheHandler(cache_path=SPOTIFY_TOKEN_CACHE)
                 )
-                self.sp = spotipy.Spotify(auth_manager=auth_manager)
+                # Retries are left to the rate governor, which honors Retry-After without blocking other upstreams
+                self.sp = spotipy.Spotify(auth_manager=auth_manager, retries=0, status_retries=0)
                 logger.info("Spotify client initialized successfully")
             except Exception as e:
                 logger.error(f"Error initializing Spotify client: {e}")
         else:
             logger.warning("Spotify credentials not provided")
     
-    def get_track_info(self, track_url):
-        """Get track information from Spotify URL"""
+    def _track_details(self, track):
+        """Build track information from a Spotify track object"""
+        return {
+            'id': track['id'],
+            'name': track['name'],
+            'artist': ', '.join([artist['name'] for artist in track['artists']]),
+            'album': track['album']['name'],
+            'duration_ms': track['duration_ms'],
+            'release_date': track['album']['release_date'],
+            'image_url': track['album']['images'][0]['url'] if track['album']['images'] else None,
+            'preview_url': track['preview_url']
+        }
+    
+    def _fetch_tracks(self, track_ids):
+        """Fetch up to 50 tracks in one request and cache them (batcher callback)"""
+        response = rate_governor.run('spotify', self.sp.tracks, track_ids)
+        
+        results = {}
+        for track_id, track in zip(track_ids, response['tracks']):
+            if track:
+                results[track_id] = self._track_details(track)
+                metadata_cache.set('spotify', track_id, results[track_id], variant='track')
+        return results
+    
+    def get_tracks_info(self, track_urls):
+        """Get information for several Spotify tracks, batching uncached lookups"""
         if not self.sp:
             logger.error("Spotify client not initialized")
-            return None
+            return []
         
         try:
-            # Extract track ID from URL
-            track_id = track_url.split('/')[-1].split('?')[0]
+            track_ids = [self._extract_id(url) for url in track_urls]
             
-            # Get track info
-            track = self.sp.track(track_id)
+            tracks = {}
+            for track_id in track_ids:
+                cached = metadata_cache.get('spotify', track_id, variant='track')
+                if cached:
+                    tracks[track_id] = cached
             
-            track_info = {
-                'id': track['id'],
-                'name': track['name'],
-                'artist': ', '.join([artist['name'] for artist in track['artists']]),
-                'album': track['album']['name'],
-                'duration_ms': track['duration_ms'],
-                'release_date': track['album']['release_date'],
-                'image_url': track['album']['images'][0]['url'] if track['album']['images'] else None,
-                'preview_url': track['preview_url']
-            }
+            missing = [track_id for track_id in dict.fromkeys(track_ids) if track_id not in tracks]
+            if missing:
+                tracks.update(self.track_batcher.get_many(missing, timeout=SPOTIFY_LOOKUP_TIMEOUT))
             
-            return track_info
+            return [tracks.get(track_id) for track_id in track_ids]
         except Exception as e:
-            logger.error(f"Error getting track info from Spotify: {e}")
-            return None
+            logger.error(f"Error getting tracks info from Spotify: {e}")
+            return [None] * len(track_urls)
+    
+    def get_track_info(self, track_url):
+        """Get track information from Spotify URL"""
+        tracks = self.get_tracks_info([track_url])
+        return tracks[0] if tracks else None
+    
+    def _extract_id(self, url):
+        """Extract the Spotify object ID from a URL"""
+        return url.split('/')[-1].split('?')[0]
+    
+    def _track_entry(self, track):
+        """Build a playlist/album track entry from a Spotify track object"""
+        return {
+            'id': track['id'],
+            'name': track['name'],
+            'artist': ', '.join([artist['name'] for artist in track['artists']]),
+            'duration_ms': track['duration_ms'],
+            'preview_url': track.get('preview_url')
+        }
+    
+    def _iter_tracks(self, first_page, fetch_page, get_track):
+        """Yield tracks from the first page, then from later pages fetched concurrently.
+        
+        Pages are requested in a sliding window of SPOTIFY_PAGE_CONCURRENCY so the
+        consumer can start on the first tracks while the rest are still loading, and
+        stopping early doesn't fetch the whole collection.
+        """
+        for item in first_page['items']:
+            track = get_track(item)
+            if track and track.get('id'):
+                yield self._track_entry(track)
+        
+        limit = first_page['limit'] or len(first_page['items'])
+        if not limit:
+            return
+        offsets = iter(range(first_page.get('offset', 0) + limit, first_page['total'], limit))
+        
+        executor = ThreadPoolExecutor(max_workers=SPOTIFY_PAGE_CONCURRENCY)
+        try:
+            pending = deque(executor.submit(fetch_page, offset) for offset in islice(offsets, SPOTIFY_PAGE_CONCURRENCY))
+            while pending:
+                try:
+                    page = pending.popleft().result()
+                except Exception as e:
+                    logger.error(f"Error fetching Spotify tracks page: {e}")
+                    return
+                
+                next_offset = next(offsets, None)
+                if next_offset is not None:
+                    pending.append(executor.submit(fetch_page, next_offset))
+                
+                for item in page['items']:
+                    track = get_track(item)
+                    if track and track.get('id'):
+                        yield self._track_entry(track)
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
     
     def get_playlist_info(self, playlist_url):
-        """Get playlist information from Spotify URL"""
+        """Get playlist information from Spotify URL; tracks are yielded lazily"""
         if not self.sp:
             logger.error("Spotify client not initialized")
             return None
         
         try:
             # Extract playlist ID from URL
-            playlist_id = playlist_url.split('/')[-1].split('?')[0]
+            playlist_id = self._extract_id(playlist_url)
             
-            # Get playlist info
-            playlist = self.sp.playlist(playlist_id)
+            # Get playlist info with the first page of tracks
+            playlist = rate_governor.run(
+                'spotify', self.sp.playlist, playlist_id, fields=PLAYLIST_FIELDS, additional_types=('track',)
+            )
             
-            tracks = []
-            for item in playlist['tracks']['items']:
-                track = item['track']
-                if track:
-                    tracks.append({
-                        'id': track['id'],
-                        'name': track['name'],
-                        'artist': ', '.join([artist['name'] for artist in track['artists']]),
-                        'duration_ms': track['duration_ms'],
-                        'preview_url': track['preview_url']
-                    })
+            def fetch_page(offset):
+                return rate_governor.run(
+                    'spotify', self.sp.playlist_items, playlist_id, fields=PLAYLIST_PAGE_FIELDS, limit=PLAYLIST_PAGE_SIZE,
+                    offset=offset, additional_types=('track',)
+                )
             
             playlist_info = {
                 'id': playlist['id'],
                 'name': playlist['name'],
-                'description': playlist['description'],
+                'description': playlist.get('description'),
                 'owner': playlist['owner']['display_name'],
-                'tracks_count': len(tracks),
-                'tracks': tracks,
-                'image_url': playlist['images'][0]['url'] if playlist['images'] else None
+                'tracks_count': playlist['tracks']['total'],
+                'tracks': self._iter_tracks(playlist['tracks'], fetch_page, lambda item: item.get('track')),
+                'image_url': playlist['images'][0]['url'] if playlist.get('images') else None
             }
             
             return playlist_info
@@ -102,6 +271,37 @@ class SpotifyDownloader:
             logger.error(f"Error getting playlist info from Spotify: {e}")
             return None
     
+    def get_album_info(self, album_url):
+        """Get album information from Spotify URL; tracks are yielded lazily"""
+        if not self.sp:
+            logger.error("Spotify client not initialized")
+            return None
+        
+        try:
+            # Extract album ID from URL
+            album_id = self._extract_id(album_url)
+            
+            # Get album info with the first page of tracks
+            album = rate_governor.run('spotify', self.sp.album, album_id)
+            
+            def fetch_page(offset):
+                return rate_governor.run('spotify', self.sp.album_tracks, album_id, limit=ALBUM_PAGE_SIZE, offset=offset)
+            
+            album_info = {
+                'id': album['id'],
+                'name': album['name'],
+                'artist': ', '.join([artist['name'] for artist in album['artists']]),
+                'release_date': album['release_date'],
+                'tracks_count': album['tracks']['total'],
+                'tracks': self._iter_tracks(album['tracks'], fetch_page, lambda item: item),
+                'image_url': album['images'][0]['url'] if album.get('images') else None
+            }
+            
+            return album_info
+        except Exception as e:
+            logger.error(f"Error getting album info from Spotify: {e}")
+            return None
+    
     def download_track(self, track_info, output_dir):
         """Download track using YouTube as a source"""
         if not track_info:
@@ -109,59 +309,26 @@ class SpotifyDownloader:
             return None
         
         try:
-            # Create search query for YouTube
-            search_query = f"{track_info['name']} {track_info['artist']}"
-            
-            # Use yt-dlp to search and download
-            ydl_opts = {
-                'format': 'bestaudio/best',
-                'postprocessors': [{
-                    'key': 'FFmpegExtractAudio',
-                    'preferredcodec': 'mp3',
-                    'preferredquality': '192',
-                }],
-                'outtmpl': os.path.join(output_dir, sanitize_filename(f"{track_info['artist']} - {track_info['name']}")),
-                'quiet': True,
-                'noplaylist': True,
-                'default_search': 'ytsearch',
-            }
-            
-            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                # Search for the track on YouTube
-                info = ydl.extract_info(f"ytsearch:{search_query}", download=False)
-                
-                if not info or 'entries' not in info or not info['entries']:
-                    logger.error(f"No YouTube results found for {search_query}")
-                    return None
-                
-                # Get the first result
-                video = info['entries'][0]
-                
-                # Download the track
-                ydl.download([video['webpage_url']])
-                
-                # Return the file path
-                file_path = f"{ydl_opts['outtmpl']}.mp3"
-                
-                return file_path
+            return download_via_youtube(track_info, output_dir, source='spotify')
         except Exception as e:
             logger.error(f"Error downloading track from YouTube: {e}")
             return None
     
-    def download_playlist(self, playlist_info, output_dir, max_tracks=10):
-        """Download playlist tracks using YouTube as a source"""
+    def download_playlist(self, playlist_info, output_dir, max_tracks=MUSIC_PLAYLIST_MAX_TRACKS):
+        """Download up to ``max_tracks`` playlist tracks (0 = all) using YouTube as a source"""
         if not playlist_info or not playlist_info['tracks']:
             logger.error("No playlist info provided or empty playlist")
             return []
         
         downloaded_tracks = []
         
-        # Limit the number of tracks to download
-        tracks_to_download = playlist_info['tracks'][:max_tracks]
+        # Limit the number of tracks to download; later pages are only fetched if needed
+        tracks_to_download = islice(playlist_info['tracks'], max_tracks or None)
         
         for track in tracks_to_download:
             try:
                 track_info = {
+                    'id': track['id'],
                     'name': track['name'],
                     'artist': track['artist'],
                     'duration_ms': track['duration_ms']
@@ -223,41 +390,7 @@ class AppleMusicDownloader:
             return None
         
         try:
-            # Create search query for YouTube
-            search_query = f"{track_info['name']} {track_info['artist']}"
-            
-            # Use yt-dlp to search and download
-            ydl_opts = {
-                'format': 'bestaudio/best',
-                'postprocessors': [{
-                    'key': 'FFmpegExtractAudio',
-                    'preferredcodec': 'mp3',
-                    'preferredquality': '192',
-                }],
-                'outtmpl': os.path.join(output_dir, sanitize_filename(f"{track_info['artist']} - {track_info['name']}")),
-                'quiet': True,
-                'noplaylist': True,
-                'default_search': 'ytsearch',
-            }
-            
-            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                # Search for the track on YouTube
-                info = ydl.extract_info(f"ytsearch:{search_query}", download=False)
-                
-                if not info or 'entries' not in info or not info['entries']:
-                    logger.error(f"No YouTube results found for {search_query}")
-                    return None
-                
-                # Get the first result
-                video = info['entries'][0]
-                
-                # Download the track
-                ydl.download([video['webpage_url']])
-                
-                # Return the file path
-                file_path = f"{ydl_opts['outtmpl']}.mp3"
-                
-                return file_path
+            return download_via_youtube(track_info, output_dir)
         except Exception as e:
             logger.error(f"Error downloading track from YouTube: {e}")
             return None
@@ -269,33 +402,54 @@ class SoundCloudDownloader:
     def __init__(self):
         pass
     
+    def _extract_info_once(self, url, ydl_opts):
+        """Run one yt-dlp extraction through the least-loaded egress"""
+        with egress_pool.acquire() as egress:
+            with yt_dlp.YoutubeDL({**ydl_opts, **egress.ytdlp_options()}) as ydl:
+                info = ydl.extract_info(url, download=False)
+                if not info:
+                    return None
+                info = slim_info(ydl.sanitize_info(info))
+                info[INFO_EGRESS_KEY] = egress.name
+                return info
+    
+    def _extract_info(self, url, ydl_opts):
+        """Run yt-dlp extraction and return a JSON-safe info dict"""
+        return rate_governor.run('soundcloud', self._extract_info_once, url, ydl_opts)
+    
+    def _get_info(self, track_url):
+        """Get the full info dict for a track, from the cache when possible"""
+        ydl_opts = {
+            'quiet': True,
+            'no_warnings': True,
+            'skip_download': True,
+        }
+        
+        return metadata_cache.get_or_extract(
+            'soundcloud', track_url, lambda: self._extract_info(track_url, ydl_opts)
+        )
+    
+    def _track_info(self, info, track_url):
+        """Build the track metadata returned to callers from an info dict"""
+        return {
+            'id': info.get('id'),
+            'name': info.get('title'),
+            'artist': info.get('uploader'),
+            'duration': info.get('duration'),
+            'thumbnail': info.get('thumbnail'),
+            'url': track_url
+        }
+    
     def get_track_info(self, track_url):
         """Get track information from SoundCloud URL"""
         try:
-            # Use yt-dlp to get track info
-            ydl_opts = {
-                'quiet': True,
-                'no_warnings': True,
-                'skip_download': True,
-            }
+            info = self._get_info(track_url)
             
-            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                info = ydl.extract_info(track_url, download=False)
-                
-                if not info:
-                    logger.error(f"No info found for SoundCloud URL: {track_url}")
-                    return None
-                
-                track_info = {
-                    'id': info.get('id'),
-                    'name': info.get('title'),
-                    'artist': info.get('uploader'),
-                    'duration': info.get('duration'),
-                    'thumbnail': info.get('thumbnail'),
-                    'url': track_url
-                }
-                
-                return track_info
+            if not info:
+                logger.error(f"No info found for SoundCloud URL: {track_url}")
+                return None
+            
+            return self._track_info(info, track_url)
         except Exception as e:
             logger.error(f"Error getting track info from SoundCloud: {e}")
             return None
@@ -311,102 +465,104 @@ class SoundCloudDownloader:
                 'extract_flat': True,
             }
             
-            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                info = ydl.extract_info(playlist_url, download=False)
-                
-                if not info or 'entries' not in info:
-                    logger.error(f"No playlist info found for SoundCloud URL: {playlist_url}")
-                    return None
-                
-                tracks = []
-                for entry in info['entries']:
-                    tracks.append({
-                        'id': entry.get('id'),
-                        'name': entry.get('title'),
-                        'artist': entry.get('uploader'),
-                        'url': entry.get('url')
-                    })
-                
-                playlist_info = {
-                    'id': info.get('id'),
-                    'name': info.get('title'),
-                    'uploader': info.get('uploader'),
-                    'tracks_count': len(tracks),
-                    'tracks': tracks,
-                    'url': playlist_url
-                }
-                
-                return playlist_info
+            info = metadata_cache.get_or_extract(
+                'soundcloud', playlist_url, lambda: self._extract_info(playlist_url, ydl_opts), variant='flat'
+            )
+            
+            if not info or 'entries' not in info:
+                logger.error(f"No playlist info found for SoundCloud URL: {playlist_url}")
+                return None
+            
+            tracks = []
+            for entry in info['entries']:
+                tracks.append({
+                    'id': entry.get('id'),
+                    'name': entry.get('title'),
+                    'artist': entry.get('uploader'),
+                    'url': entry.get('url')
+                })
+            
+            playlist_info = {
+                'id': info.get('id'),
+                'name': info.get('title'),
+                'uploader': info.get('uploader'),
+                'tracks_count': len(tracks),
+                'tracks': tracks,
+                'url': playlist_url
+            }
+            
+            return playlist_info
         except Exception as e:
             logger.error(f"Error getting playlist info from SoundCloud: {e}")
             return None
     
     def download_track(self, track_url, output_dir):
-        """Download track from SoundCloud"""
+        """Download track from SoundCloud, returning its metadata and file path"""
         try:
-            # Get track info first
-            track_info = self.get_track_info(track_url)
+            # Extract once; the download below starts from this info dict
+            info = self._get_info(track_url)
             
-            if not track_info:
+            if not info:
                 logger.error(f"Could not get track info for {track_url}")
                 return None
             
+            track_info = self._track_info(info, track_url)
+            
             # Use yt-dlp to download
             ydl_opts = {
-                'format': 'bestaudio/best',
-                'postprocessors': [{
-                    'key': 'FFmpegExtractAudio',
-                    'preferredcodec': 'mp3',
-                    'preferredquality': '192',
-                }],
+                **get_audio_options(),
                 'outtmpl': os.path.join(output_dir, sanitize_filename(f"{track_info['artist']} - {track_info['name']}")),
                 'quiet': True,
             }
             
-            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                ydl.download([track_url])
-                
-                # Return the file path
-                file_path = f"{ydl_opts['outtmpl']}.mp3"
-                
-                return file_path
+            # Stream URLs may be tied to the address that extracted them
+            with egress_pool.acquire(prefer=info.get(INFO_EGRESS_KEY)) as egress, \
+                    yt_dlp.YoutubeDL({**ydl_opts, **egress.ytdlp_options()}) as ydl:
+                try:
+                    # Work on a copy; yt-dlp annotates the dict while processing it
+                    result = ydl.process_ie_result(copy.deepcopy(info), download=True)
+                except DownloadError as e:
+                    # Cached stream URLs are signed and expire; extract afresh
+                    logger.warning(f"Cached info for {track_url} failed to download, re-extracting: {e}")
+                    metadata_cache.invalidate('soundcloud', track_url)
+                    result = rate_governor.run('soundcloud', ydl.extract_info, track_url, download=True, timed=False)
+            
+            file_path = get_downloaded_path(result)
+            if not file_path:
+                return None
+            
+            track_info['file_path'] = file_path
+            return track_info
         except Exception as e:
             logger.error(f"Error downloading track from SoundCloud: {e}")
             return None
     
-    def download_playlist(self, playlist_url, output_dir, max_tracks=10):
-        """Download playlist tracks from SoundCloud"""
-        try:
-            # Get playlist info first
-            playlist_info = self.get_playlist_info(playlist_url)
-            
-            if not playlist_info or not playlist_info['tracks']:
-                logger.error(f"Could not get playlist info for {playlist_url}")
-                return []
-            
-            downloaded_tracks = []
-            
-            # Limit the number of tracks to download
-            tracks_to_download = playlist_info['tracks'][:max_tracks]
-            
-            for track in tracks_to_download:
-                try:
-                    file_path = self.download_track(track['url'], output_dir)
-                    
-                    if file_path:
-                        downloaded_tracks.append({
-                            'name': track['name'],
-                            'artist': track['artist'],
-                            'file_path': file_path
-                        })
-                except Exception as e:
-                    logger.error(f"Error downloading track {track['name']}: {e}")
-                    continue
-            
-            return downloaded_tracks
-        except Exception as e:
-            logger.error(f"Error downloading playlist from SoundCloud: {e}")
+    def download_playlist(self, playlist_info, output_dir, max_tracks=MUSIC_PLAYLIST_MAX_TRACKS):
+        """Download up to ``max_tracks`` playlist tracks (0 = all) from SoundCloud"""
+        if not playlist_info or not playlist_info['tracks']:
+            logger.error("No playlist info provided or empty playlist")
             return []
+        
+        downloaded_tracks = []
+        
+        # Limit the number of tracks to download
+        tracks_to_download = playlist_info['tracks'][:max_tracks or None]
+        
+        for track in tracks_to_download:
+            try:
+                result = self.download_track(track['url'], output_dir)
+                
+                if result:
+                    downloaded_tracks.append({
+                        'name': result['name'] or track['name'],
+                        'artist': result['artist'] or track['artist'],
+                        'file_path': result['file_path']
+                    })
+            except Exception as e:
+                logger.error(f"Error downloading track {track['name']}: {e}")
+                continue
+        
+        return downloaded_tracks
 
 
 class MusicDownloadService:
@@ -435,9 +591,12 @@ class MusicDownloadService:
     
     def download_from_spotify(self, url, output_dir):
         """Download music from Spotify"""
-        if 'playlist' in url:
-            # It's a playlist
-            playlist_info = self.spotify_downloader.get_playlist_info(url)
+        if 'playlist' in url or 'album' in url:
+            # It's a playlist or an album
+            if 'album' in url:
+                playlist_info = self.spotify_downloader.get_album_info(url)
+            else:
+                playlist_info = self.spotify_downloader.get_playlist_info(url)
             if playlist_info:
                 return {
                     'type': 'playlist',
@@ -481,23 +640,21 @@ class MusicDownloadService:
             # It's a playlist
             playlist_info = self.soundcloud_downloader.get_playlist_info(url)
             if playlist_info:
-                downloaded_tracks = self.soundcloud_downloader.download_playlist(url, output_dir)
                 return {
                     'type': 'playlist',
                     'name': playlist_info['name'],
                     'tracks_count': playlist_info['tracks_count'],
-                    'tracks': downloaded_tracks
+                    'tracks': self.soundcloud_downloader.download_playlist(playlist_info, output_dir)
                 }
         else:
-            # It's a track
-            file_path = self.soundcloud_downloader.download_track(url, output_dir)
-            if file_path:
-                track_info = self.soundcloud_downloader.get_track_info(url)
+            # It's a track; metadata and file come back from the same extraction
+            track_info = self.soundcloud_downloader.download_track(url, output_dir)
+            if track_info:
                 return {
                     'type': 'track',
                     'name': track_info['name'],
                     'artist': track_info['artist'],
-                    'file_path': file_path
+                    'file_path': track_info['file_path']
                 }
         
         return None
@@ -0,0 +1,123 @@
+import os
+import copy
+import logging
+import yt_dlp
+from yt_dlp.utils import DownloadError
+from utils.metadata_cache import metadata_cache, slim_info
+from utils.audio import get_audio_options
+from utils.rate_governor import rate_governor
+from utils.circuit_breaker import CircuitOpenError
+from utils.egress_pool import egress_pool, INFO_EGRESS_KEY
+
+logger = logging.getLogger(__name__)
+
+YOUTUBE_WATCH_URL = "https://www.youtube.com/watch?v="
+
+class YouTubeDownloader:
+    """Service for downloading videos and audio from YouTube"""
+
+    def __init__(self, cache=None):
+        # Info dicts are cached per URL. Their format URLs stay valid for a few hours,
+        # so the download step can start from them without re-extracting.
+        self.cache = cache or metadata_cache
+
+    def _extract_info_once(self, url):
+        """Extract info through the least-loaded egress; retries may pick another one"""
+        ydl_opts = {
+            'quiet': True,
+            'no_warnings': True,
+            'skip_download': True,
+            'format': 'best',
+        }
+
+        with egress_pool.acquire() as egress:
+            with yt_dlp.YoutubeDL({**ydl_opts, **egress.ytdlp_options()}) as ydl:
+                info = ydl.extract_info(url, download=False)
+                if not info:
+                    return None
+                # Drop non-serializable internals and fields nothing reads so the dict stays small on disk
+                info = slim_info(ydl.sanitize_info(info))
+                # Format URLs are tied to the extracting IP, so downloads reuse this egress
+                info[INFO_EGRESS_KEY] = egress.name
+                return info
+
+    def extract_info(self, url):
+        """Extract video or playlist info with yt-dlp (blocking)"""
+        return rate_governor.run('youtube', self._extract_info_once, url)
+
+    def get_video_info(self, url):
+        """Get video or playlist info, from the cache when possible (blocking)"""
+        return self.cache.get_or_extract('youtube', url, lambda: self.extract_info(url))
+
+    @staticmethod
+    def playlist_video_urls(info):
+        """Return the watch URLs of a playlist info dict's entries, in order"""
+        urls = []
+        for entry in info.get('entries') or []:
+            if not entry:
+                continue
+            url = entry.get('webpage_url') or entry.get('url') or (entry.get('id') and f"{YOUTUBE_WATCH_URL}{entry['id']}")
+            if url:
+                urls.append(url)
+        return urls
+
+    def get_download_options(self, format_choice, output_dir):
+        """Build yt-dlp options for a format chosen from the quality menu"""
+        ydl_opts = {
+            'outtmpl': os.path.join(output_dir, '%(title)s.%(ext)s'),
+            'quiet': True,
+            'no_warnings': True,
+            'noplaylist': True,
+            # Keep partial files and continue them, so an interrupted download resumes where it stopped
+            'continuedl': True,
+            'nopart': False,
+            # Stamp files with the download time, not the upload date, for the disk janitor's eviction order
+            'updatetime': False,
+        }
+
+        if format_choice == 'audio':
+            ydl_opts.update(get_audio_options())
+        else:
+            format_id = format_choice[len('video_'):] if format_choice.startswith('video_') else format_choice
+            ydl_opts['format'] = f"{format_id}+bestaudio/{format_id}/best"
+            ydl_opts['merge_output_format'] = 'mp4'
+
+        return ydl_opts
+
+    def download_video(self, url, format_choice, output_dir):
+        """Download a video in the chosen format, reusing cached info when available"""
+        try:
+            ydl_opts = self.get_download_options(format_choice, output_dir)
+            info = self.cache.get('youtube', url)
+
+            with egress_pool.acquire(prefer=info.get(INFO_EGRESS_KEY) if info else None) as egress, \
+                    yt_dlp.YoutubeDL({**ydl_opts, **egress.ytdlp_options()}) as ydl:
+                if info:
+                    try:
+                        # Work on a copy; yt-dlp annotates the dict while processing it
+                        info = ydl.process_ie_result(copy.deepcopy(info), download=True)
+                    except DownloadError as e:
+                        # Stored format URLs may have expired; start over from the page
+                        logger.warning(f"Cached info for {url} failed to download, re-extracting: {e}")
+                        self.cache.invalidate('youtube', url)
+                        info = None
+
+                if not info:
+                    info = rate_governor.run('youtube', ydl.extract_info, url, download=True, timed=False)
+
+            downloads = info.get('requested_downloads') or []
+            if not downloads or not downloads[0].get('filepath'):
+                logger.error(f"No file produced for YouTube video: {url}")
+                return None
+
+            return {
+                'title': info.get('title', 'Unknown'),
+                'duration': info.get('duration'),
+                'uploader': info.get('uploader'),
+                'file_path': downloads[0]['filepath']
+            }
+        except CircuitOpenError:
+            raise
+        except Exception as e:
+            logger.error(f"Error downloading YouTube video: {e}")
+            return None
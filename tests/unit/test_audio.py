@@ -0,0 +1,31 @@
+import unittest
+import sys
+import os
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from yt_dlp.postprocessor.ffmpeg import FFmpegExtractAudioPP, resolve_mapping
+from utils.audio import get_audio_options
+
+class TestAudioOptions(unittest.TestCase):
+
+    def test_mp3_only(self):
+        """Without native codecs everything becomes MP3"""
+        options = get_audio_options(native_codecs=[])
+        self.assertEqual(options['format'], 'bestaudio/best')
+        self.assertEqual(options['postprocessors'][0]['preferredcodec'], 'mp3')
+
+    def test_native_codecs_kept(self):
+        """Native streams map to themselves and the rest falls back to MP3"""
+        options = get_audio_options(native_codecs=['m4a', 'opus'])
+        mapping = options['postprocessors'][0]['preferredcodec']
+
+        self.assertTrue(options['format'].startswith('bestaudio[ext=m4a]/bestaudio[acodec=opus]/'))
+        self.assertTrue(FFmpegExtractAudioPP.FORMAT_RE.fullmatch(mapping))
+        self.assertEqual(resolve_mapping('m4a', mapping)[0], 'm4a')
+        self.assertEqual(resolve_mapping('webm', mapping)[0], 'opus')
+        self.assertEqual(resolve_mapping('mp4', mapping)[0], 'mp3')
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,61 @@
+import unittest
+import sys
+import os
+import threading
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.batcher import MicroBatcher
+
+class TestMicroBatcher(unittest.TestCase):
+
+    def test_concurrent_lookups_share_a_batch(self):
+        """Lookups from several threads within the window become one call"""
+        calls = []
+        batcher = MicroBatcher(lambda keys: calls.append(keys) or {k: k.upper() for k in keys}, max_wait=0.2)
+
+        results = {}
+        threads = [threading.Thread(target=lambda k=k: results.update({k: batcher.get(k, timeout=5)})) for k in "abc"]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(results, {'a': 'A', 'b': 'B', 'c': 'C'})
+        self.assertEqual(len(calls), 1)
+
+    def test_batch_size_limit_and_duplicates(self):
+        """Batches are capped and duplicate keys are fetched once"""
+        calls = []
+        batcher = MicroBatcher(lambda keys: calls.append(keys) or {k: k for k in keys}, max_batch_size=2, max_wait=0.2)
+
+        self.assertEqual(batcher.get_many(['a', 'a', 'b', 'c'], timeout=5), {'a': 'a', 'b': 'b', 'c': 'c'})
+        self.assertEqual([len(keys) for keys in calls], [2, 1])
+
+    def test_errors_reach_every_caller(self):
+        """A failed batch raises for each waiting lookup"""
+        def fail(keys):
+            raise RuntimeError("upstream down")
+
+        batcher = MicroBatcher(fail, max_wait=0)
+        with self.assertRaises(RuntimeError):
+            batcher.get('a', timeout=5)
+
+    def test_rejected_batch_is_retried_per_key(self):
+        """A batch rejected because of one key only fails that key's lookups"""
+        def fetch(keys):
+            if 'bad' in keys:
+                raise ValueError("invalid id")
+            return {k: k.upper() for k in keys}
+
+        batcher = MicroBatcher(fetch, max_wait=0.2, split_on_error=lambda e: isinstance(e, ValueError))
+        good = batcher.submit('a')
+        bad = batcher.submit('bad')
+
+        self.assertEqual(good.result(timeout=5), 'A')
+        with self.assertRaises(ValueError):
+            bad.result(timeout=5)
+
+if __name__ == "__main__":
+    unittest.main()
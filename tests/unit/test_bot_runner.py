@@ -0,0 +1,26 @@
+import unittest
+import sys
+import os
+import asyncio
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.bot_runner import start_background_task, run_shutdown_hooks, BACKGROUND_TASKS
+
+class TestBackgroundTasks(unittest.TestCase):
+
+    def test_shutdown_cancels_background_tasks(self):
+        """Tasks started alongside the bot are cancelled and awaited at shutdown"""
+        async def scenario():
+            task = start_background_task(asyncio.sleep(60))
+            await asyncio.sleep(0)
+            await run_shutdown_hooks(application=None)
+            return task
+
+        task = asyncio.run(scenario())
+        self.assertTrue(task.cancelled())
+        self.assertEqual(BACKGROUND_TASKS, set())
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,66 @@
+import asyncio
+import unittest
+import sys
+import os
+from types import SimpleNamespace
+from unittest import mock
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.callback_router import CallbackRouter
+
+async def handler_a(update, context, callback_data):
+    pass
+
+async def handler_b(update, context, callback_data):
+    pass
+
+async def handler_c(update, context, callback_data):
+    pass
+
+class TestCallbackRouter(unittest.TestCase):
+
+    def setUp(self):
+        self.router = CallbackRouter()
+        self.router.register("menu_main", handler_a)
+        self.router.register("playlist_delete_", handler_b, prefix=True)
+        self.router.register("playlist_delete_confirm_", handler_c, prefix=True, answer=False)
+
+    def test_exact_match(self):
+        """Exact callback data resolves through the dict"""
+        self.assertEqual(self.router.resolve("menu_main"), (handler_a, True))
+
+    def test_longest_prefix_wins(self):
+        """The deepest registered prefix is chosen"""
+        self.assertEqual(self.router.resolve("playlist_delete_12"), (handler_b, True))
+        self.assertEqual(self.router.resolve("playlist_delete_confirm_12"), (handler_c, False))
+
+    def test_no_match(self):
+        """Unknown data and partial prefixes do not resolve"""
+        self.assertIsNone(self.router.resolve("menu_mainx"))
+        self.assertIsNone(self.router.resolve("playlist_del"))
+        self.assertIsNone(self.router.resolve(""))
+
+    def test_decorators(self):
+        """Decorators register several values and return the handler unchanged"""
+        @self.router.exact("vip_1month", "vip_3month")
+        async def plan(update, context, callback_data):
+            pass
+
+        @self.router.prefix("instagram_type_")
+        async def content_type(update, context, callback_data):
+            pass
+
+        self.assertEqual(self.router.resolve("vip_3month")[0], plan)
+        self.assertEqual(self.router.resolve("instagram_type_reel")[0], content_type)
+
+    def test_dispatch_answers_once(self):
+        """The router answers for default routes and leaves answer=False routes to the handler"""
+        for data, expected in (("menu_main", 1), ("playlist_delete_confirm_1", 0)):
+            query = SimpleNamespace(data=data, answer=mock.AsyncMock())
+            asyncio.run(self.router.dispatch(SimpleNamespace(callback_query=query), None))
+            self.assertEqual(query.answer.await_count, expected)
+
+if __name__ == "__main__":
+    unittest.main()
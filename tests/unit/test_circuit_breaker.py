@@ -0,0 +1,91 @@
+import unittest
+import sys
+import os
+import asyncio
+import time
+from unittest import mock
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.circuit_breaker import CircuitBreaker, CircuitBreakerRegistry, CircuitOpenError, CLOSED, OPEN, HALF_OPEN
+from utils.rate_governor import RateGovernor
+
+class TestCircuitBreaker(unittest.TestCase):
+
+    def setUp(self):
+        self.now = 1000.0
+        patcher = mock.patch('utils.circuit_breaker.time.monotonic', side_effect=lambda: self.now)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.breaker = CircuitBreaker("youtube", failure_rate=0.5, slow_call_seconds=5, min_calls=4, window=60, open_seconds=30)
+
+    def test_opens_on_error_rate_and_fails_fast(self):
+        """Enough failures open the circuit and further calls are rejected"""
+        for ok in (True, False, True, False):
+            self.breaker.record(ok)
+
+        self.assertEqual(self.breaker.state, OPEN)
+        with self.assertRaises(CircuitOpenError):
+            self.breaker.allow()
+
+    def test_opens_on_slow_calls(self):
+        """Calls over the latency threshold count toward opening"""
+        breaker = CircuitBreaker("spotify", slow_call_rate=0.5, slow_call_seconds=5, min_calls=2)
+        breaker.record(True, duration=10)
+        breaker.record(True, duration=12)
+        self.assertEqual(breaker.state, OPEN)
+
+    def test_half_open_probe(self):
+        """After the open period one probe goes through; its success closes the circuit"""
+        for _ in range(4):
+            self.breaker.record(False)
+        self.now += 31
+
+        self.assertEqual(self.breaker.state, HALF_OPEN)
+        self.breaker.allow()
+        with self.assertRaises(CircuitOpenError):
+            self.breaker.allow()
+
+        self.breaker.record(True, duration=1)
+        self.assertEqual(self.breaker.state, CLOSED)
+
+    def test_governor_fails_fast_when_open(self):
+        """The rate governor rejects calls to an open platform without calling it"""
+        breakers = CircuitBreakerRegistry(min_calls=1, failure_rate=0.5)
+        governor = RateGovernor(max_retries=0, breakers=breakers)
+        func = mock.Mock(side_effect=ConnectionResetError())
+
+        with self.assertRaises(ConnectionResetError):
+            governor.run('instagram', func)
+        with self.assertRaises(CircuitOpenError):
+            governor.run('instagram', func)
+
+        self.assertEqual(func.call_count, 1)
+        self.assertEqual(breakers.first_open('youtube', 'instagram'), 'instagram')
+
+class TestAbandonedProbe(unittest.TestCase):
+
+    def test_cancelled_probe_releases_half_open_circuit(self):
+        """A probe cancelled before it finishes frees the circuit for the next probe"""
+        breakers = CircuitBreakerRegistry(min_calls=1, failure_rate=0.5, open_seconds=0)
+        breaker = breakers.get('youtube')
+        breaker.record(False)
+        governor = RateGovernor(max_retries=0, breakers=breakers)
+
+        async def cancelled_probe():
+            task = asyncio.create_task(governor.run_async('youtube', time.sleep, 5))
+            await asyncio.sleep(0.01)
+            task.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await task
+
+        # The probe is still running when it gets cancelled
+        with mock.patch('utils.rate_governor.asyncio.to_thread', new=lambda *a, **k: asyncio.sleep(5)):
+            asyncio.run(cancelled_probe())
+
+        self.assertEqual(breaker.state, HALF_OPEN)
+        breaker.allow()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,101 @@
+import unittest
+import sys
+import os
+import shutil
+import tempfile
+import time
+from collections import namedtuple
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.disk_janitor import DiskJanitor
+
+DiskUsage = namedtuple('DiskUsage', 'total used free')
+
+class TestDiskJanitor(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.root = self.tmp.name
+        self.total = 10000
+        self.other_used = 0
+
+    def disk_usage(self, path):
+        """Pretend the disk holds the files under root plus ``other_used`` bytes"""
+        used = self.other_used + DiskJanitor._tree_size(self.root)
+        return DiskUsage(self.total, used, self.total - used)
+
+    def make_file(self, relpath, size, age):
+        path = os.path.join(self.root, relpath)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as f:
+            f.write(b"x" * size)
+        stamp = time.time() - age
+        os.utime(path, (stamp, stamp))
+        return path
+
+    def make_janitor(self, **kwargs):
+        return DiskJanitor(self.root, high_watermark=0.8, low_watermark=0.5, critical_free_bytes=1000,
+                           stale_seconds=3600, disk_usage=self.disk_usage, **kwargs)
+
+    def test_evicts_least_recently_served_down_to_low_watermark(self):
+        """Above the high watermark the oldest files go first, skipping guarded dirs"""
+        self.other_used = 3000
+        oldest = self.make_file("user_1/a.mp3", 2000, age=300)
+        older = self.make_file("user_1/b.mp3", 2000, age=200)
+        recent = self.make_file("user_1/c.mp3", 1000, age=100)
+        busy = self.make_file("user_2/d.mp3", 1000, age=900)
+
+        janitor = self.make_janitor()
+        janitor.add_guard(lambda: [os.path.join(self.root, "user_2")])
+
+        self.assertEqual(janitor.sweep(), 4000)
+        self.assertFalse(os.path.exists(oldest))
+        self.assertFalse(os.path.exists(older))
+        self.assertTrue(os.path.exists(recent))
+        self.assertTrue(os.path.exists(busy))
+        self.assertEqual(janitor.get_stats()['bytes_reclaimed'], 4000)
+
+    def test_served_files_evicted_last(self):
+        """Eviction follows mark_served, not access times left by reads"""
+        self.other_used = 4000
+        served = self.make_file("user_1/a.mp3", 500, age=300)
+        read = self.make_file("user_1/b.mp3", 3500, age=200)
+        os.utime(read, (time.time(), time.time() - 200))
+
+        janitor = self.make_janitor()
+        janitor.mark_served(served)
+
+        self.assertEqual(janitor.sweep(), 3500)
+        self.assertTrue(os.path.exists(served))
+        self.assertFalse(os.path.exists(read))
+
+    def test_removes_stale_leftovers_only(self):
+        """Old partial files and temp dirs are removed below the watermark; fresh ones stay"""
+        stale_part = self.make_file("user_1/a.mp4.part", 100, age=7200)
+        fresh_part = self.make_file("user_1/b.mp4.part", 100, age=60)
+        temp_file = self.make_file("user_1/.instaloader-x1/post.jpg", 100, age=7200)
+        os.utime(os.path.dirname(temp_file), (time.time() - 7200, time.time() - 7200))
+        kept = self.make_file("user_1/c.mp3", 100, age=7200)
+
+        janitor = self.make_janitor()
+        janitor.sweep()
+
+        self.assertFalse(os.path.exists(stale_part))
+        self.assertFalse(os.path.exists(os.path.dirname(temp_file)))
+        self.assertTrue(os.path.exists(fresh_part))
+        self.assertTrue(os.path.exists(kept))
+        self.assertEqual(janitor.get_stats()['stale_removed'], 2)
+
+    def test_pauses_admission_when_space_is_critical(self):
+        """Jobs are refused while free space is under the critical threshold"""
+        janitor = self.make_janitor()
+        self.assertFalse(janitor.admission_paused())
+        self.other_used = 9500
+        self.assertTrue(janitor.admission_paused())
+        self.assertEqual(janitor.get_stats()['jobs_rejected'], 1)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,11 +1,14 @@
 import unittest
 import sys
 import os
+import errno
+import tempfile
+from unittest import mock
 
 # Add parent directory to path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from utils.helpers import sanitize_filename, format_size, get_file_size
+from utils.helpers import sanitize_filename, format_size, get_file_size, move_file
 
 class TestHelpers(unittest.TestCase):
     
@@ -51,6 +54,27 @@ class TestHelpers(unittest.TestCase):
         
         # Test non-existent file
         self.assertEqual(get_file_size("non_existent_file.txt"), 0)
+    
+    def test_move_file(self):
+        """Test move_file with a rename and with a cross-device copy"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            data = os.urandom(3 * 1024 * 1024 + 17)
+            src = os.path.join(temp_dir, "src.bin")
+            
+            with open(src, 'wb') as f:
+                f.write(data)
+            dst = move_file(src, os.path.join(temp_dir, "renamed.bin"))
+            self.assertFalse(os.path.exists(src))
+            
+            # Simulate the destination being on another filesystem
+            cross_device = OSError(errno.EXDEV, "Invalid cross-device link")
+            with mock.patch('utils.helpers.os.replace', side_effect=cross_device), \
+                    mock.patch('utils.helpers.COPY_CHUNK_SIZE', 1024 * 1024):
+                copied = move_file(dst, os.path.join(temp_dir, "copied.bin"))
+            
+            self.assertFalse(os.path.exists(dst))
+            with open(copied, 'rb') as f:
+                self.assertEqual(f.read(), data)
 
 if __name__ == "__main__":
     unittest.main()
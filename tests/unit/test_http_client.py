@@ -0,0 +1,66 @@
+import unittest
+import sys
+import os
+import tempfile
+import httpx
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.http_client import MediaHttpClient
+
+class TestMediaHttpClient(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.output_path = os.path.join(self.tmp.name, "photo.jpg")
+
+    def make_client(self, handler):
+        client = MediaHttpClient(transport=httpx.MockTransport(handler))
+        self.addCleanup(client.close)
+        return client
+
+    def test_streams_to_file(self):
+        """The body is written to the target path in chunks"""
+        body = b"x" * 5000
+        client = self.make_client(lambda request: httpx.Response(200, content=body))
+
+        self.assertEqual(client.download("https://cdn.example/photo.jpg", self.output_path, chunk_size=1024), self.output_path)
+        with open(self.output_path, 'rb') as f:
+            self.assertEqual(f.read(), body)
+        self.assertFalse(os.path.exists(self.output_path + ".part"))
+
+    def test_http_error_leaves_nothing(self):
+        """A failed download returns None without leaving partial files"""
+        client = self.make_client(lambda request: httpx.Response(403))
+
+        self.assertIsNone(client.download("https://cdn.example/photo.jpg", self.output_path))
+        self.assertEqual(os.listdir(self.tmp.name), [])
+
+    def test_resumes_partial_file(self):
+        """A leftover .part file is continued with a Range request"""
+        with open(self.output_path + ".part", 'wb') as f:
+            f.write(b"abc")
+
+        def handler(request):
+            self.assertEqual(request.headers.get('Range'), "bytes=3-")
+            return httpx.Response(206, content=b"def")
+
+        client = self.make_client(handler)
+        self.assertEqual(client.download("https://cdn.example/photo.jpg", self.output_path), self.output_path)
+        with open(self.output_path, 'rb') as f:
+            self.assertEqual(f.read(), b"abcdef")
+
+    def test_network_error_propagates(self):
+        """Transport failures are raised for the caller to retry"""
+        def handler(request):
+            raise httpx.ConnectError("connection refused")
+
+        client = self.make_client(handler)
+        with self.assertRaises(httpx.TransportError):
+            client.download("https://cdn.example/photo.jpg", self.output_path)
+        self.assertFalse(os.path.exists(self.output_path))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,151 @@
+import unittest
+import sys
+import os
+import subprocess
+import tempfile
+import asyncio
+from unittest import mock
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.instagram_service import InstagramDownloadService, InstagramDownloader, route_context
+from utils.egress_pool import Egress
+import instaloader
+from instaloader import instaloadercontext
+
+class TestInstagramAudioExtraction(unittest.TestCase):
+
+    def setUp(self):
+        with mock.patch('services.instagram_service.InstagramDownloader'):
+            self.service = InstagramDownloadService()
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.video_path = os.path.join(self.tmp.name, "owner_reel_abc.mp4")
+
+    @mock.patch('services.instagram_service.subprocess.run')
+    def test_stream_copy_to_m4a(self, run):
+        """AAC audio is copied into M4A without re-encoding"""
+        self.assertEqual(self.service.extract_audio(self.video_path), os.path.join(self.tmp.name, "owner_reel_abc.m4a"))
+
+        command = run.call_args[0][0]
+        self.assertIn('copy', command)
+        self.assertEqual(run.call_count, 1)
+
+    @mock.patch('services.instagram_service.subprocess.run')
+    def test_falls_back_to_mp3(self, run):
+        """Non-copyable audio is converted to MP3"""
+        run.side_effect = [subprocess.CalledProcessError(1, 'ffmpeg'), None]
+        self.assertEqual(self.service.extract_audio(self.video_path), os.path.join(self.tmp.name, "owner_reel_abc.mp3"))
+        self.assertEqual(run.call_count, 2)
+
+class TestStoryDownload(unittest.TestCase):
+
+    def setUp(self):
+        with mock.patch.object(InstagramDownloader, '_authenticate'):
+            self.downloader = InstagramDownloader()
+        self.downloader.loader = mock.Mock()
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    @mock.patch('services.instagram_service.instaloader.StoryItem.from_mediaid')
+    def test_only_requested_item_downloaded(self, from_mediaid):
+        """The story is fetched by media ID without loading the user's other stories"""
+        from_mediaid.return_value = mock.Mock(is_video=False, mediaid=3123)
+
+        def download_storyitem(item, target):
+            open(os.path.join(target, "story.jpg"), 'wb').close()
+        self.downloader.loader.download_storyitem.side_effect = download_storyitem
+
+        result = self.downloader.download_story("https://www.instagram.com/stories/someone/3123/", self.tmp.name)
+
+        from_mediaid.assert_called_once_with(self.downloader.loader.context, 3123)
+        self.downloader.loader.get_stories.assert_not_called()
+        self.downloader.loader.download_stories.assert_not_called()
+        self.assertEqual(result['file_path'], os.path.join(self.tmp.name, "someone_story_3123.jpg"))
+        self.assertFalse(result['is_video'])
+
+class TestSidecarDownload(unittest.TestCase):
+
+    def setUp(self):
+        with mock.patch.object(InstagramDownloader, '_authenticate'):
+            self.downloader = InstagramDownloader()
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def test_all_items_downloaded(self):
+        """Every carousel item is fetched, keeping the post order"""
+        nodes = [
+            mock.Mock(is_video=False, display_url="https://cdn/1.jpg"),
+            mock.Mock(is_video=True, video_url="https://cdn/2.mp4"),
+            mock.Mock(is_video=False, display_url="https://cdn/3.jpg"),
+        ]
+        post = mock.Mock(owner_username="someone", caption="hi", likes=1)
+        post.get_sidecar_nodes.return_value = iter(nodes)
+
+        with mock.patch.object(InstagramDownloader, 'fetch_media', side_effect=lambda url, path: path) as fetch:
+            result = self.downloader._download_sidecar(post, "abc", self.tmp.name)
+
+        self.assertEqual(fetch.call_count, 3)
+        self.assertEqual(result['type'], 'album')
+        self.assertEqual([item['type'] for item in result['items']], ['photo', 'video', 'photo'])
+        self.assertEqual(result['items'][1]['file_path'], os.path.join(self.tmp.name, "someone_abc_2.mp4"))
+
+class TestInstagramEgress(unittest.TestCase):
+
+    def test_copied_and_anonymous_sessions_keep_the_egress(self):
+        """Session copies and anonymous sessions use the same proxy as the main session"""
+        loader = instaloader.Instaloader()
+        context = route_context(loader, Egress("http://proxy.example:8080"))
+        self.assertIs(loader.context, context)
+
+        copied = instaloadercontext.copy_session(context._session)
+        with mock.patch.object(instaloadercontext.InstaloaderContext, 'get_json', return_value={}):
+            context.get_json('graphql/query', {}, session=copied)
+
+        for session in (context._session, copied, context.get_anonymous_session()):
+            self.assertEqual(session.proxies.get('https'), "http://proxy.example:8080")
+        # Other Instaloader instances are left alone
+        self.assertEqual(instaloader.Instaloader().context.get_anonymous_session().proxies, {})
+
+    def test_outcomes_scored_against_the_pinned_egress(self):
+        """Network failures lower the egress's health; missing content doesn't"""
+        with mock.patch('services.instagram_service.InstagramDownloader'):
+            service = InstagramDownloadService()
+        downloader = service.pool.sessions[0].client
+        downloader.egress = Egress("http://proxy.example:8080")
+
+        with mock.patch.object(service, '_download', side_effect=instaloader.exceptions.ConnectionException("reset")):
+            with self.assertRaises(instaloader.exceptions.ConnectionException):
+                asyncio.run(service._download_once("https://www.instagram.com/p/abc/", "/downloads"))
+        with mock.patch.object(service, '_download', return_value=None):
+            asyncio.run(service._download_once("https://www.instagram.com/p/gone/", "/downloads"))
+
+        self.assertEqual((downloader.egress.failures, downloader.egress.successes), (1, 1))
+
+class TestPhotoByUrl(unittest.TestCase):
+
+    def setUp(self):
+        with mock.patch.object(InstagramDownloader, '_authenticate'):
+            self.downloader = InstagramDownloader()
+        self.downloader.loader = mock.Mock()
+
+    @mock.patch('services.instagram_service.instaloader.Post.from_shortcode')
+    def test_photo_post_not_downloaded(self, from_shortcode):
+        """Single photos are returned by CDN URL without fetching the bytes"""
+        from_shortcode.return_value = mock.Mock(
+            typename='GraphImage', is_video=False, url="https://cdn/photo.jpg",
+            owner_username="someone", caption="hi", likes=1
+        )
+
+        with mock.patch.object(InstagramDownloader, 'fetch_media') as fetch:
+            result = self.downloader.download_post("https://www.instagram.com/p/abc/", "/downloads")
+
+        fetch.assert_not_called()
+        self.downloader.loader.download_post.assert_not_called()
+        self.assertEqual(result['url'], "https://cdn/photo.jpg")
+        self.assertIsNone(result['file_path'])
+        self.assertEqual(result['fallback_path'], os.path.join("/downloads", "someone_abc.jpg"))
+
+if __name__ == "__main__":
+    unittest.main()
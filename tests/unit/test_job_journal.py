@@ -0,0 +1,41 @@
+import unittest
+import sys
+import os
+import tempfile
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.job_journal import JobJournal
+
+class TestJobJournal(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.db_path = os.path.join(self.tmp.name, "jobs.db")
+        self.payload = {'url': 'https://youtu.be/abc', 'format': 'audio', 'output_dir': '/tmp/1'}
+
+    def test_unfinished_jobs_survive_restart(self):
+        """Jobs not finished are reported as interrupted by a new journal on the same file"""
+        journal = JobJournal(db_path=self.db_path)
+        done = journal.start('youtube', {**self.payload, 'format': 'video_22'}, user_id=1, chat_id=1)
+        journal.start('youtube', self.payload, user_id=1, chat_id=10)
+        journal.finish(done)
+
+        jobs = JobJournal(db_path=self.db_path).interrupted('youtube')
+        self.assertEqual(len(jobs), 1)
+        self.assertEqual(jobs[0]['payload'], self.payload)
+        self.assertEqual(jobs[0]['chat_id'], 10)
+        self.assertEqual(JobJournal(db_path=self.db_path).interrupted('instagram'), [])
+
+    def test_restarting_a_job_counts_attempts(self):
+        """Starting the same job again reuses its ID and counts another attempt"""
+        for journal in (JobJournal(db_path=self.db_path), JobJournal()):
+            first = journal.start('youtube', self.payload)
+            second = journal.start('youtube', dict(self.payload))
+            self.assertEqual(first, second)
+            self.assertEqual(journal.interrupted('youtube')[0]['attempts'], 2)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,29 @@
+import unittest
+import sys
+import os
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from telegram import InlineKeyboardButton, InlineKeyboardMarkup
+from utils.keyboards import build_static_markup
+
+class TestStaticKeyboards(unittest.TestCase):
+
+    def test_serialization_matches_regular_markup(self):
+        """Static markups serialize exactly like a regular InlineKeyboardMarkup"""
+        static = build_static_markup([[("A", "a"), ("B", "b")], [("Back", "menu_main")]])
+        regular = InlineKeyboardMarkup([
+            [InlineKeyboardButton("A", callback_data="a"), InlineKeyboardButton("B", callback_data="b")],
+            [InlineKeyboardButton("Back", callback_data="menu_main")]
+        ])
+        self.assertEqual(static.to_dict(), regular.to_dict())
+        self.assertEqual(static, regular)
+
+    def test_serialization_is_cached(self):
+        """The serialized dict is computed once and reused"""
+        static = build_static_markup([[("A", "a")]])
+        self.assertIs(static.to_dict(), static.to_dict())
+
+if __name__ == "__main__":
+    unittest.main()
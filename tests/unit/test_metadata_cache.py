@@ -0,0 +1,71 @@
+import unittest
+import sys
+import os
+import tempfile
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.metadata_cache import MetadataCache, slim_info
+
+class TestMetadataCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.db_path = os.path.join(self.tmp.name, "metadata.db")
+
+    def test_extract_called_once(self):
+        """Repeated lookups are served from the cache"""
+        cache = MetadataCache()
+        calls = []
+        extract = lambda: calls.append(1) or {'title': 'Song'}
+
+        self.assertEqual(cache.get_or_extract('soundcloud', 'https://soundcloud.com/a/b', extract), {'title': 'Song'})
+        self.assertEqual(cache.get_or_extract('soundcloud', 'https://soundcloud.com/a/b', extract), {'title': 'Song'})
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(cache.get_stats()['hit_rate'], 0.5)
+
+    def test_survives_restart(self):
+        """Entries written to disk are found by a new instance"""
+        MetadataCache(db_path=self.db_path).set('youtube', 'https://youtu.be/x', {'id': 'x'})
+        cache = MetadataCache(db_path=self.db_path)
+        self.assertEqual(cache.get('youtube', 'https://youtu.be/x'), {'id': 'x'})
+        self.assertEqual(cache.get_stats()['disk_hits'], 1)
+
+    def test_platform_ttl(self):
+        """Platforms with an expired TTL miss while others hit"""
+        cache = MetadataCache(ttls={'youtube': -1}, db_path=self.db_path)
+        cache.set('youtube', 'u', {'id': 1})
+        cache.set('soundcloud', 'u', {'id': 2})
+        self.assertIsNone(cache.get('youtube', 'u'))
+        self.assertEqual(cache.get('soundcloud', 'u'), {'id': 2})
+
+    def test_variants_are_separate(self):
+        """Flat and full extractions of the same URL don't collide"""
+        cache = MetadataCache()
+        cache.set('soundcloud', 'u', {'flat': True}, variant='flat')
+        self.assertIsNone(cache.get('soundcloud', 'u'))
+
+    def test_slim_info_keeps_what_downloads_use(self):
+        """Subtitles, thumbnails and storyboards are dropped; playable formats stay"""
+        info = {
+            'id': 'abc', 'title': 'Test', 'duration': 61, 'egress': 'direct',
+            'subtitles': {'en': [{'url': 'x'}]}, 'automatic_captions': {'fr': [{'url': 'y'}]},
+            'thumbnails': [{'url': 'z'}],
+            'formats': [
+                {'format_id': 'sb0', 'format_note': 'storyboard', 'ext': 'mhtml', 'fragments': [{'url': 'f'}] * 100},
+                {'format_id': '140', 'acodec': 'mp4a', 'vcodec': 'none', 'url': 'a'},
+                {'format_id': '137', 'acodec': 'none', 'vcodec': 'avc1', 'height': 1080, 'url': 'v'}
+            ]
+        }
+
+        slim = slim_info(info)
+        self.assertEqual([fmt['format_id'] for fmt in slim['formats']], ['140', '137'])
+        self.assertNotIn('subtitles', slim)
+        self.assertNotIn('automatic_captions', slim)
+        self.assertNotIn('thumbnails', slim)
+        self.assertEqual(slim['egress'], 'direct')
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,162 @@
+import unittest
+import sys
+import os
+from unittest import mock
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.music_service import SoundCloudDownloader, SpotifyDownloader, download_via_youtube
+from utils.metadata_cache import MetadataCache
+from utils.resolution_index import TrackResolutionIndex
+
+TRACK_URL = "https://soundcloud.com/artist/song"
+TRACK_INFO = {'id': '42', 'title': 'Song', 'uploader': 'Artist', 'duration': 180}
+
+class TestSoundCloudDownloader(unittest.TestCase):
+
+    def setUp(self):
+        patchers = [
+            mock.patch('services.music_service.metadata_cache', MetadataCache()),
+            mock.patch('services.music_service.yt_dlp.YoutubeDL'),
+        ]
+        self.ydl_class = [p.start() for p in patchers][1]
+        for p in patchers:
+            self.addCleanup(p.stop)
+        self.ydl = self.ydl_class.return_value.__enter__.return_value
+        self.ydl.extract_info.return_value = dict(TRACK_INFO)
+        self.ydl.sanitize_info.side_effect = lambda info: info
+        self.ydl.process_ie_result.return_value = dict(TRACK_INFO, requested_downloads=[{'filepath': '/tmp/Artist - Song.mp3'}])
+        self.downloader = SoundCloudDownloader()
+
+    def test_track_extracted_once(self):
+        """A track download extracts once and returns metadata with the real path"""
+        result = self.downloader.download_track(TRACK_URL, '/tmp')
+
+        self.assertEqual(self.ydl.extract_info.call_count, 1)
+        self.ydl.process_ie_result.assert_called_once()
+        self.assertEqual(result['name'], 'Song')
+        self.assertEqual(result['artist'], 'Artist')
+        self.assertEqual(result['file_path'], '/tmp/Artist - Song.mp3')
+
+    def test_playlist_uses_given_info(self):
+        """Playlist downloads don't fetch the playlist again"""
+        playlist_info = {'tracks': [{'name': 'Song', 'artist': 'Artist', 'url': TRACK_URL}]}
+        tracks = self.downloader.download_playlist(playlist_info, '/tmp')
+
+        self.assertEqual(self.ydl.extract_info.call_count, 1)
+        self.assertEqual(tracks[0]['file_path'], '/tmp/Artist - Song.mp3')
+
+class TestDownloadViaYouTube(unittest.TestCase):
+
+    def setUp(self):
+        patchers = [
+            mock.patch('services.music_service.resolution_index', TrackResolutionIndex()),
+            mock.patch('services.music_service.yt_dlp.YoutubeDL'),
+        ]
+        self.ydl_class = [p.start() for p in patchers][1]
+        for p in patchers:
+            self.addCleanup(p.stop)
+        self.ydl = self.ydl_class.return_value.__enter__.return_value
+        self.track = {'id': 'sp1', 'name': 'Song', 'artist': 'Artist', 'duration_ms': 180000}
+
+    def test_search_downloads_in_one_pass(self):
+        """The search result is downloaded by the same call and its real path returned"""
+        self.ydl.extract_info.return_value = {'entries': [
+            {'id': 'vid1', 'requested_downloads': [{'filepath': '/tmp/Artist - Song.mp3'}]}
+        ]}
+
+        self.assertEqual(download_via_youtube(self.track, '/tmp', source='spotify'), '/tmp/Artist - Song.mp3')
+        self.ydl.extract_info.assert_called_once_with("ytsearch1:Song Artist", download=True)
+        self.ydl.download.assert_not_called()
+
+    def test_known_video_skips_search(self):
+        """A resolved track downloads its video directly"""
+        self.ydl.extract_info.return_value = {'entries': [
+            {'id': 'vid1', 'requested_downloads': [{'filepath': '/tmp/a.mp3'}]}
+        ]}
+        download_via_youtube(self.track, '/tmp', source='spotify')
+
+        self.ydl.extract_info.reset_mock()
+        self.ydl.extract_info.return_value = {'id': 'vid1', 'requested_downloads': [{'filepath': '/tmp/a.mp3'}]}
+        download_via_youtube(self.track, '/tmp', source='spotify')
+        self.ydl.extract_info.assert_called_once_with("https://www.youtube.com/watch?v=vid1", download=True)
+
+def make_page(offset, total, limit=100):
+    """Build a Spotify playlist tracks page"""
+    items = [
+        {'track': {'id': f"t{i}", 'name': f"Song {i}", 'artists': [{'name': 'Artist'}], 'duration_ms': 1000}}
+        for i in range(offset, min(offset + limit, total))
+    ]
+    return {'items': items, 'total': total, 'limit': limit, 'offset': offset}
+
+class TestSpotifyPagination(unittest.TestCase):
+
+    def setUp(self):
+        with mock.patch.object(SpotifyDownloader, 'initialize'):
+            self.downloader = SpotifyDownloader()
+        self.downloader.sp = mock.Mock()
+        self.downloader.sp.playlist.return_value = {
+            'id': 'pl', 'name': 'Big', 'description': '', 'owner': {'display_name': 'me'}, 'images': [],
+            'tracks': make_page(0, 250)
+        }
+        self.downloader.sp.playlist_items.side_effect = lambda playlist_id, offset, **kwargs: make_page(offset, 250)
+
+    def test_all_pages_streamed_in_order(self):
+        """Tracks beyond the first 100 are fetched and yielded in order"""
+        info = self.downloader.get_playlist_info("https://open.spotify.com/playlist/pl?si=x")
+        tracks = list(info['tracks'])
+
+        self.assertEqual(info['tracks_count'], 250)
+        self.assertEqual([t['id'] for t in tracks], [f"t{i}" for i in range(250)])
+        self.assertEqual(self.downloader.sp.playlist_items.call_count, 2)
+
+    def test_first_page_needs_no_extra_requests(self):
+        """Consuming only the first page doesn't wait on later pages"""
+        info = self.downloader.get_playlist_info("https://open.spotify.com/playlist/pl")
+        first = next(info['tracks'])
+
+        self.assertEqual(first['id'], 't0')
+        self.downloader.sp.playlist_items.assert_not_called()
+
+    def test_playlist_download_reaches_later_pages(self):
+        """A track limit beyond the first page downloads from the later pages too"""
+        info = self.downloader.get_playlist_info("https://open.spotify.com/playlist/pl")
+        with mock.patch.object(self.downloader, 'download_track', side_effect=lambda track, output_dir: f"/tmp/{track['id']}.m4a"):
+            tracks = self.downloader.download_playlist(info, '/tmp', max_tracks=200)
+
+        self.assertEqual(len(tracks), 200)
+        self.assertEqual(tracks[-1]['file_path'], "/tmp/t199.m4a")
+        self.assertGreaterEqual(self.downloader.sp.playlist_items.call_count, 1)
+
+def make_track(track_id):
+    """Build a full Spotify track object"""
+    return {
+        'id': track_id, 'name': f"Song {track_id}", 'artists': [{'name': 'Artist'}], 'duration_ms': 1000,
+        'preview_url': None, 'album': {'name': 'Album', 'release_date': '2020', 'images': []}
+    }
+
+class TestSpotifyTrackLookups(unittest.TestCase):
+
+    def setUp(self):
+        patcher = mock.patch('services.music_service.metadata_cache', MetadataCache())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        with mock.patch.object(SpotifyDownloader, 'initialize'):
+            self.downloader = SpotifyDownloader()
+        self.downloader.sp = mock.Mock()
+        self.downloader.sp.tracks.side_effect = lambda ids: {'tracks': [make_track(i) for i in ids]}
+
+    def test_tracks_batched_and_cached(self):
+        """Several tracks take one API call and repeat lookups take none"""
+        urls = [f"https://open.spotify.com/track/id{i}?si=x" for i in range(3)]
+        tracks = self.downloader.get_tracks_info(urls)
+
+        self.assertEqual([t['id'] for t in tracks], ['id0', 'id1', 'id2'])
+        self.downloader.sp.tracks.assert_called_once_with(['id0', 'id1', 'id2'])
+
+        self.assertEqual(self.downloader.get_track_info(urls[1])['name'], 'Song id1')
+        self.assertEqual(self.downloader.sp.tracks.call_count, 1)
+
+if __name__ == "__main__":
+    unittest.main()
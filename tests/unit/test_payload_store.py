@@ -0,0 +1,64 @@
+import unittest
+import sys
+import os
+import tempfile
+from unittest import mock
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.payload_store import CallbackPayloadStore
+
+class TestCallbackPayloadStore(unittest.TestCase):
+
+    def test_long_url_fits_callback_data(self):
+        """Long URLs are replaced by a short token that resolves back"""
+        store = CallbackPayloadStore()
+        payload = {'url': "https://www.youtube.com/watch?v=dQw4w9WgXcQ&list=" + "x" * 100, 'format': 'video_137'}
+        data = store.callback_data("youtube_download_", payload)
+        self.assertLessEqual(len(data.encode('utf-8')), 64)
+        self.assertEqual(store.resolve(data, "youtube_download_"), payload)
+
+    def test_same_payload_reuses_token(self):
+        """Identical payloads map to the same token"""
+        store = CallbackPayloadStore()
+        self.assertEqual(store.put({'url': 'a'}), store.put({'url': 'a'}))
+        self.assertNotEqual(store.put({'url': 'a'}), store.put({'url': 'b'}))
+
+    def test_expired_and_unknown_tokens(self):
+        """Unknown or expired tokens resolve to None"""
+        store = CallbackPayloadStore(ttl=-1)
+        token = store.put({'url': 'a'})
+        self.assertIsNone(store.get(token))
+        self.assertIsNone(store.get("missing"))
+
+    def test_persisted_payloads_survive_restart(self):
+        """A new store on the same database resolves earlier tokens"""
+        with tempfile.TemporaryDirectory() as tmp:
+            db_path = os.path.join(tmp, "payloads.db")
+            token = CallbackPayloadStore(db_path=db_path).put({'url': 'a'})
+            self.assertEqual(CallbackPayloadStore(db_path=db_path).get(token), {'url': 'a'})
+
+    def test_database_opened_on_first_use(self):
+        """Creating a store touches no files; the directory and database appear when it is written"""
+        with tempfile.TemporaryDirectory() as tmp:
+            db_path = os.path.join(tmp, "data", "payloads.db")
+            store = CallbackPayloadStore(db_path=db_path)
+            self.assertFalse(os.path.exists(os.path.dirname(db_path)))
+            store.put({'url': 'a'})
+            self.assertTrue(os.path.exists(db_path))
+
+    @mock.patch('utils.payload_store.PRUNE_INTERVAL', 5)
+    def test_disk_store_is_capped_while_running(self):
+        """The database is pruned as it is written, not only when it is opened"""
+        with tempfile.TemporaryDirectory() as tmp:
+            store = CallbackPayloadStore(max_size=3, db_path=os.path.join(tmp, "payloads.db"))
+            for i in range(20):
+                store.put({'url': str(i)})
+
+            rows = store._db.execute("SELECT COUNT(*) FROM callback_payloads").fetchone()[0]
+            self.assertLessEqual(rows, 3)
+            store._db.close()
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,91 @@
+import unittest
+import sys
+import os
+import asyncio
+from unittest import mock
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.rate_governor import RateGovernor, TokenBucket, get_retry_after, is_retryable
+
+class HTTPStatusError(Exception):
+    def __init__(self, status, headers=None):
+        super().__init__(f"HTTP {status}")
+        self.http_status = status
+        self.headers = headers or {}
+
+class TestRateGovernor(unittest.TestCase):
+
+    def test_token_bucket_paces_after_burst(self):
+        """Requests past the burst wait for the refill rate"""
+        bucket = TokenBucket(rate=10, capacity=2)
+        self.assertEqual(bucket.reserve(), 0.0)
+        self.assertEqual(bucket.reserve(), 0.0)
+        self.assertAlmostEqual(bucket.reserve(), 0.1, places=2)
+
+    def test_error_classification(self):
+        """Throttling, server and network errors are retried; client errors are not"""
+        self.assertTrue(is_retryable(HTTPStatusError(429)))
+        self.assertTrue(is_retryable(HTTPStatusError(503)))
+        self.assertTrue(is_retryable(ConnectionResetError()))
+        self.assertFalse(is_retryable(HTTPStatusError(404)))
+        self.assertEqual(get_retry_after(HTTPStatusError(429, {'Retry-After': '7'})), 7.0)
+
+    @mock.patch('utils.rate_governor.time.sleep')
+    def test_retries_honor_retry_after(self, sleep):
+        """A throttled call is retried after the server's delay and counted per upstream"""
+        governor = RateGovernor(max_retries=2, base_delay=0.001)
+        func = mock.Mock(side_effect=[HTTPStatusError(429, {'Retry-After': '3'}), "ok"])
+
+        self.assertEqual(governor.run('spotify', func, 'id'), "ok")
+        self.assertGreater(sleep.call_args[0][0], 2.9)
+        self.assertEqual(governor.get_stats()['spotify']['throttled'], 1)
+
+    def test_non_retryable_raises_immediately(self):
+        """Client errors surface without retries"""
+        governor = RateGovernor(max_retries=3)
+        func = mock.Mock(side_effect=HTTPStatusError(404))
+
+        with self.assertRaises(HTTPStatusError):
+            governor.run('youtube', func)
+        self.assertEqual(func.call_count, 1)
+
+    def test_async_retries(self):
+        """run_async retries with backoff without blocking the loop"""
+        governor = RateGovernor(max_retries=2, base_delay=0.001)
+        func = mock.Mock(side_effect=[ConnectionResetError(), "ok"])
+
+        self.assertEqual(asyncio.run(governor.run_async('instagram', func)), "ok")
+        self.assertEqual(governor.get_stats()['instagram']['retries'], 1)
+
+    @mock.patch('utils.rate_governor.time.sleep')
+    def test_blocking_call_honors_retry_after(self, sleep):
+        """A blocking call sits out the server's Retry-After instead of failing"""
+        governor = RateGovernor(max_retries=2, base_delay=0.001)
+        func = mock.Mock(side_effect=[HTTPStatusError(429, {'Retry-After': '60'}), "ok"])
+
+        self.assertEqual(governor.run('youtube', func), "ok")
+        self.assertGreaterEqual(max(call.args[0] for call in sleep.call_args_list), 59)
+        self.assertEqual(governor.get_stats()['youtube']['throttled'], 1)
+
+    @mock.patch('utils.rate_governor.time.sleep')
+    def test_wait_ready_prepays_the_threaded_call(self, sleep):
+        """Tokens are waited for on the event loop and spent by the next blocking call in the worker"""
+        governor = RateGovernor(rates={'youtube': 1}, burst=1)
+
+        async def job():
+            await governor.wait_ready('youtube')
+            return await asyncio.to_thread(governor.run, 'youtube', lambda: "ok")
+
+        async def main():
+            return await asyncio.gather(job(), job())
+
+        with mock.patch('utils.rate_governor.asyncio.sleep', wraps=asyncio.sleep) as loop_sleep:
+            self.assertEqual(asyncio.run(main()), ["ok", "ok"])
+        sleep.assert_not_called()
+        loop_sleep.assert_called_once()
+        self.assertEqual(governor.get_stats()['youtube']['calls'], 2)
+
+if __name__ == '__main__':
+    unittest.main()
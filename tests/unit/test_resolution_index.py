@@ -0,0 +1,41 @@
+import unittest
+import sys
+import os
+import tempfile
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.resolution_index import TrackResolutionIndex, normalize_text
+
+TRACK = {'id': 'sp1', 'name': 'Bohemian Rhapsody - Remastered', 'artist': 'Queen', 'duration_ms': 354320}
+
+class TestTrackResolutionIndex(unittest.TestCase):
+
+    def test_normalize_text(self):
+        """Case, punctuation and spacing differences are ignored"""
+        self.assertEqual(normalize_text("  Don't  Stop-Me NOW! "), normalize_text("don t stop me now"))
+
+    def test_lookup_by_source_id_and_metadata(self):
+        """A recorded track resolves by its ID and by matching metadata"""
+        index = TrackResolutionIndex()
+        index.record(TRACK, 'fJ9rUzIMcZQ', source='spotify')
+
+        self.assertEqual(index.lookup({'id': 'sp1', 'name': 'x', 'artist': 'y'}, source='spotify'), 'fJ9rUzIMcZQ')
+        self.assertEqual(index.lookup({'name': 'bohemian rhapsody   remastered', 'artist': 'QUEEN', 'duration_ms': 354000}), 'fJ9rUzIMcZQ')
+        self.assertIsNone(index.lookup(dict(TRACK, id='sp2', duration_ms=200000), source='spotify'))
+
+    def test_persisted_and_forgotten(self):
+        """Mappings survive a restart until they are forgotten"""
+        with tempfile.TemporaryDirectory() as tmp:
+            db_path = os.path.join(tmp, "resolutions.db")
+            TrackResolutionIndex(db_path=db_path).record(TRACK, 'fJ9rUzIMcZQ', source='spotify')
+
+            index = TrackResolutionIndex(db_path=db_path)
+            self.assertEqual(index.lookup(TRACK, source='spotify'), 'fJ9rUzIMcZQ')
+
+            index.forget(TRACK, source='spotify')
+            self.assertIsNone(TrackResolutionIndex(db_path=db_path).lookup(TRACK, source='spotify'))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,78 @@
+import unittest
+import sys
+import os
+import asyncio
+import threading
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.session_pool import SessionPool, PooledSession
+
+class TestSessionPool(unittest.TestCase):
+
+    def setUp(self):
+        self.sessions = [PooledSession("a", "client-a"), PooledSession("b", "client-b")]
+
+    def test_jobs_spread_across_sessions(self):
+        """A busy session isn't given a second job while another is free"""
+        pool = SessionPool(self.sessions, budget=10)
+        with pool.acquire() as first:
+            with pool.acquire() as second:
+                self.assertNotEqual(first.client, second.client)
+
+    def test_budget_and_timeout(self):
+        """Sessions past their budget are skipped; with none left, acquire times out"""
+        pool = SessionPool(self.sessions, budget=1, window=60, wait_timeout=0.05)
+        with pool.acquire():
+            pass
+        with pool.acquire():
+            pass
+
+        with self.assertRaises(TimeoutError):
+            with pool.acquire():
+                pass
+
+    def test_rate_limited_session_cools_down(self):
+        """A rate-limited session sits out and the job goes to the other one"""
+        pool = SessionPool(self.sessions, budget=10, cooldown=60)
+        with pool.acquire() as lease:
+            limited = lease.client
+            lease.ok = False
+            lease.rate_limited = True
+
+        for _ in range(3):
+            with pool.acquire() as lease:
+                self.assertNotEqual(lease.client, limited)
+
+        stats = {entry['name']: entry for entry in pool.get_stats()}
+        self.assertTrue(any(entry['cooling_down'] for entry in stats.values()))
+
+    def test_unlimited_single_session(self):
+        """Without a budget or in-flight limit one session takes concurrent jobs without waiting"""
+        pool = SessionPool(self.sessions[:1], budget=None, max_in_flight=None, wait_timeout=0)
+        with pool.acquire(), pool.acquire(), pool.acquire() as lease:
+            self.assertEqual(lease.client, "client-a")
+
+    def test_async_acquire_waits_on_the_loop(self):
+        """acquire_async waits on the event loop, woken by a release from a worker thread, and times out"""
+        pool = SessionPool(self.sessions[:1], budget=10, wait_timeout=5)
+
+        async def acquire():
+            async with pool.acquire_async() as lease:
+                return lease.client
+
+        with pool.acquire():
+            pool.wait_timeout = 0.05
+            with self.assertRaises(TimeoutError):
+                asyncio.run(acquire())
+
+        pool.wait_timeout = 5
+        held = pool.acquire()
+        held.__enter__()
+        threading.Timer(0.05, held.__exit__, (None, None, None)).start()
+        self.assertEqual(asyncio.run(acquire()), "client-a")
+        self.assertEqual(pool._waiters, [])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,86 @@
+import unittest
+import asyncio
+import sys
+import os
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from telegram import Update, User, Message, Chat
+from utils.update_processor import PerUserUpdateProcessor
+
+def make_update(update_id, user_id):
+    """Build a minimal message update from the given user"""
+    user = User(id=user_id, first_name="test", is_bot=False)
+    chat = Chat(id=user_id, type="private")
+    message = Message(message_id=update_id, date=None, chat=chat, from_user=user, text="hi")
+    return Update(update_id=update_id, message=message)
+
+class TestPerUserUpdateProcessor(unittest.TestCase):
+
+    def test_same_user_updates_stay_ordered(self):
+        """Updates from one user run one after another in arrival order"""
+        async def scenario():
+            processor = PerUserUpdateProcessor(max_concurrent_updates=4)
+            await processor.initialize()
+            order = []
+
+            async def handler(tag, delay):
+                order.append(f"start {tag}")
+                await asyncio.sleep(delay)
+                order.append(f"end {tag}")
+
+            await asyncio.gather(
+                processor.process_update(make_update(1, 10), handler(1, 0.02)),
+                processor.process_update(make_update(2, 10), handler(2, 0)),
+            )
+            return order
+
+        order = asyncio.run(scenario())
+        self.assertEqual(order, ["start 1", "end 1", "start 2", "end 2"])
+
+    def test_different_users_run_concurrently(self):
+        """A slow update of one user does not block another user"""
+        async def scenario():
+            processor = PerUserUpdateProcessor(max_concurrent_updates=4)
+            await processor.initialize()
+            order = []
+
+            async def handler(tag, delay):
+                order.append(f"start {tag}")
+                await asyncio.sleep(delay)
+                order.append(f"end {tag}")
+
+            await asyncio.gather(
+                processor.process_update(make_update(1, 10), handler(1, 0.02)),
+                processor.process_update(make_update(2, 20), handler(2, 0)),
+            )
+            return order, processor.get_stats()
+
+        order, stats = asyncio.run(scenario())
+        self.assertEqual(order, ["start 1", "start 2", "end 2", "end 1"])
+        self.assertEqual(stats['processed'], 2)
+        self.assertEqual(stats['pending'], 0)
+        self.assertEqual(stats['active_keys'], 0)
+
+    def test_concurrency_limit(self):
+        """No more than the configured number of updates run at once"""
+        async def scenario():
+            processor = PerUserUpdateProcessor(max_concurrent_updates=2)
+            await processor.initialize()
+            peak = 0
+
+            async def handler():
+                nonlocal peak
+                peak = max(peak, processor.get_stats()['running'])
+                await asyncio.sleep(0.01)
+
+            await asyncio.gather(*[
+                processor.process_update(make_update(i, 100 + i), handler()) for i in range(6)
+            ])
+            return peak
+
+        self.assertEqual(asyncio.run(scenario()), 2)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,58 @@
+import unittest
+import sys
+import os
+from unittest import mock
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.youtube_service import YouTubeDownloader
+from utils.metadata_cache import MetadataCache
+
+VIDEO_INFO = {'id': 'abc123', 'title': 'Test', 'duration': 61, 'formats': []}
+
+class TestYouTubeDownloader(unittest.TestCase):
+
+    def setUp(self):
+        self.service = YouTubeDownloader(cache=MetadataCache())
+        self.patcher = mock.patch('services.youtube_service.yt_dlp.YoutubeDL')
+        self.ydl_class = self.patcher.start()
+        self.ydl = self.ydl_class.return_value.__enter__.return_value
+        self.addCleanup(self.patcher.stop)
+
+    def test_download_reuses_cached_info(self):
+        """The download step processes the cached info instead of extracting again"""
+        self.ydl.extract_info.return_value = dict(VIDEO_INFO)
+        self.ydl.sanitize_info.side_effect = lambda info: info
+        self.service.get_video_info("https://youtu.be/abc123")
+        self.ydl.extract_info.reset_mock()
+
+        self.ydl.process_ie_result.return_value = dict(VIDEO_INFO, requested_downloads=[{'filepath': '/tmp/Test.mp3'}])
+        result = self.service.download_video("https://youtu.be/abc123", 'audio', '/tmp')
+
+        self.ydl.extract_info.assert_not_called()
+        self.assertEqual(result['file_path'], '/tmp/Test.mp3')
+
+    def test_download_without_cache_extracts(self):
+        """Uncached URLs fall back to a full extraction"""
+        self.ydl.extract_info.return_value = dict(VIDEO_INFO, requested_downloads=[{'filepath': '/tmp/Test.mp4'}])
+        result = self.service.download_video("https://youtu.be/abc123", 'video_137', '/tmp')
+
+        self.ydl.process_ie_result.assert_not_called()
+        self.assertEqual(result['file_path'], '/tmp/Test.mp4')
+
+    def test_video_format_options(self):
+        """Video choices merge the picked format with the best audio"""
+        options = self.service.get_download_options('video_137', '/tmp')
+        self.assertEqual(options['format'], '137+bestaudio/137/best')
+
+    def test_playlist_video_urls(self):
+        """Playlist entries become watch URLs in order, skipping unavailable ones"""
+        info = {'entries': [{'webpage_url': 'https://youtu.be/a'}, None, {'id': 'b'}, {'title': 'gone'}]}
+        self.assertEqual(
+            self.service.playlist_video_urls(info),
+            ['https://youtu.be/a', 'https://www.youtube.com/watch?v=b']
+        )
+
+if __name__ == "__main__":
+    unittest.main()
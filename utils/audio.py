@@ -0,0 +1,36 @@
+from config.config import NATIVE_AUDIO_CODECS
+
+# Format selectors and FFmpegExtractAudio mappings (source ext > target) for each native codec.
+# Matching sources are remuxed with "-acodec copy"; anything else is encoded to MP3.
+NATIVE_AUDIO_FORMATS = {
+    'm4a': ('bestaudio[ext=m4a]', ['m4a>m4a']),
+    'opus': ('bestaudio[acodec=opus]', ['webm>opus', 'opus>opus']),
+}
+
+def get_audio_options(native_codecs=None, mp3_quality='192'):
+    """Return yt-dlp 'format' and 'postprocessors' options for audio downloads.
+
+    With native codecs enabled, an AAC (M4A) or Opus stream is preferred and kept as is,
+    which avoids re-encoding. MP3 stays the fallback, and MP3 sources are not re-encoded.
+    """
+    native_codecs = NATIVE_AUDIO_CODECS if native_codecs is None else native_codecs
+
+    selectors = []
+    mapping = []
+    for codec in native_codecs:
+        if codec in NATIVE_AUDIO_FORMATS:
+            selector, codec_mapping = NATIVE_AUDIO_FORMATS[codec]
+            selectors.append(selector)
+            mapping.extend(codec_mapping)
+
+    selectors.append('bestaudio/best')
+    mapping.append('mp3')
+
+    return {
+        'format': '/'.join(selectors),
+        'postprocessors': [{
+            'key': 'FFmpegExtractAudio',
+            'preferredcodec': '/'.join(mapping),
+            'preferredquality': mp3_quality,
+        }],
+    }
@@ -0,0 +1,121 @@
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+logger = logging.getLogger(__name__)
+
+class MicroBatcher:
+    """Coalesce individual lookups from many threads into batched calls.
+
+    ``fetch_batch(keys)`` receives up to ``max_batch_size`` distinct keys and returns a
+    dict mapping each key to its value (missing keys resolve to None). A batch is sent
+    when it is full or ``max_wait`` seconds after its first key arrived, whichever
+    comes first. The worker thread starts on first use.
+
+    When a batch of several keys fails with an error ``split_on_error`` accepts (e.g.
+    a bad request caused by one malformed key), each key is fetched again on its own,
+    so only the lookups of the offending key fail.
+    """
+
+    def __init__(self, fetch_batch, max_batch_size=50, max_wait=0.01, name="micro-batcher", split_on_error=None):
+        self.fetch_batch = fetch_batch
+        self.split_on_error = split_on_error
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.name = name
+        self._queue = queue.Queue()
+        self._worker = None
+        self._start_lock = threading.Lock()
+        self.batches = 0
+        self.lookups = 0
+
+    def submit(self, key):
+        """Queue a lookup and return a Future for its value"""
+        self._ensure_worker()
+        future = Future()
+        self._queue.put((key, future))
+        return future
+
+    def get(self, key, timeout=None):
+        """Look up a single key, blocking until its batch completes"""
+        return self.submit(key).result(timeout=timeout)
+
+    def get_many(self, keys, timeout=None):
+        """Look up several keys at once; they share batches"""
+        futures = [(key, self.submit(key)) for key in keys]
+        return {key: future.result(timeout=timeout) for key, future in futures}
+
+    def _ensure_worker(self):
+        """Start the worker thread if it isn't running"""
+        if self._worker is not None:
+            return
+        with self._start_lock:
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._run, name=self.name, daemon=True)
+                self._worker.start()
+
+    def _collect(self):
+        """Block for the first lookup, then gather more until the batch is full or the window ends"""
+        pending = {}
+        key, future = self._queue.get()
+        pending.setdefault(key, []).append(future)
+
+        deadline = time.monotonic() + self.max_wait
+        while len(pending) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                key, future = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            pending.setdefault(key, []).append(future)
+
+        return pending
+
+    def _run(self):
+        """Worker loop"""
+        while True:
+            pending = self._collect()
+            self.batches += 1
+            self.lookups += sum(len(futures) for futures in pending.values())
+
+            try:
+                results = self.fetch_batch(list(pending)) or {}
+            except Exception as e:
+                logger.error(f"Error in {self.name} batch of {len(pending)}: {e}")
+                if len(pending) > 1 and self.split_on_error and self.split_on_error(e):
+                    for key, futures in pending.items():
+                        self._fetch_alone(key, futures)
+                    continue
+                for futures in pending.values():
+                    for future in futures:
+                        future.set_exception(e)
+                continue
+
+            for key, futures in pending.items():
+                for future in futures:
+                    future.set_result(results.get(key))
+
+    def _fetch_alone(self, key, futures):
+        """Fetch a single key from a failed batch and settle its lookups"""
+        self.batches += 1
+        try:
+            value = (self.fetch_batch([key]) or {}).get(key)
+        except Exception as e:
+            logger.error(f"Error in {self.name} lookup of {key}: {e}")
+            for future in futures:
+                future.set_exception(e)
+            return
+        for future in futures:
+            future.set_result(value)
+
+    def get_stats(self):
+        """Return batching metrics"""
+        return {
+            'batches': self.batches,
+            'lookups': self.lookups,
+            'average_batch_size': self.lookups / self.batches if self.batches else 0.0
+        }
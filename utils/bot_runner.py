@@ -0,0 +1,105 @@
+import asyncio
+import logging
+import secrets
+from telegram import Update
+from config.config import (
+    UPDATE_MODE, WEBHOOK_LISTEN, WEBHOOK_PORT, WEBHOOK_URL, WEBHOOK_PATH,
+    WEBHOOK_SECRET_TOKEN, WEBHOOK_MAX_CONNECTIONS, WEBHOOK_CERT, WEBHOOK_KEY
+)
+
+logger = logging.getLogger(__name__)
+
+# Coroutines run once the application is initialized, before updates are fetched
+STARTUP_HOOKS = []
+
+def on_startup(hook):
+    """Register ``hook(application)`` to run at startup"""
+    STARTUP_HOOKS.append(hook)
+    return hook
+
+async def run_startup_hooks(application):
+    """Run the registered startup hooks; a failing hook doesn't stop the others or the bot"""
+    for hook in STARTUP_HOOKS:
+        try:
+            await hook(application)
+        except Exception as e:
+            logger.error(f"Error in startup hook {hook.__name__}: {e}")
+
+# Coroutines run after the application stops, before it shuts down
+SHUTDOWN_HOOKS = []
+
+# Tasks started with start_background_task, cancelled at shutdown
+BACKGROUND_TASKS = set()
+
+def on_shutdown(hook):
+    """Register ``hook(application)`` to run at shutdown"""
+    SHUTDOWN_HOOKS.append(hook)
+    return hook
+
+def start_background_task(coroutine, name=None):
+    """Run a coroutine alongside the bot (e.g. from a startup hook); it is cancelled at shutdown"""
+    task = asyncio.get_running_loop().create_task(coroutine, name=name)
+    BACKGROUND_TASKS.add(task)
+    task.add_done_callback(BACKGROUND_TASKS.discard)
+    return task
+
+async def run_shutdown_hooks(application):
+    """Cancel background tasks, then run the registered shutdown hooks"""
+    tasks = list(BACKGROUND_TASKS)
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+    for hook in SHUTDOWN_HOOKS:
+        try:
+            await hook(application)
+        except Exception as e:
+            logger.error(f"Error in shutdown hook {hook.__name__}: {e}")
+
+def build_webhook_url(base_url, path):
+    """Join the public base URL and the webhook path"""
+    return f"{base_url.rstrip('/')}/{path.strip('/')}"
+
+def run_webhook(application):
+    """Serve updates through the embedded webhook server"""
+    if not WEBHOOK_URL:
+        raise ValueError("WEBHOOK_URL must be set when UPDATE_MODE is 'webhook'")
+
+    # Telegram echoes the secret back in X-Telegram-Bot-Api-Secret-Token on every request
+    secret_token = WEBHOOK_SECRET_TOKEN
+    if not secret_token:
+        secret_token = secrets.token_urlsafe(32)
+        logger.warning("WEBHOOK_SECRET_TOKEN not set, using a random token for this run. "
+                       "Set it explicitly when running several instances behind a load balancer.")
+
+    webhook_url = build_webhook_url(WEBHOOK_URL, WEBHOOK_PATH)
+    logger.info(f"Starting webhook server on {WEBHOOK_LISTEN}:{WEBHOOK_PORT} for {webhook_url}")
+
+    # Without cert/key the server speaks plain HTTP, which is what a TLS-terminating
+    # reverse proxy or load balancer in front of the bot expects
+    application.run_webhook(
+        listen=WEBHOOK_LISTEN,
+        port=WEBHOOK_PORT,
+        url_path=WEBHOOK_PATH.strip('/'),
+        webhook_url=webhook_url,
+        secret_token=secret_token,
+        cert=WEBHOOK_CERT or None,
+        key=WEBHOOK_KEY or None,
+        max_connections=WEBHOOK_MAX_CONNECTIONS,
+        allowed_updates=Update.ALL_TYPES
+    )
+
+def run_application(application):
+    """Start the application in the configured update mode (polling or webhook)"""
+    if STARTUP_HOOKS and application.post_init is None:
+        application.post_init = run_startup_hooks
+    if application.post_stop is None:
+        application.post_stop = run_shutdown_hooks
+
+    if UPDATE_MODE == 'webhook':
+        run_webhook(application)
+    else:
+        if UPDATE_MODE != 'polling':
+            logger.warning(f"Unknown UPDATE_MODE '{UPDATE_MODE}', falling back to polling")
+        logger.info("Starting long polling...")
+        application.run_polling(allowed_updates=Update.ALL_TYPES)
@@ -0,0 +1,99 @@
+import logging
+from telegram import Update
+from telegram.ext import ContextTypes
+
+logger = logging.getLogger(__name__)
+
+class _TrieNode:
+    """Node of the callback prefix trie"""
+
+    __slots__ = ('children', 'route')
+
+    def __init__(self):
+        self.children = {}
+        self.route = None
+
+class CallbackRouter:
+    """Dispatch callback queries by exact match or longest registered prefix.
+
+    Exact callback data is looked up in a dict. Anything else walks a prefix trie,
+    which costs at most one step per character of the (64 byte max) callback data.
+    Handlers are called as ``handler(update, context, callback_data)``.
+    """
+
+    def __init__(self):
+        self._exact = {}
+        self._prefixes = _TrieNode()
+
+    def register(self, data, handler, prefix=False, answer=True):
+        """Register a handler for exact callback data or for a data prefix.
+
+        With ``answer=False`` the handler is expected to answer the query itself
+        (e.g. to show an alert) on every path; the router doesn't answer it.
+        """
+        route = (handler, answer)
+        if not prefix:
+            if data in self._exact:
+                logger.warning(f"Callback '{data}' registered twice, overriding")
+            self._exact[data] = route
+            return handler
+
+        node = self._prefixes
+        for char in data:
+            node = node.children.setdefault(char, _TrieNode())
+        if node.route is not None:
+            logger.warning(f"Callback prefix '{data}' registered twice, overriding")
+        node.route = route
+        return handler
+
+    def exact(self, *data, answer=True):
+        """Decorator registering a handler for one or more exact callback values"""
+        def decorator(handler):
+            for value in data:
+                self.register(value, handler, answer=answer)
+            return handler
+        return decorator
+
+    def prefix(self, *prefixes, answer=True):
+        """Decorator registering a handler for one or more callback prefixes"""
+        def decorator(handler):
+            for value in prefixes:
+                self.register(value, handler, prefix=True, answer=answer)
+            return handler
+        return decorator
+
+    def resolve(self, data):
+        """Return the (handler, answer) route for callback data, or None"""
+        route = self._exact.get(data)
+        if route is not None:
+            return route
+
+        # Walk the trie remembering the deepest (longest) matching prefix
+        node = self._prefixes
+        for char in data:
+            node = node.children.get(char)
+            if node is None:
+                break
+            if node.route is not None:
+                route = node.route
+        return route
+
+    async def dispatch(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+        """CallbackQueryHandler callback: route the query to its registered handler"""
+        query = update.callback_query
+        data = query.data or ''
+        logger.info(f"Callback query received: {data}")
+
+        route = self.resolve(data)
+        if route is None:
+            logger.warning(f"No handler registered for callback: {data}")
+            await query.answer()
+            return
+
+        handler, answer = route
+        if answer:
+            await query.answer()
+        await handler(update, context, data)
+
+# Shared router; handler modules register their callbacks on import
+router = CallbackRouter()
@@ -0,0 +1,184 @@
+import logging
+import threading
+import time
+from collections import deque
+from config.config import (
+    CIRCUIT_FAILURE_RATE, CIRCUIT_SLOW_CALL_RATE, CIRCUIT_SLOW_CALL_SECONDS, CIRCUIT_MIN_CALLS,
+    CIRCUIT_WINDOW, CIRCUIT_OPEN_SECONDS
+)
+
+logger = logging.getLogger(__name__)
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a platform whose circuit is open"""
+
+    def __init__(self, name, retry_in):
+        super().__init__(f"{name} is temporarily unavailable (retry in {retry_in:.0f}s)")
+        self.name = name
+        self.retry_in = retry_in
+
+class CircuitBreaker:
+    """Stop calling a platform that keeps failing or timing out.
+
+    Outcomes of the last ``window`` seconds are kept. Once there are at least
+    ``min_calls`` of them and the share of failures or of calls slower than
+    ``slow_call_seconds`` reaches its threshold, the circuit opens and calls fail
+    immediately for ``open_seconds``. After that a single probe call is let
+    through (half-open): success closes the circuit, failure opens it again.
+    """
+
+    def __init__(self, name, failure_rate=0.5, slow_call_rate=0.8, slow_call_seconds=30,
+                 min_calls=10, window=60, open_seconds=30):
+        self.name = name
+        self.failure_rate = failure_rate
+        self.slow_call_rate = slow_call_rate
+        self.slow_call_seconds = slow_call_seconds
+        self.min_calls = min_calls
+        self.window = window
+        self.open_seconds = open_seconds
+        self._outcomes = deque()
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+        self.times_opened = 0
+        self.rejected = 0
+
+    def _current_state(self, now):
+        """Move from open to half-open once the open period is over (lock held)"""
+        if self._state == OPEN and now - self._opened_at >= self.open_seconds:
+            self._state = HALF_OPEN
+            self._probe_in_flight = False
+        return self._state
+
+    @property
+    def state(self):
+        with self._lock:
+            return self._current_state(time.monotonic())
+
+    def retry_in(self):
+        """Seconds until the circuit lets a probe through (0 when calls are allowed)"""
+        with self._lock:
+            now = time.monotonic()
+            if self._current_state(now) != OPEN:
+                return 0.0
+            return max(self._opened_at + self.open_seconds - now, 0.0)
+
+    def allow(self):
+        """Raise CircuitOpenError unless a call may go ahead"""
+        with self._lock:
+            now = time.monotonic()
+            state = self._current_state(now)
+            if state == CLOSED:
+                return
+            if state == HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return
+            self.rejected += 1
+            retry_in = max(self._opened_at + self.open_seconds - now, 0.0)
+        raise CircuitOpenError(self.name, retry_in)
+
+    def _open(self, now, reason):
+        """Trip the circuit (lock held)"""
+        self._state = OPEN
+        self._opened_at = now
+        self._probe_in_flight = False
+        self._outcomes.clear()
+        self.times_opened += 1
+        logger.warning(f"Circuit for {self.name} opened ({reason}); failing fast for {self.open_seconds}s")
+
+    def record(self, ok, duration=None):
+        """Record a call's outcome; ``duration`` (seconds) is None for calls not judged on latency"""
+        slow = duration is not None and duration >= self.slow_call_seconds
+        with self._lock:
+            now = time.monotonic()
+            state = self._current_state(now)
+
+            if state == HALF_OPEN:
+                if ok and not slow:
+                    self._state = CLOSED
+                    self._outcomes.clear()
+                    logger.info(f"Circuit for {self.name} closed after a successful probe")
+                else:
+                    self._open(now, "probe failed")
+                return
+            if state == OPEN:
+                return
+
+            self._outcomes.append((now, not ok, slow))
+            while self._outcomes and self._outcomes[0][0] <= now - self.window:
+                self._outcomes.popleft()
+
+            calls = len(self._outcomes)
+            if calls < self.min_calls:
+                return
+            failures = sum(1 for _, failed, _ in self._outcomes if failed)
+            slow_calls = sum(1 for _, _, was_slow in self._outcomes if was_slow)
+            if failures / calls >= self.failure_rate:
+                self._open(now, f"{failures}/{calls} calls failed")
+            elif slow_calls / calls >= self.slow_call_rate:
+                self._open(now, f"{slow_calls}/{calls} calls slower than {self.slow_call_seconds}s")
+
+    def abandon(self):
+        """Give up a call let through by ``allow`` without an outcome (e.g. cancelled).
+
+        An abandoned probe counts as a failed one, so the next probe can go out once
+        the circuit's open period is over again.
+        """
+        with self._lock:
+            now = time.monotonic()
+            if self._current_state(now) == HALF_OPEN and self._probe_in_flight:
+                self._open(now, "probe abandoned")
+
+    def get_stats(self):
+        """Return state and counters"""
+        with self._lock:
+            state = self._current_state(time.monotonic())
+            return {
+                'state': state,
+                'recent_calls': len(self._outcomes),
+                'times_opened': self.times_opened,
+                'rejected': self.rejected
+            }
+
+class CircuitBreakerRegistry:
+    """One circuit breaker per platform, created on first use with shared settings"""
+
+    def __init__(self, **settings):
+        self.settings = settings
+        self._breakers = {}
+        self._lock = threading.Lock()
+
+    def get(self, name):
+        """Return the breaker for a platform"""
+        with self._lock:
+            if name not in self._breakers:
+                self._breakers[name] = CircuitBreaker(name, **self.settings)
+            return self._breakers[name]
+
+    def first_open(self, *names):
+        """Return the first of the given platforms whose circuit is open, or None"""
+        for name in names:
+            if self.get(name).state == OPEN:
+                return name
+        return None
+
+    def get_stats(self):
+        """Return stats for every platform seen so far"""
+        with self._lock:
+            breakers = list(self._breakers.values())
+        return {breaker.name: breaker.get_stats() for breaker in breakers}
+
+# Shared breakers, consulted by the rate governor before every platform call
+circuit_breakers = CircuitBreakerRegistry(
+    failure_rate=CIRCUIT_FAILURE_RATE,
+    slow_call_rate=CIRCUIT_SLOW_CALL_RATE,
+    slow_call_seconds=CIRCUIT_SLOW_CALL_SECONDS,
+    min_calls=CIRCUIT_MIN_CALLS,
+    window=CIRCUIT_WINDOW,
+    open_seconds=CIRCUIT_OPEN_SECONDS
+)
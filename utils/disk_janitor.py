@@ -0,0 +1,217 @@
+import asyncio
+import logging
+import os
+import shutil
+import threading
+import time
+from utils.bot_runner import on_startup, start_background_task
+from utils.job_journal import job_journal
+from config.config import (
+    DOWNLOAD_DIR, DISK_HIGH_WATERMARK, DISK_LOW_WATERMARK, DISK_CRITICAL_FREE_MB,
+    DISK_JANITOR_INTERVAL, DISK_STALE_TEMP_SECONDS
+)
+
+logger = logging.getLogger(__name__)
+
+# Leftovers of downloads that never finished: partial files and instaloader's temp dirs
+PART_SUFFIX = ".part"
+TEMP_DIR_PREFIX = ".instaloader-"
+
+class DiskJanitor:
+    """Keep the downloads directory from filling the disk.
+
+    Every sweep removes partial files and temp dirs older than ``stale_seconds``,
+    then, once disk usage reaches ``high_watermark``, deletes the least recently
+    served files until usage is back under ``low_watermark``. Handlers call
+    ``mark_served`` before uploading a file, which sets its mtime to now, so files
+    are ordered by mtime; access times aren't used since relatime mounts rarely
+    update them. Directories returned by the registered guards
+    belong to jobs in flight and are never touched. While free space is below
+    ``critical_free_bytes`` new jobs should not be admitted.
+    """
+
+    def __init__(self, root, high_watermark=0.85, low_watermark=0.70, critical_free_bytes=512 * 1024 * 1024,
+                 stale_seconds=3600, disk_usage=shutil.disk_usage):
+        self.root = root
+        self.high_watermark = high_watermark
+        self.low_watermark = low_watermark
+        self.critical_free_bytes = critical_free_bytes
+        self.stale_seconds = stale_seconds
+        self._disk_usage = disk_usage
+        self._guards = []
+        self._lock = threading.Lock()
+        self.sweeps = 0
+        self.files_evicted = 0
+        self.stale_removed = 0
+        self.bytes_reclaimed = 0
+        self.jobs_rejected = 0
+
+    def add_guard(self, guard):
+        """Register a callable returning directories whose contents must be kept"""
+        self._guards.append(guard)
+
+    def _protected_dirs(self):
+        """Absolute paths of every directory held by a guard"""
+        protected = set()
+        for guard in self._guards:
+            try:
+                protected.update(os.path.abspath(path) for path in guard() if path)
+            except Exception as e:
+                logger.error(f"Error in disk janitor guard: {e}")
+        return protected
+
+    @staticmethod
+    def mark_served(*paths):
+        """Record that files were just sent to a user, keeping them off the front of the eviction order"""
+        for path in paths:
+            try:
+                os.utime(path)
+            except OSError as e:
+                logger.warning(f"Error marking {path} as served: {e}")
+
+    @staticmethod
+    def _is_protected(path, protected):
+        return any(path == directory or path.startswith(directory + os.sep) for directory in protected)
+
+    def admission_paused(self):
+        """Whether free space is too low to start another job; counts the rejection"""
+        try:
+            free = self._disk_usage(self.root).free
+        except OSError as e:
+            logger.error(f"Error reading disk usage for {self.root}: {e}")
+            return False
+        if free >= self.critical_free_bytes:
+            return False
+        with self._lock:
+            self.jobs_rejected += 1
+        return True
+
+    def _remove(self, path, size, stale):
+        """Delete a file or directory and count it (lock held)"""
+        try:
+            if os.path.isdir(path):
+                shutil.rmtree(path)
+            else:
+                os.remove(path)
+        except OSError as e:
+            logger.error(f"Error removing {path}: {e}")
+            return 0
+        self.bytes_reclaimed += size
+        if stale:
+            self.stale_removed += 1
+        else:
+            self.files_evicted += 1
+        return size
+
+    @staticmethod
+    def _tree_size(path):
+        total = 0
+        for dirpath, _, filenames in os.walk(path):
+            for filename in filenames:
+                try:
+                    total += os.path.getsize(os.path.join(dirpath, filename))
+                except OSError:
+                    pass
+        return total
+
+    def sweep(self):
+        """Remove stale leftovers, then evict files if usage is above the high watermark; returns bytes freed"""
+        protected = self._protected_dirs()
+        now = time.time()
+        stale = []
+        candidates = []
+
+        for dirpath, dirnames, filenames in os.walk(os.path.abspath(self.root)):
+            if self._is_protected(dirpath, protected):
+                dirnames[:] = []
+                continue
+
+            for dirname in list(dirnames):
+                if dirname.startswith(TEMP_DIR_PREFIX):
+                    dirnames.remove(dirname)
+                    path = os.path.join(dirpath, dirname)
+                    try:
+                        if now - os.path.getmtime(path) >= self.stale_seconds:
+                            stale.append((path, self._tree_size(path)))
+                    except OSError:
+                        pass
+
+            for filename in filenames:
+                path = os.path.join(dirpath, filename)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                if filename.endswith(PART_SUFFIX):
+                    if now - st.st_mtime >= self.stale_seconds:
+                        stale.append((path, st.st_size))
+                else:
+                    candidates.append((st.st_mtime, path, st.st_size))
+
+        freed = 0
+        with self._lock:
+            self.sweeps += 1
+            for path, size in stale:
+                freed += self._remove(path, size, stale=True)
+
+            usage = self._disk_usage(self.root)
+            if usage.used / usage.total >= self.high_watermark:
+                target = usage.used - self.low_watermark * usage.total
+                evicted = 0
+                for _, path, size in sorted(candidates):
+                    if evicted >= target:
+                        break
+                    evicted += self._remove(path, size, stale=False)
+                freed += evicted
+                logger.info(f"Disk usage was {usage.used / usage.total:.0%}, evicted {evicted} bytes from {self.root}")
+
+        return freed
+
+    async def run(self, interval):
+        """Sweep every ``interval`` seconds until cancelled"""
+        while True:
+            try:
+                await asyncio.to_thread(self.sweep)
+            except Exception as e:
+                logger.error(f"Error sweeping {self.root}: {e}")
+            await asyncio.sleep(interval)
+
+    def get_stats(self):
+        """Return disk usage and reclaim counters"""
+        try:
+            usage = self._disk_usage(self.root)
+            used_ratio = usage.used / usage.total
+            free = usage.free
+        except OSError:
+            used_ratio, free = None, None
+        with self._lock:
+            return {
+                'used_ratio': used_ratio,
+                'free_bytes': free,
+                'sweeps': self.sweeps,
+                'files_evicted': self.files_evicted,
+                'stale_removed': self.stale_removed,
+                'bytes_reclaimed': self.bytes_reclaimed,
+                'jobs_rejected': self.jobs_rejected
+            }
+
+# Shared janitor for the downloads directory
+disk_janitor = DiskJanitor(
+    DOWNLOAD_DIR,
+    high_watermark=DISK_HIGH_WATERMARK,
+    low_watermark=DISK_LOW_WATERMARK,
+    critical_free_bytes=DISK_CRITICAL_FREE_MB * 1024 * 1024,
+    stale_seconds=DISK_STALE_TEMP_SECONDS
+)
+# Partial files of journaled jobs are kept for resuming
+disk_janitor.add_guard(job_journal.output_dirs)
+
+@on_startup
+async def start_disk_janitor(application):
+    """Protect the download dirs of users with updates in flight and start sweeping"""
+    update_processor = application.update_processor
+    if hasattr(update_processor, 'active_user_ids'):
+        disk_janitor.add_guard(
+            lambda: [os.path.join(DOWNLOAD_DIR, f"user_{user_id}") for user_id in update_processor.active_user_ids()]
+        )
+    start_background_task(disk_janitor.run(DISK_JANITOR_INTERVAL), name="disk-janitor")
@@ -0,0 +1,163 @@
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from urllib.parse import urlsplit
+from requests.adapters import HTTPAdapter
+from utils.rate_governor import is_retryable
+from config.config import EGRESS_ADDRESSES, EGRESS_INCLUDE_DIRECT
+
+logger = logging.getLogger(__name__)
+
+# Weight of the latest outcome in an egress's health score
+HEALTH_SMOOTHING = 0.2
+# Egresses below this health sit out for RECOVERY_SECONDS after their last failure,
+# unless every egress is that unhealthy
+MIN_HEALTH = 0.25
+RECOVERY_SECONDS = 300
+# Key under which an info dict records the egress it was extracted through
+INFO_EGRESS_KEY = 'egress'
+
+class SourceAddressAdapter(HTTPAdapter):
+    """requests adapter binding outgoing connections to a local source address"""
+
+    def __init__(self, source_address, **kwargs):
+        self.source_address = source_address
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        kwargs['source_address'] = (self.source_address, 0)
+        super().init_poolmanager(*args, **kwargs)
+
+class Egress:
+    """A way out to the internet: a proxy URL, a local source address, or direct (address None)"""
+
+    def __init__(self, address=None):
+        self.address = address
+        self.is_proxy = bool(address) and '://' in address
+        self.health = 1.0
+        self.in_flight = 0
+        self.pinned = 0
+        self.successes = 0
+        self.failures = 0
+        self.last_failure = 0.0
+
+    def is_healthy(self, now):
+        """Whether the egress should take traffic; unhealthy ones get a retry after a while"""
+        return self.health >= MIN_HEALTH or now - self.last_failure >= RECOVERY_SECONDS
+
+    @property
+    def name(self):
+        """Label without credentials, safe to log and to store in caches"""
+        if not self.address:
+            return 'direct'
+        if self.is_proxy:
+            parts = urlsplit(self.address)
+            return f"{parts.scheme}://{parts.hostname}:{parts.port}" if parts.port else f"{parts.scheme}://{parts.hostname}"
+        return self.address
+
+    @property
+    def load(self):
+        return self.in_flight + self.pinned
+
+    def ytdlp_options(self):
+        """yt-dlp options routing its traffic through this egress"""
+        if not self.address:
+            return {}
+        if self.is_proxy:
+            return {'proxy': self.address}
+        return {'source_address': self.address}
+
+    def apply_to_session(self, session):
+        """Route a requests session (e.g. instaloader's) through this egress"""
+        if not self.address:
+            return
+        if self.is_proxy:
+            session.proxies.update({'http': self.address, 'https': self.address})
+        else:
+            adapter = SourceAddressAdapter(self.address)
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+
+class EgressPool:
+    """Spread outgoing traffic over several proxies or source addresses.
+
+    ``acquire`` hands out the least-loaded healthy egress for one call and scores it
+    by the outcome: throttling and network errors lower its health, so a blocked
+    address is used less until it recovers. ``pin`` assigns an egress for good, for
+    clients that must keep one address (logged-in Instagram sessions). With no
+    addresses configured the pool has a single direct egress.
+    """
+
+    def __init__(self, addresses=None, include_direct=False):
+        self.egresses = [Egress(address) for address in addresses or []]
+        if include_direct or not self.egresses:
+            self.egresses.append(Egress())
+        self._lock = threading.Lock()
+
+    def _pick(self, prefer=None):
+        """Return the preferred egress if present, else the least-loaded healthy one (lock held)"""
+        if prefer:
+            for egress in self.egresses:
+                if egress.name == prefer:
+                    return egress
+
+        now = time.monotonic()
+        healthy = [egress for egress in self.egresses if egress.is_healthy(now)] or self.egresses
+        return min(healthy, key=lambda e: (e.load, -e.health))
+
+    @contextmanager
+    def acquire(self, prefer=None):
+        """Use an egress for one call; ``prefer`` names the egress to reuse (e.g. for IP-bound URLs)"""
+        with self._lock:
+            egress = self._pick(prefer)
+            egress.in_flight += 1
+
+        try:
+            yield egress
+        except Exception as e:
+            # Only failures that point at this address count against it
+            self.report(egress, not is_retryable(e))
+            raise
+        else:
+            self.report(egress, True)
+        finally:
+            with self._lock:
+                egress.in_flight -= 1
+
+    def pin(self):
+        """Assign an egress permanently, spreading pinned clients evenly"""
+        with self._lock:
+            egress = self._pick()
+            egress.pinned += 1
+        return egress
+
+    def report(self, egress, ok):
+        """Update an egress's health score with an outcome"""
+        with self._lock:
+            egress.health = (1 - HEALTH_SMOOTHING) * egress.health + HEALTH_SMOOTHING * (1.0 if ok else 0.0)
+            if ok:
+                egress.successes += 1
+            else:
+                egress.failures += 1
+                egress.last_failure = time.monotonic()
+                if egress.health < MIN_HEALTH:
+                    logger.warning(f"Egress {egress.name} is unhealthy (health {egress.health:.2f})")
+
+    def get_stats(self):
+        """Return load and health per egress"""
+        with self._lock:
+            return [
+                {
+                    'name': egress.name,
+                    'health': egress.health,
+                    'in_flight': egress.in_flight,
+                    'pinned': egress.pinned,
+                    'successes': egress.successes,
+                    'failures': egress.failures
+                }
+                for egress in self.egresses
+            ]
+
+# Shared pool used by yt-dlp and instaloader
+egress_pool = EgressPool(EGRESS_ADDRESSES, include_direct=EGRESS_INCLUDE_DIRECT)
@@ -1,5 +1,7 @@
+import errno
 import logging
 import os
+import shutil
 from logging.handlers import RotatingFileHandler
 
 def setup_logger(name, log_file, level=logging.INFO):
@@ -35,6 +37,41 @@ def get_file_size(file_path):
     except (FileNotFoundError, OSError):
         return 0
 
+# Chunk size for kernel-side copies between filesystems
+COPY_CHUNK_SIZE = 8 * 1024 * 1024
+
+def copy_file_chunked(src_path, dst_path):
+    """Copy a file in fixed-size chunks inside the kernel (copy_file_range/sendfile)"""
+    with open(src_path, 'rb') as src, open(dst_path, 'wb') as dst:
+        remaining = os.fstat(src.fileno()).st_size
+        offset = 0
+        try:
+            while remaining > 0:
+                if hasattr(os, 'copy_file_range'):
+                    copied = os.copy_file_range(src.fileno(), dst.fileno(), min(COPY_CHUNK_SIZE, remaining), offset, offset)
+                else:
+                    copied = os.sendfile(dst.fileno(), src.fileno(), offset, min(COPY_CHUNK_SIZE, remaining))
+                if copied == 0:
+                    break
+                offset += copied
+                remaining -= copied
+        except OSError:
+            # Not supported for this pair of files; stream the rest through a small buffer
+            src.seek(offset)
+            dst.seek(offset)
+            shutil.copyfileobj(src, dst, COPY_CHUNK_SIZE)
+
+def move_file(src_path, dst_path):
+    """Move a file atomically when possible, copying in chunks across filesystems"""
+    try:
+        os.replace(src_path, dst_path)
+    except OSError as e:
+        if e.errno != errno.EXDEV:
+            raise
+        copy_file_chunked(src_path, dst_path)
+        os.remove(src_path)
+    return dst_path
+
 def format_size(size_bytes):
     """Format size in bytes to human-readable format"""
     if size_bytes == 0:
@@ -101,7 +138,7 @@ def is_playlist_url(url, platform=None):
     platform = platform or extract_platform_from_url(url)
     
     if platform == 'spotify':
-        return 'playlist' in url
+        return 'playlist' in url or 'album' in url
     elif platform == 'apple_music':
         return 'playlist' in url
     elif platform == 'soundcloud':
@@ -0,0 +1,90 @@
+import logging
+import os
+import httpx
+from utils.bot_runner import on_shutdown
+from config.config import HTTP_MAX_CONNECTIONS, HTTP_MAX_KEEPALIVE_CONNECTIONS, HTTP2_ENABLED
+
+logger = logging.getLogger(__name__)
+
+# httpx speaks HTTP/2 only when the optional h2 package is installed
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+DEFAULT_TIMEOUT = 30
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
+
+class MediaHttpClient:
+    """Pooled HTTP client for direct media downloads (CDN images, videos, ...).
+
+    Connections are kept alive and reused across downloads and threads, and
+    HTTP/2 is used when available, so repeated fetches from the same CDN skip the
+    TCP and TLS handshakes. Bodies are streamed to disk in chunks.
+    """
+
+    def __init__(self, max_connections=20, max_keepalive_connections=10, http2=True, timeout=DEFAULT_TIMEOUT, transport=None):
+        self.http2 = http2 and HTTP2_AVAILABLE
+        self._client = httpx.Client(
+            http2=self.http2,
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_keepalive_connections
+            ),
+            timeout=httpx.Timeout(timeout),
+            follow_redirects=True,
+            headers={'User-Agent': USER_AGENT},
+            transport=transport
+        )
+
+    def download(self, url, output_path, chunk_size=DOWNLOAD_CHUNK_SIZE):
+        """Stream a URL into a file, returning the path or None; the file only appears once complete.
+
+        A ``.part`` file left by an interrupted download is continued with a Range
+        request; servers that ignore the range send the whole body, which replaces it.
+        Network failures (httpx.TransportError) are raised so the caller can retry,
+        and the partial file is kept for that retry to continue.
+        """
+        part_path = f"{output_path}.part"
+        offset = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+        headers = {'Range': f"bytes={offset}-"} if offset else None
+        try:
+            with self._client.stream('GET', url, headers=headers) as response:
+                if offset and response.status_code == 416:
+                    # The partial file is already complete
+                    os.replace(part_path, output_path)
+                    return output_path
+                response.raise_for_status()
+                mode = 'ab' if offset and response.status_code == 206 else 'wb'
+                with open(part_path, mode) as f:
+                    for chunk in response.iter_bytes(chunk_size):
+                        f.write(chunk)
+            os.replace(part_path, output_path)
+            return output_path
+        except httpx.TransportError as e:
+            # Keep what arrived; the next attempt continues from it
+            logger.warning(f"Network error downloading {url}: {e}")
+            raise
+        except (httpx.HTTPError, OSError) as e:
+            logger.error(f"Error downloading {url}: {e}")
+            if os.path.exists(part_path):
+                os.remove(part_path)
+            return None
+
+    def close(self):
+        """Close pooled connections"""
+        self._client.close()
+
+# Shared client for all direct media downloads
+http_client = MediaHttpClient(
+    max_connections=HTTP_MAX_CONNECTIONS,
+    max_keepalive_connections=HTTP_MAX_KEEPALIVE_CONNECTIONS,
+    http2=HTTP2_ENABLED
+)
+
+@on_shutdown
+async def close_http_client(application):
+    """Close the shared client's pooled connections"""
+    http_client.close()
@@ -0,0 +1,120 @@
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+from utils.sqlite_store import LazySQLite
+from config.config import JOB_JOURNAL_DB
+
+logger = logging.getLogger(__name__)
+
+class JobJournal:
+    """Persistent record of downloads in progress.
+
+    A job is written when it starts and removed when it ends, successfully or
+    not, so rows still present at startup belong to downloads cut off by a crash
+    or restart. Their partial files are kept next to the final path, and running
+    the same job again continues from them. The job ID is derived from the job's
+    kind and payload, so a repeated request maps onto the same row.
+    """
+
+    def __init__(self, db_path=None):
+        self._memory = {}
+        self._lock = threading.Lock()
+
+        self._sqlite = LazySQLite(
+            db_path,
+            "CREATE TABLE IF NOT EXISTS download_jobs ("
+            "job_id TEXT PRIMARY KEY, kind TEXT NOT NULL, payload TEXT NOT NULL, "
+            "user_id INTEGER, chat_id INTEGER, attempts INTEGER NOT NULL DEFAULT 1, "
+            "started_at REAL NOT NULL)",
+            "download job journal"
+        )
+
+    @property
+    def _db(self):
+        """SQLite connection, opened on first use; None when kept in memory only"""
+        return self._sqlite.connect()
+
+    @staticmethod
+    def make_job_id(kind, payload):
+        """Stable ID for a job with the given kind and payload"""
+        digest = hashlib.sha1(f"{kind}:{json.dumps(payload, sort_keys=True)}".encode('utf-8'))
+        return digest.hexdigest()[:20]
+
+    def start(self, kind, payload, user_id=None, chat_id=None):
+        """Record a job as running and return its ID; a job started again counts another attempt"""
+        job_id = self.make_job_id(kind, payload)
+        now = time.time()
+        with self._lock:
+            if self._db is None:
+                previous = self._memory.get(job_id)
+                self._memory[job_id] = {
+                    'job_id': job_id, 'kind': kind, 'payload': payload, 'user_id': user_id,
+                    'chat_id': chat_id, 'attempts': previous['attempts'] + 1 if previous else 1, 'started_at': now
+                }
+                return job_id
+
+            try:
+                self._db.execute(
+                    "INSERT INTO download_jobs (job_id, kind, payload, user_id, chat_id, attempts, started_at) "
+                    "VALUES (?, ?, ?, ?, ?, 1, ?) "
+                    "ON CONFLICT(job_id) DO UPDATE SET attempts = attempts + 1, started_at = excluded.started_at",
+                    (job_id, kind, json.dumps(payload), user_id, chat_id, now)
+                )
+                self._db.commit()
+            except sqlite3.Error as e:
+                logger.error(f"Error writing download job journal: {e}")
+        return job_id
+
+    def finish(self, job_id):
+        """Remove a job that ended, whatever the outcome"""
+        with self._lock:
+            if self._db is None:
+                self._memory.pop(job_id, None)
+                return
+            try:
+                self._db.execute("DELETE FROM download_jobs WHERE job_id = ?", (job_id,))
+                self._db.commit()
+            except sqlite3.Error as e:
+                logger.error(f"Error deleting from download job journal: {e}")
+
+    def interrupted(self, kind):
+        """Return the jobs of a kind that were still running when the bot stopped"""
+        with self._lock:
+            if self._db is None:
+                return [dict(job) for job in self._memory.values() if job['kind'] == kind]
+            try:
+                rows = self._db.execute(
+                    "SELECT job_id, payload, user_id, chat_id, attempts, started_at FROM download_jobs "
+                    "WHERE kind = ? ORDER BY started_at",
+                    (kind,)
+                ).fetchall()
+            except sqlite3.Error as e:
+                logger.error(f"Error reading download job journal: {e}")
+                return []
+
+        return [
+            {
+                'job_id': job_id, 'kind': kind, 'payload': json.loads(payload), 'user_id': user_id,
+                'chat_id': chat_id, 'attempts': attempts, 'started_at': started_at
+            }
+            for job_id, payload, user_id, chat_id, attempts, started_at in rows
+        ]
+
+    def output_dirs(self):
+        """Return the output directories of all journaled jobs, whose partial files must be kept"""
+        with self._lock:
+            if self._db is None:
+                payloads = [job['payload'] for job in self._memory.values()]
+            else:
+                try:
+                    payloads = [json.loads(row[0]) for row in self._db.execute("SELECT payload FROM download_jobs")]
+                except sqlite3.Error as e:
+                    logger.error(f"Error reading download job journal: {e}")
+                    return []
+        return [payload['output_dir'] for payload in payloads if payload.get('output_dir')]
+
+# Shared journal of in-flight downloads
+job_journal = JobJournal(db_path=JOB_JOURNAL_DB)
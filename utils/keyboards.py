@@ -0,0 +1,30 @@
+from telegram import InlineKeyboardButton, InlineKeyboardMarkup
+
+class StaticInlineKeyboardMarkup(InlineKeyboardMarkup):
+    """InlineKeyboardMarkup that serializes itself once.
+
+    Meant for menus built at import time and reused for every callback: the
+    markup is immutable, so the dict handed to the JSON encoder never changes.
+    """
+
+    __slots__ = ('_serialized',)
+
+    def __init__(self, inline_keyboard, **kwargs):
+        super().__init__(inline_keyboard, **kwargs)
+        with self._unfrozen():
+            self._serialized = super().to_dict()
+
+    def to_dict(self, recursive=True):
+        """Return the cached serialization"""
+        if not recursive:
+            return super().to_dict(recursive=False)
+        return self._serialized
+
+def build_static_markup(rows):
+    """Build a static markup from rows of (text, callback_data) tuples or buttons"""
+    keyboard = [
+        [button if isinstance(button, InlineKeyboardButton) else InlineKeyboardButton(button[0], callback_data=button[1])
+         for button in row]
+        for row in rows
+    ]
+    return StaticInlineKeyboardMarkup(keyboard)
@@ -0,0 +1,201 @@
+import json
+import logging
+import sqlite3
+import threading
+import time
+from utils.cache import TTLCache
+from utils.sqlite_store import LazySQLite
+from config.config import (
+    METADATA_CACHE_MEMORY_ENTRIES, METADATA_CACHE_MAX_ENTRIES, METADATA_CACHE_TTL_DEFAULT,
+    METADATA_CACHE_TTLS, METADATA_CACHE_DB
+)
+
+logger = logging.getLogger(__name__)
+
+# Trim the on-disk store once every this many writes
+PRUNE_INTERVAL = 100
+
+# Parts of yt-dlp info dicts nothing here reads; subtitle and thumbnail lists alone often run to hundreds of KB
+UNUSED_INFO_FIELDS = (
+    'subtitles', 'automatic_captions', 'requested_subtitles', 'thumbnails', 'heatmap', 'chapters',
+    'description', 'tags', 'categories'
+)
+# Fields kept for playlist entries, which are only listed and counted
+PLAYLIST_ENTRY_FIELDS = ('_type', 'ie_key', 'id', 'title', 'url', 'webpage_url', 'duration', 'uploader')
+
+def slim_info(info):
+    """Strip a sanitized yt-dlp info dict down to what the menus and downloads use, before caching it"""
+    info = {key: value for key, value in info.items() if key not in UNUSED_INFO_FIELDS}
+    if info.get('formats'):
+        # Storyboards are thumbnail sprites with long fragment lists; no menu offers them
+        info['formats'] = [
+            fmt for fmt in info['formats']
+            if fmt.get('format_note') != 'storyboard' and fmt.get('ext') != 'mhtml'
+        ]
+    if info.get('entries'):
+        info['entries'] = [
+            {key: entry[key] for key in PLAYLIST_ENTRY_FIELDS if key in entry}
+            for entry in info['entries'] if entry
+        ]
+    return info
+
+class MetadataCache:
+    """Two-level cache for extraction results (yt-dlp info dicts and the like).
+
+    Entries live in an in-memory LRU and, when ``db_path`` is set, in SQLite so they
+    survive restarts. Each platform has its own TTL; the disk store is capped at
+    ``max_entries`` rows, dropping the oldest first. Values must be JSON-serializable.
+    """
+
+    def __init__(self, memory_size=512, max_entries=5000, ttls=None, default_ttl=3600, db_path=None):
+        self.max_entries = max_entries
+        self.ttls = dict(ttls or {})
+        self.default_ttl = default_ttl
+        self._memory = TTLCache(max_size=memory_size, ttl=default_ttl)
+        self._db_lock = threading.RLock()
+        self._writes = 0
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        self._sqlite = LazySQLite(
+            db_path,
+            "CREATE TABLE IF NOT EXISTS metadata_cache ("
+            "key TEXT PRIMARY KEY, platform TEXT NOT NULL, value TEXT NOT NULL, "
+            "stored_at REAL NOT NULL, expires_at REAL NOT NULL)",
+            "metadata cache",
+            on_open=self._prune
+        )
+
+    @property
+    def _db(self):
+        """SQLite connection, opened on first use; None when kept in memory only"""
+        return self._sqlite.connect()
+
+    @staticmethod
+    def make_key(platform, url, variant=''):
+        """Build the cache key for a URL extracted with a given option set"""
+        return f"{platform}:{variant}:{url.strip()}"
+
+    def get_ttl(self, platform):
+        """Return the TTL (seconds) used for a platform"""
+        return self.ttls.get(platform, self.default_ttl)
+
+    def get(self, platform, url, variant=''):
+        """Return a cached value or None"""
+        key = self.make_key(platform, url, variant)
+        value = self._memory.get(key)
+        if value is not None:
+            self.memory_hits += 1
+            return value
+
+        if self._db is not None:
+            try:
+                with self._db_lock:
+                    row = self._db.execute(
+                        "SELECT value, expires_at FROM metadata_cache WHERE key = ? AND expires_at > ?",
+                        (key, time.time())
+                    ).fetchone()
+            except sqlite3.Error as e:
+                logger.error(f"Error reading metadata cache: {e}")
+                row = None
+
+            if row is not None:
+                value = json.loads(row[0])
+                # Promote to memory for the rest of its lifetime
+                self._memory.set(key, value, ttl=max(row[1] - time.time(), 1))
+                self.disk_hits += 1
+                return value
+
+        self.misses += 1
+        return None
+
+    def set(self, platform, url, value, variant=''):
+        """Store a value under the platform's TTL"""
+        key = self.make_key(platform, url, variant)
+        ttl = self.get_ttl(platform)
+        self._memory.set(key, value, ttl=ttl)
+
+        if self._db is None:
+            return
+
+        try:
+            now = time.time()
+            with self._db_lock:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO metadata_cache (key, platform, value, stored_at, expires_at) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (key, platform, json.dumps(value, ensure_ascii=False), now, now + ttl)
+                )
+                self._db.commit()
+                self._writes += 1
+            if self._writes % PRUNE_INTERVAL == 0:
+                self._prune()
+        except (sqlite3.Error, TypeError, ValueError) as e:
+            logger.error(f"Error writing metadata cache: {e}")
+
+    def get_or_extract(self, platform, url, extract, variant=''):
+        """Return the cached value or call ``extract()`` and cache a non-empty result"""
+        value = self.get(platform, url, variant)
+        if value is not None:
+            return value
+
+        value = extract()
+        if value:
+            self.set(platform, url, value, variant)
+        return value
+
+    def invalidate(self, platform, url, variant=''):
+        """Drop an entry, e.g. when its contents turned out to be stale"""
+        key = self.make_key(platform, url, variant)
+        self._memory.pop(key)
+        if self._db is not None:
+            try:
+                with self._db_lock:
+                    self._db.execute("DELETE FROM metadata_cache WHERE key = ?", (key,))
+                    self._db.commit()
+            except sqlite3.Error as e:
+                logger.error(f"Error invalidating metadata cache entry: {e}")
+
+    def _prune(self):
+        """Remove expired rows and keep the store within max_entries"""
+        try:
+            with self._db_lock:
+                self._db.execute("DELETE FROM metadata_cache WHERE expires_at <= ?", (time.time(),))
+                self._db.execute(
+                    "DELETE FROM metadata_cache WHERE key IN ("
+                    "SELECT key FROM metadata_cache ORDER BY stored_at DESC LIMIT -1 OFFSET ?)",
+                    (self.max_entries,)
+                )
+                self._db.commit()
+        except sqlite3.Error as e:
+            logger.error(f"Error pruning metadata cache: {e}")
+
+    def get_stats(self):
+        """Return hit-rate metrics"""
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        disk_entries = 0
+        if self._db is not None:
+            try:
+                with self._db_lock:
+                    disk_entries = self._db.execute("SELECT COUNT(*) FROM metadata_cache").fetchone()[0]
+            except sqlite3.Error as e:
+                logger.error(f"Error counting metadata cache entries: {e}")
+
+        return {
+            'memory_entries': len(self._memory),
+            'disk_entries': disk_entries,
+            'memory_hits': self.memory_hits,
+            'disk_hits': self.disk_hits,
+            'misses': self.misses,
+            'hit_rate': (self.memory_hits + self.disk_hits) / lookups if lookups else 0.0
+        }
+
+# Shared cache used by all extractors
+metadata_cache = MetadataCache(
+    memory_size=METADATA_CACHE_MEMORY_ENTRIES,
+    max_entries=METADATA_CACHE_MAX_ENTRIES,
+    ttls=METADATA_CACHE_TTLS,
+    default_ttl=METADATA_CACHE_TTL_DEFAULT,
+    db_path=METADATA_CACHE_DB
+)
@@ -0,0 +1,131 @@
+import json
+import logging
+import secrets
+import sqlite3
+import threading
+import time
+from utils.cache import TTLCache
+from utils.sqlite_store import LazySQLite
+from config.config import CALLBACK_PAYLOAD_TTL, CALLBACK_PAYLOAD_MAX_ENTRIES, CALLBACK_PAYLOAD_DB
+
+logger = logging.getLogger(__name__)
+
+# 6 random bytes -> 8 URL-safe characters, leaving plenty of the 64 byte callback_data budget
+TOKEN_BYTES = 6
+
+# Trim the on-disk store once every this many writes
+PRUNE_INTERVAL = 100
+
+class CallbackPayloadStore:
+    """Map short tokens to callback payloads that don't fit in Telegram's 64 byte callback_data.
+
+    Payloads are kept in a bounded LRU with a TTL. When ``db_path`` is set they are also
+    written to SQLite, so buttons sent before a restart keep working until they expire;
+    the table is pruned of expired rows and capped at ``max_size`` rows as it is written.
+    Identical payloads share a token, so re-sending the same menu doesn't grow the store.
+    """
+
+    def __init__(self, max_size=10000, ttl=86400, db_path=None):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._writes = 0
+        self._tokens = TTLCache(max_size=max_size, ttl=ttl)
+        self._by_payload = TTLCache(max_size=max_size, ttl=ttl)
+        self._db_lock = threading.RLock()
+
+        self._sqlite = LazySQLite(
+            db_path,
+            "CREATE TABLE IF NOT EXISTS callback_payloads ("
+            "token TEXT PRIMARY KEY, payload TEXT NOT NULL, expires_at REAL NOT NULL)",
+            "callback payload store",
+            on_open=self._prune
+        )
+
+    @property
+    def _db(self):
+        """SQLite connection, opened on first use; None when kept in memory only"""
+        return self._sqlite.connect()
+
+    def put(self, payload):
+        """Store a JSON-serializable payload and return its token"""
+        key = json.dumps(payload, sort_keys=True, ensure_ascii=False)
+        token = self._by_payload.get(key)
+        if token is not None and self._tokens.get(token) is not None:
+            return token
+
+        token = secrets.token_urlsafe(TOKEN_BYTES)
+        self._tokens.set(token, payload)
+        self._by_payload.set(key, token)
+
+        if self._db is not None:
+            try:
+                with self._db_lock:
+                    self._db.execute(
+                        "INSERT OR REPLACE INTO callback_payloads (token, payload, expires_at) VALUES (?, ?, ?)",
+                        (token, key, time.time() + self.ttl)
+                    )
+                    self._db.commit()
+                    self._writes += 1
+                if self._writes % PRUNE_INTERVAL == 0:
+                    self._prune()
+            except sqlite3.Error as e:
+                logger.error(f"Error persisting callback payload: {e}")
+
+        return token
+
+    def get(self, token):
+        """Return the payload for a token, or None if it is unknown or expired"""
+        payload = self._tokens.get(token)
+        if payload is not None or self._db is None:
+            return payload
+
+        try:
+            with self._db_lock:
+                row = self._db.execute(
+                    "SELECT payload FROM callback_payloads WHERE token = ? AND expires_at > ?",
+                    (token, time.time())
+                ).fetchone()
+        except sqlite3.Error as e:
+            logger.error(f"Error reading callback payload: {e}")
+            return None
+
+        if row is None:
+            return None
+
+        payload = json.loads(row[0])
+        self._tokens.set(token, payload)
+        return payload
+
+    def _prune(self):
+        """Remove expired rows and keep the store within max_size, dropping the oldest first"""
+        try:
+            with self._db_lock:
+                self._db.execute("DELETE FROM callback_payloads WHERE expires_at <= ?", (time.time(),))
+                self._db.execute(
+                    "DELETE FROM callback_payloads WHERE token IN ("
+                    "SELECT token FROM callback_payloads ORDER BY expires_at DESC LIMIT -1 OFFSET ?)",
+                    (self.max_size,)
+                )
+                self._db.commit()
+        except sqlite3.Error as e:
+            logger.error(f"Error pruning callback payload store: {e}")
+
+    def callback_data(self, prefix, payload):
+        """Build callback_data of the form ``{prefix}{token}`` for a payload"""
+        data = f"{prefix}{self.put(payload)}"
+        if len(data.encode('utf-8')) > 64:
+            raise ValueError(f"Callback prefix too long: {prefix}")
+        return data
+
+    def resolve(self, callback_data, prefix):
+        """Return the payload referenced by ``{prefix}{token}`` callback data, or None"""
+        if not callback_data.startswith(prefix):
+            return None
+        return self.get(callback_data[len(prefix):])
+
+# Shared store used by all handlers
+callback_payloads = CallbackPayloadStore(
+    max_size=CALLBACK_PAYLOAD_MAX_ENTRIES,
+    ttl=CALLBACK_PAYLOAD_TTL,
+    db_path=CALLBACK_PAYLOAD_DB
+)
@@ -0,0 +1,305 @@
+import asyncio
+import contextvars
+import logging
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+import httpx
+import requests
+from urllib3.exceptions import ReadTimeoutError, ProtocolError
+from utils.circuit_breaker import circuit_breakers
+from config.config import (
+    UPSTREAM_RATE_LIMITS, RATE_LIMIT_BURST, RATE_LIMIT_MAX_RETRIES, RATE_LIMIT_BASE_DELAY, RATE_LIMIT_MAX_DELAY
+)
+
+logger = logging.getLogger(__name__)
+
+# HTTP statuses worth retrying after a pause
+RETRYABLE_STATUSES = {429, 500, 502, 503, 504}
+
+# Network failures worth retrying
+NETWORK_ERRORS = (
+    requests.ConnectionError, requests.Timeout, httpx.TransportError, ReadTimeoutError, ProtocolError,
+    ConnectionError, TimeoutError
+)
+
+# Tokens taken by wait_ready() on the event loop, per upstream; asyncio.to_thread copies
+# the context into the worker, so the blocking call there spends them instead of waiting
+_prepaid = contextvars.ContextVar('prepaid_tokens', default=None)
+
+def _exception_chain(exc):
+    """Yield the exception and the ones it wraps (yt-dlp keeps the cause in exc_info)"""
+    seen = set()
+    while exc is not None and id(exc) not in seen:
+        seen.add(id(exc))
+        yield exc
+        exc_info = getattr(exc, 'exc_info', None)
+        exc = exc.__cause__ or exc.__context__ or (exc_info[1] if isinstance(exc_info, tuple) and len(exc_info) > 1 else None)
+
+def get_http_status(exc):
+    """Return the HTTP status carried by an exception (requests, spotipy, yt-dlp), or None"""
+    for error in _exception_chain(exc):
+        for attr in ('http_status', 'status_code', 'status'):
+            status = getattr(error, attr, None)
+            if isinstance(status, int):
+                return status
+        response = getattr(error, 'response', None)
+        for attr in ('status_code', 'status'):
+            status = getattr(response, attr, None)
+            if isinstance(status, int):
+                return status
+    return None
+
+def get_retry_after(exc):
+    """Return the server's Retry-After delay in seconds, or None"""
+    for error in _exception_chain(exc):
+        headers = getattr(error, 'headers', None) or getattr(getattr(error, 'response', None), 'headers', None)
+        value = headers.get('Retry-After') if hasattr(headers, 'get') else None
+        if not value:
+            continue
+        try:
+            return max(float(value), 0.0)
+        except ValueError:
+            pass
+        try:
+            return max(parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+        except (TypeError, ValueError):
+            pass
+    return None
+
+def is_retryable(exc):
+    """Whether a failure is throttling, a server error or a network error"""
+    if any(isinstance(error, NETWORK_ERRORS) for error in _exception_chain(exc)):
+        return True
+    status = get_http_status(exc)
+    if status is not None:
+        return status in RETRYABLE_STATUSES
+    message = str(exc)
+    return 'HTTP Error 429' in message or 'Too Many Requests' in message
+
+class TokenBucket:
+    """Token bucket allowing ``rate`` requests per second with bursts up to ``capacity``"""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = max(capacity, 1)
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        """Add the tokens earned since the last update (lock held)"""
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self):
+        """Take a token and return how many seconds to wait before using it"""
+        with self._lock:
+            now = time.monotonic()
+            if self.rate <= 0:
+                return max(self.paused_until - now, 0.0)
+
+            self._refill(now)
+            self.tokens -= 1
+            return max(-self.tokens / self.rate if self.tokens < 0 else 0.0, self.paused_until - now)
+
+    def pause_remaining(self):
+        """Seconds left of a server-requested pause"""
+        with self._lock:
+            return max(self.paused_until - time.monotonic(), 0.0)
+
+    def pause(self, seconds):
+        """Hold back every request for ``seconds``, e.g. when the server sent Retry-After"""
+        with self._lock:
+            self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+class RateGovernor:
+    """Per-upstream request pacing and retries.
+
+    Each upstream (``instagram``, ``spotify``, ...) has its own token bucket, so a
+    burst against one service never delays another. Failed calls are retried with
+    jittered exponential backoff counted per call; a Retry-After from the server
+    pauses that upstream's bucket for everyone. ``run_async`` waits with
+    ``asyncio.sleep`` and runs the call in a worker thread; ``run`` is for code that
+    already runs in one. Worker threads come from a pool shared by every platform,
+    so async callers should ``await wait_ready`` before handing work to a thread:
+    it takes the upstream's next token on the event loop, and the first ``run`` in
+    that thread spends it instead of sleeping, so queued jobs wait on the loop.
+
+    With ``breakers`` (a CircuitBreakerRegistry), every attempt is reported to the
+    upstream's circuit breaker and an open circuit raises CircuitOpenError before
+    any waiting. Pass ``timed=False`` for calls whose duration says nothing about
+    the platform's health, such as full media downloads.
+    """
+
+    def __init__(self, rates=None, burst=5, max_retries=3, base_delay=1.0, max_delay=30.0, breakers=None):
+        self.rates = dict(rates or {})
+        self.breakers = breakers
+        self.burst = burst
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._buckets = {}
+        self._lock = threading.Lock()
+        self._stats = {}
+
+    def _bucket(self, upstream):
+        """Return the upstream's bucket, creating it on first use"""
+        with self._lock:
+            if upstream not in self._buckets:
+                self._buckets[upstream] = TokenBucket(self.rates.get(upstream, 0), self.burst)
+                self._stats[upstream] = {'calls': 0, 'retries': 0, 'throttled': 0, 'failures': 0}
+            return self._buckets[upstream]
+
+    def _count(self, upstream, name):
+        with self._lock:
+            self._stats[upstream][name] += 1
+
+    def backoff_delay(self, attempt, retry_after=None):
+        """Delay before retry number ``attempt`` (0-based): the server's hint, or full-jitter backoff"""
+        if retry_after is not None:
+            return retry_after + random.uniform(0, self.base_delay)
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+    def _check_circuit(self, upstream):
+        """Fail fast if the upstream's circuit is open"""
+        if self.breakers is not None:
+            self.breakers.get(upstream).allow()
+
+    def _record(self, upstream, ok, started, timed):
+        """Report an attempt's outcome to the upstream's circuit breaker"""
+        if self.breakers is not None:
+            self.breakers.get(upstream).record(ok, time.monotonic() - started if timed else None)
+
+    def _after_failure(self, upstream, exc, attempt, retry_if):
+        """Return the delay before retrying, or None if the call shouldn't be retried"""
+        if attempt >= self.max_retries or not retry_if(exc):
+            self._count(upstream, 'failures')
+            return None
+
+        retry_after = get_retry_after(exc)
+        if retry_after is not None or get_http_status(exc) == 429:
+            self._count(upstream, 'throttled')
+
+        self._count(upstream, 'retries')
+        delay = self.backoff_delay(attempt, retry_after)
+        logger.warning(f"{upstream} request failed ({exc}); retry {attempt + 1}/{self.max_retries} in {delay:.1f}s")
+        if retry_after is not None:
+            # The server's delay applies to every caller; the bucket wait covers this retry too
+            self._bucket(upstream).pause(delay)
+            return 0.0
+        return delay
+
+    def _abandon(self, upstream):
+        """Tell the circuit breaker a call it allowed ended without an outcome"""
+        if self.breakers is not None:
+            self.breakers.get(upstream).abandon()
+
+    async def wait_ready(self, *upstreams):
+        """Take a token per upstream, waiting for it on the event loop, for the next blocking call to spend"""
+        prepaid = dict(_prepaid.get() or {})
+        for upstream in upstreams:
+            wait = self._bucket(upstream).reserve()
+            prepaid[upstream] = prepaid.get(upstream, 0) + 1
+            _prepaid.set(prepaid)
+            if wait > 0:
+                await asyncio.sleep(wait)
+
+    @staticmethod
+    def _spend_prepaid(upstream):
+        """Use a token wait_ready took for this task, if there is one"""
+        prepaid = _prepaid.get()
+        if not prepaid or not prepaid.get(upstream):
+            return False
+        prepaid[upstream] -= 1
+        return True
+
+    def run(self, upstream, func, *args, retry_if=is_retryable, timed=True, **kwargs):
+        """Call ``func`` under the upstream's rate limit, retrying failures (blocking)"""
+        bucket = self._bucket(upstream)
+        attempt = 0
+        while True:
+            self._check_circuit(upstream)
+            recorded = False
+            try:
+                wait = bucket.pause_remaining() if attempt == 0 and self._spend_prepaid(upstream) else bucket.reserve()
+                if wait > 0:
+                    time.sleep(wait)
+                self._count(upstream, 'calls')
+                started = time.monotonic()
+                try:
+                    result = func(*args, **kwargs)
+                except Exception as e:
+                    # Only platform trouble counts against the circuit, not e.g. a missing video
+                    self._record(upstream, not retry_if(e), started, timed)
+                    recorded = True
+                    delay = self._after_failure(upstream, e, attempt, retry_if)
+                    if delay is None:
+                        raise
+                else:
+                    self._record(upstream, True, started, timed)
+                    recorded = True
+                    return result
+            finally:
+                if not recorded:
+                    self._abandon(upstream)
+            if delay > 0:
+                time.sleep(delay)
+            attempt += 1
+
+    async def run_async(self, upstream, func, *args, retry_if=is_retryable, timed=True, **kwargs):
+        """Like ``run``, but waits without blocking the event loop and calls ``func`` in a worker thread.
+
+        A coroutine function is awaited on the loop instead, e.g. to wait for a
+        resource there before doing its own blocking work in a thread.
+        """
+        bucket = self._bucket(upstream)
+        attempt = 0
+        while True:
+            self._check_circuit(upstream)
+            recorded = False
+            try:
+                wait = bucket.reserve()
+                if wait > 0:
+                    await asyncio.sleep(wait)
+                self._count(upstream, 'calls')
+                started = time.monotonic()
+                try:
+                    if asyncio.iscoroutinefunction(func):
+                        result = await func(*args, **kwargs)
+                    else:
+                        result = await asyncio.to_thread(func, *args, **kwargs)
+                except Exception as e:
+                    self._record(upstream, not retry_if(e), started, timed)
+                    recorded = True
+                    delay = self._after_failure(upstream, e, attempt, retry_if)
+                    if delay is None:
+                        raise
+                else:
+                    self._record(upstream, True, started, timed)
+                    recorded = True
+                    return result
+            finally:
+                # A cancelled or interrupted call must not keep a half-open circuit's probe slot
+                if not recorded:
+                    self._abandon(upstream)
+            if delay > 0:
+                await asyncio.sleep(delay)
+            attempt += 1
+
+    def get_stats(self):
+        """Return call, retry and throttling counts per upstream"""
+        with self._lock:
+            return {upstream: dict(stats) for upstream, stats in self._stats.items()}
+
+# Shared governor for all outgoing platform requests
+rate_governor = RateGovernor(
+    rates=UPSTREAM_RATE_LIMITS,
+    burst=RATE_LIMIT_BURST,
+    max_retries=RATE_LIMIT_MAX_RETRIES,
+    base_delay=RATE_LIMIT_BASE_DELAY,
+    max_delay=RATE_LIMIT_MAX_DELAY,
+    breakers=circuit_breakers
+)
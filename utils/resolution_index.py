@@ -0,0 +1,130 @@
+import re
+import logging
+import sqlite3
+import threading
+import time
+import unicodedata
+from utils.cache import TTLCache
+from utils.sqlite_store import LazySQLite
+from config.config import RESOLUTION_INDEX_DB, RESOLUTION_INDEX_MEMORY_ENTRIES
+
+logger = logging.getLogger(__name__)
+
+def normalize_text(text):
+    """Normalize a title or artist for matching (case, width, punctuation, spacing)"""
+    text = unicodedata.normalize('NFKC', text or '').casefold()
+    text = re.sub(r'[^\w\s]', ' ', text)
+    return ' '.join(text.split())
+
+class TrackResolutionIndex:
+    """Persistent mapping from music tracks to the YouTube videos chosen for them.
+
+    A track is indexed under its source ID (e.g. ``spotify:<track id>``) when it has
+    one, and under its normalized (title, artist, duration) so the same song reached
+    through another platform or link resolves too. Lookups hit an in-memory LRU
+    first and SQLite second.
+    """
+
+    def __init__(self, memory_size=2048, db_path=None):
+        self._memory = TTLCache(max_size=memory_size, ttl=0)
+        self._db_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+        self._sqlite = LazySQLite(
+            db_path,
+            "CREATE TABLE IF NOT EXISTS track_resolutions ("
+            "key TEXT PRIMARY KEY, video_id TEXT NOT NULL, resolved_at REAL NOT NULL)",
+            "track resolution index"
+        )
+
+    @property
+    def _db(self):
+        """SQLite connection, opened on first use; None when kept in memory only"""
+        return self._sqlite.connect()
+
+    @staticmethod
+    def make_keys(track_info, source=None):
+        """Return the index keys for a track, most specific first"""
+        keys = []
+        if source and track_info.get('id'):
+            keys.append(f"{source}:{track_info['id']}")
+
+        duration_ms = track_info.get('duration_ms')
+        duration = str(round(duration_ms / 1000)) if duration_ms else ''
+        title = normalize_text(track_info.get('name'))
+        if title:
+            keys.append(f"track:{title}|{normalize_text(track_info.get('artist'))}|{duration}")
+
+        return keys
+
+    def lookup(self, track_info, source=None):
+        """Return the YouTube video ID previously chosen for a track, or None"""
+        keys = self.make_keys(track_info, source)
+        for key in keys:
+            video_id = self._memory.get(key)
+            if video_id:
+                self.hits += 1
+                return video_id
+
+        if self._db is not None and keys:
+            try:
+                with self._db_lock:
+                    rows = dict(self._db.execute(
+                        f"SELECT key, video_id FROM track_resolutions WHERE key IN ({','.join('?' * len(keys))})",
+                        keys
+                    ).fetchall())
+            except sqlite3.Error as e:
+                logger.error(f"Error reading track resolution index: {e}")
+                rows = {}
+
+            for key in keys:
+                if key in rows:
+                    self._memory.set(key, rows[key])
+                    self.hits += 1
+                    return rows[key]
+
+        self.misses += 1
+        return None
+
+    def record(self, track_info, video_id, source=None):
+        """Remember the YouTube video chosen for a track under all of its keys"""
+        keys = self.make_keys(track_info, source)
+        for key in keys:
+            self._memory.set(key, video_id)
+
+        if self._db is None or not keys:
+            return
+
+        try:
+            now = time.time()
+            with self._db_lock:
+                self._db.executemany(
+                    "INSERT OR REPLACE INTO track_resolutions (key, video_id, resolved_at) VALUES (?, ?, ?)",
+                    [(key, video_id, now) for key in keys]
+                )
+                self._db.commit()
+        except sqlite3.Error as e:
+            logger.error(f"Error writing track resolution index: {e}")
+
+    def forget(self, track_info, source=None):
+        """Drop a track's mapping, e.g. when the video is no longer available"""
+        keys = self.make_keys(track_info, source)
+        for key in keys:
+            self._memory.pop(key)
+
+        if self._db is None or not keys:
+            return
+
+        try:
+            with self._db_lock:
+                self._db.executemany("DELETE FROM track_resolutions WHERE key = ?", [(key,) for key in keys])
+                self._db.commit()
+        except sqlite3.Error as e:
+            logger.error(f"Error deleting from track resolution index: {e}")
+
+# Shared index used by the music downloaders
+resolution_index = TrackResolutionIndex(
+    memory_size=RESOLUTION_INDEX_MEMORY_ENTRIES,
+    db_path=RESOLUTION_INDEX_DB
+)
@@ -0,0 +1,203 @@
+import asyncio
+import logging
+import threading
+import time
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+
+logger = logging.getLogger(__name__)
+
+# Weight of the latest outcome in a session's health score
+HEALTH_SMOOTHING = 0.2
+
+class SessionPoolExhausted(TimeoutError):
+    """No session freed up within the pool's wait timeout"""
+
+def _wake(waiter):
+    if not waiter.done():
+        waiter.set_result(None)
+
+class PooledSession:
+    """A client in a SessionPool, with its request budget and cooldown state"""
+
+    def __init__(self, name, client):
+        self.name = name
+        self.client = client
+        self.recent_jobs = deque()
+        self.in_flight = 0
+        self.cooldown_until = 0.0
+        self.health = 1.0
+        self.successes = 0
+        self.failures = 0
+        self.rate_limits = 0
+
+    def jobs_in_window(self, now, window):
+        """Count the jobs started within the last ``window`` seconds"""
+        while self.recent_jobs and self.recent_jobs[0] <= now - window:
+            self.recent_jobs.popleft()
+        return len(self.recent_jobs)
+
+class SessionLease:
+    """A session checked out of the pool; set ``ok``/``rate_limited`` to report the outcome"""
+
+    def __init__(self, session):
+        self.session = session
+        self.client = session.client
+        self.ok = True
+        self.rate_limited = False
+
+class SessionPool:
+    """Spread jobs over several client sessions (e.g. logged-in accounts).
+
+    Each session may start at most ``budget`` jobs per ``window`` seconds and runs
+    ``max_in_flight`` jobs at a time. A session that hits a rate limit sits out for
+    ``cooldown`` seconds. Jobs go to the available session with the best recent
+    success rate; when none is available, ``acquire`` waits up to ``wait_timeout``
+    seconds and then raises SessionPoolExhausted. A ``budget`` or ``max_in_flight``
+    of None means no limit. ``acquire_async`` waits on the event loop instead, so
+    queued jobs don't hold worker threads while no session is free.
+    """
+
+    def __init__(self, sessions, budget=30, window=600, cooldown=900, max_in_flight=1, wait_timeout=60):
+        self.sessions = list(sessions)
+        self.budget = budget
+        self.window = window
+        self.cooldown = cooldown
+        self.max_in_flight = max_in_flight
+        self.wait_timeout = wait_timeout
+        self._cond = threading.Condition()
+        self._waiters = []
+
+    def _is_available(self, session, now):
+        """Whether a session can take a job right now"""
+        return (
+            session.cooldown_until <= now
+            and (self.max_in_flight is None or session.in_flight < self.max_in_flight)
+            and (self.budget is None or session.jobs_in_window(now, self.window) < self.budget)
+        )
+
+    def _next_ready(self, now):
+        """Seconds until some session may free up through cooldown or budget expiry"""
+        waits = []
+        for session in self.sessions:
+            if session.cooldown_until > now:
+                waits.append(session.cooldown_until - now)
+            elif self.budget is not None and session.recent_jobs and len(session.recent_jobs) >= self.budget:
+                waits.append(session.recent_jobs[0] + self.window - now)
+        return max(min(waits), 0.01) if waits else None
+
+    def _pick(self, now):
+        """Return the healthiest available session, least used first on ties"""
+        available = [session for session in self.sessions if self._is_available(session, now)]
+        if not available:
+            return None
+        return max(available, key=lambda s: (s.health, -s.in_flight, -len(s.recent_jobs)))
+
+    def _checkout(self, now):
+        """Take the best available session for a job, or return None (lock held)"""
+        session = self._pick(now)
+        if session:
+            session.in_flight += 1
+            session.recent_jobs.append(now)
+        return session
+
+    def _wait_time(self, now, deadline):
+        """Seconds to wait before looking again, raising once past the deadline (lock held)"""
+        remaining = deadline - now
+        if remaining <= 0:
+            raise SessionPoolExhausted("No session available within the request budget")
+        # Releases wake waiters early; otherwise wait until a budget or cooldown frees up
+        next_ready = self._next_ready(now)
+        return min(remaining, next_ready) if next_ready else remaining
+
+    @contextmanager
+    def acquire(self):
+        """Check out a session for one job (blocking)"""
+        deadline = time.monotonic() + self.wait_timeout
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                session = self._checkout(now)
+                if session:
+                    break
+                self._cond.wait(self._wait_time(now, deadline))
+
+        lease = SessionLease(session)
+        try:
+            yield lease
+        except Exception:
+            lease.ok = False
+            raise
+        finally:
+            self._release(lease)
+
+    @asynccontextmanager
+    async def acquire_async(self):
+        """Check out a session for one job, waiting for it on the event loop"""
+        loop = asyncio.get_running_loop()
+        deadline = time.monotonic() + self.wait_timeout
+        while True:
+            with self._cond:
+                now = time.monotonic()
+                session = self._checkout(now)
+                if session:
+                    break
+                timeout = self._wait_time(now, deadline)
+                waiter = loop.create_future()
+                self._waiters.append((loop, waiter))
+            try:
+                await asyncio.wait({waiter}, timeout=timeout)
+            finally:
+                with self._cond:
+                    self._waiters.remove((loop, waiter))
+
+        lease = SessionLease(session)
+        try:
+            yield lease
+        except Exception:
+            lease.ok = False
+            raise
+        finally:
+            self._release(lease)
+
+    def _release(self, lease):
+        """Record a job's outcome and wake waiting jobs"""
+        session = lease.session
+        with self._cond:
+            session.in_flight -= 1
+            session.health = (1 - HEALTH_SMOOTHING) * session.health + HEALTH_SMOOTHING * (1.0 if lease.ok else 0.0)
+            if lease.ok:
+                session.successes += 1
+            else:
+                session.failures += 1
+
+            if lease.rate_limited:
+                session.rate_limits += 1
+                session.cooldown_until = time.monotonic() + self.cooldown
+                logger.warning(f"Session {session.name} was rate limited; cooling down for {self.cooldown}s")
+
+            self._cond.notify_all()
+            for loop, waiter in self._waiters:
+                try:
+                    loop.call_soon_threadsafe(_wake, waiter)
+                except RuntimeError:
+                    # The waiter's loop has closed
+                    pass
+
+    def get_stats(self):
+        """Return per-session usage and health"""
+        now = time.monotonic()
+        with self._cond:
+            return [
+                {
+                    'name': session.name,
+                    'health': session.health,
+                    'in_flight': session.in_flight,
+                    'jobs_in_window': session.jobs_in_window(now, self.window),
+                    'cooling_down': session.cooldown_until > now,
+                    'successes': session.successes,
+                    'failures': session.failures,
+                    'rate_limits': session.rate_limits
+                }
+                for session in self.sessions
+            ]
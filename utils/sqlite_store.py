@@ -0,0 +1,48 @@
+import logging
+import os
+import sqlite3
+import threading
+
+logger = logging.getLogger(__name__)
+
+class LazySQLite:
+    """A SQLite file opened, and its table created, on first use.
+
+    The shared stores are built when their modules are imported, so opening the
+    file up front would create ``data/`` for anything that merely imports them.
+    ``connect`` returns None when no path is set or the file can't be opened;
+    the owning store then keeps its entries in memory only. ``on_open`` runs once
+    after the table exists, e.g. to prune rows left by the last run.
+    """
+
+    def __init__(self, path, schema, name, on_open=None):
+        self.path = path
+        self.schema = schema
+        self.name = name
+        self.on_open = on_open
+        self._conn = None
+        self._failed = not path
+        self._lock = threading.Lock()
+
+    def connect(self):
+        """Return the connection, opening it on the first call"""
+        if self._conn is not None or self._failed:
+            return self._conn
+
+        with self._lock:
+            if self._conn is not None or self._failed:
+                return self._conn
+            try:
+                os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+                conn = sqlite3.connect(self.path, check_same_thread=False)
+                conn.execute(self.schema)
+                conn.commit()
+            except (sqlite3.Error, OSError) as e:
+                logger.error(f"Error opening {self.name}, keeping it in memory only: {e}")
+                self._failed = True
+                return None
+            self._conn = conn
+
+        if self.on_open:
+            self.on_open()
+        return conn
@@ -0,0 +1,110 @@
+import asyncio
+import logging
+from telegram import Update
+from telegram.ext import BaseUpdateProcessor
+
+logger = logging.getLogger(__name__)
+
+class PerUserUpdateProcessor(BaseUpdateProcessor):
+    """Process updates concurrently while keeping updates of the same user/chat in order.
+
+    Updates from different users run in parallel, at most ``max_concurrent_updates`` at a
+    time. Updates that share a key (user id, or chat id when there is no user) are handled
+    one after another in arrival order. ``max_pending_updates`` bounds how many updates may
+    be admitted (running or waiting) before the application stops handing out new ones.
+    """
+
+    def __init__(self, max_concurrent_updates, max_pending_updates=1024):
+        # The base class semaphore is the admission bound; the real concurrency
+        # ceiling is applied after the per-user lock so waiters don't hold a slot
+        super().__init__(max(max_pending_updates, max_concurrent_updates))
+        self._concurrency_limit = max_concurrent_updates
+        self._running = None
+        self._key_locks = {}
+        self._key_depths = {}
+        self._pending = 0
+        self._active = 0
+        self._max_pending_seen = 0
+        self._processed = 0
+
+    @property
+    def concurrency_limit(self):
+        """Maximum number of updates that run handlers at the same time"""
+        return self._concurrency_limit
+
+    @staticmethod
+    def get_update_key(update):
+        """Return the ordering key for an update, or None if it has no user/chat"""
+        if not isinstance(update, Update):
+            return None
+        if update.effective_user:
+            return ('user', update.effective_user.id)
+        if update.effective_chat:
+            return ('chat', update.effective_chat.id)
+        return None
+
+    async def initialize(self):
+        """Create the execution semaphore on the running event loop"""
+        self._running = asyncio.Semaphore(self._concurrency_limit)
+
+    async def shutdown(self):
+        """Nothing to release; in-flight updates are awaited by the application"""
+        logger.info(f"Update processor stats at shutdown: {self.get_stats()}")
+
+    async def do_process_update(self, update, coroutine):
+        """Run the update once its key is free and a concurrency slot is available"""
+        if self._running is None:
+            await self.initialize()
+
+        key = self.get_update_key(update)
+        self._pending += 1
+        self._max_pending_seen = max(self._max_pending_seen, self._pending)
+
+        try:
+            if key is None:
+                await self._run(coroutine)
+                return
+
+            lock = self._key_locks.get(key)
+            if lock is None:
+                lock = self._key_locks[key] = asyncio.Lock()
+            self._key_depths[key] = self._key_depths.get(key, 0) + 1
+
+            try:
+                # asyncio.Lock wakes waiters in FIFO order, which preserves arrival order
+                async with lock:
+                    await self._run(coroutine)
+            finally:
+                self._key_depths[key] -= 1
+                if self._key_depths[key] == 0:
+                    del self._key_depths[key]
+                    del self._key_locks[key]
+        finally:
+            self._pending -= 1
+            self._processed += 1
+
+    async def _run(self, coroutine):
+        """Await the handler coroutine inside a concurrency slot"""
+        async with self._running:
+            self._active += 1
+            try:
+                await coroutine
+            finally:
+                self._active -= 1
+
+    def active_user_ids(self):
+        """Return the IDs of users with updates running or waiting"""
+        return [key[1] for key in list(self._key_depths) if key[0] == 'user']
+
+    def get_stats(self):
+        """Return queue depth metrics"""
+        return {
+            'concurrency_limit': self._concurrency_limit,
+            'running': self._active,
+            'pending': self._pending,
+            'queued': self._pending - self._active,
+            'max_pending': self._max_pending_seen,
+            'active_keys': len(self._key_depths),
+            'deepest_key_queue': max(self._key_depths.values(), default=0),
+            'processed': self._processed
+        }